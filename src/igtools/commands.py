@@ -1,8 +1,11 @@
 from abc import ABC, abstractmethod
+import os
 import argparse
 
 from .config import config
 from .startup_guard import require_clean_startup
+from .utils import transaction, logger
+from .utils.lock import DirectoryLock, LOCK_FILE, DEFAULT_TIMEOUT
 
 
 class Command(ABC):
@@ -16,12 +19,49 @@ class Command(ABC):
     def with_startup_guard(self) -> bool:
         return True
 
+    def is_writing(self, args: argparse.Namespace) -> bool:
+        """
+        True if the command changes the project, it then holds the lock on the
+        config directory exclusively; read-only commands share it.
+        """
+        return False
+
+    def lock(self, args: argparse.Namespace) -> DirectoryLock:
+        from .specifications import cache
+        directory = cache.cache_directory(config)
+        if os.path.isdir(config.path):
+            cache.ensure_cache_directory(directory)
+        return DirectoryLock(os.path.join(directory, LOCK_FILE),
+                             exclusive=self.is_writing(args),
+                             timeout=getattr(args, "lock_timeout", DEFAULT_TIMEOUT))
+
     def process(self, args: argparse.Namespace) -> None:
         if getattr(args, "config", None):
-            config.set_filepath(filepath=args.config).load()
-            if self.with_startup_guard:
-                require_clean_startup(config=config)
-        return self.run(config=config, args=args)
+            config.set_filepath(filepath=args.config)
+            with self.lock(args) as directory_lock:
+                if transaction.pending(config.path):
+                    # Finish or roll back the writes of an interrupted command first
+                    shared = not directory_lock.exclusive
+                    directory_lock.upgrade()
+                    transaction.recover(config.path)
+                    if shared:
+                        directory_lock.downgrade()
+                config.load()
+                if self.with_startup_guard:
+                    require_clean_startup(config=config)
+                # All writes of the command are committed together once it succeeded
+                with transaction.unit_of_work(config.path):
+                    return self._run(args)
+        return self._run(args)
+
+    def _run(self, args: argparse.Namespace) -> None:
+        from .specifications import normalize
+        normalize.use_scheme(config.fingerprint_scheme)
+        normalize.counter.reset()
+        result = self.run(config=config, args=args)
+        if normalize.counter.computed:
+            logger.log.info(f"Fingerprints computed: {normalize.counter.computed}")
+        return result
 
     @abstractmethod
     def title(self) -> str:
@@ -23,6 +23,9 @@ class ConfigCommand(Command):
     def match(self, args):
         return getattr(args, "command", None) == "config"
 
+    def is_writing(self, args):
+        return args.edit
+
     def run(self, config, args):
         if args.edit:
             CliAppConfig().process()
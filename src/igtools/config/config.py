@@ -5,7 +5,7 @@ import yaml
 from packaging.version import Version, InvalidVersion
 
 from ..versioning import __VERSION__
-from ..utils import cli, logger
+from ..utils import cli, logger, transaction
 from ..errors import ConfigPathNotExists, InitConfigExistsError
 
 
@@ -72,9 +72,14 @@ class Config(BaseConfig):
         self.frozen_version = None
         self.releases = []
         self.frozen_hash = None
+        # Root and bucket hashes of the Merkle tree of the frozen release
+        self.frozen_tree = None
         self._migrated_with_version = None
         self.key_mode = "random"  # "random" or "sequential"
         self.current_req_number = 0
+        self.storage = "yaml"  # "yaml" or "packed", changed with 'igtools migrate --storage'
+        # Content hash scheme of the requirements, changed with 'igtools migrate --fingerprint-scheme'
+        self.fingerprint_scheme = "sha256-json"
 
     @property
     def config_file(self):
@@ -118,9 +123,12 @@ class Config(BaseConfig):
             frozen_version=self.frozen_version,
             releases=sorted(self.releases),
             frozen_hash=self.frozen_hash,
+            frozen_tree=self.frozen_tree,
             migrated_with_version=self._migrated_with_version,
             key_mode=self.key_mode,
-            current_req_number=self.current_req_number
+            current_req_number=self.current_req_number,
+            storage=self.storage,
+            fingerprint_scheme=self.fingerprint_scheme
         )
     
     def from_dict(self, data):
@@ -133,15 +141,18 @@ class Config(BaseConfig):
         self.frozen_version = data.get('frozen_version', None)
         self.releases = sorted(data.get('releases', []))
         self.frozen_hash = data.get('frozen_hash', None)
+        self.frozen_tree = data.get('frozen_tree', None)
         self._migrated_with_version = data.get('migrated_with_version', None)
         self.key_mode = data.get('key_mode', 'random') or 'random'
         self.current_req_number = data.get('current_req_number', 0) or 0
+        self.storage = data.get('storage', 'yaml') or 'yaml'
+        # Written before the scheme was recorded: SHA-256 over JSON
+        self.fingerprint_scheme = data.get('fingerprint_scheme', 'sha256-json') or 'sha256-json'
 
     def save(self):
-        if not os.path.exists(self.path):
-            os.makedirs(self.path)
-        with open(self.config_file, 'w', encoding='utf-8') as file:
-            yaml.dump(self.to_dict(), file, default_flow_style=False, allow_unicode=True)
+        # Within a unit of work only the last state is written, on commit
+        transaction.makedirs(self.path)
+        transaction.write_text(self.config_file, yaml.dump(self.to_dict(), default_flow_style=False, allow_unicode=True))
 
 
 config = Config()
@@ -228,6 +239,7 @@ class CliAppConfig(object):
         if config.key_mode == "sequential":
             rows.append([("Current key number", {"colspan": 1}), (config.current_req_number, {"colspan": 1})])
         rows.append([("Input directory", {"colspan": 1}), (config.directory or '-', {"colspan": 1})])
+        rows.append([("Storage format", {"colspan": 1}), (config.storage or 'yaml', {"colspan": 1})])
         rows.append("separator")
         rows.append([("Current release version", {"colspan": 1}), (config.current or '-', {"colspan": 1})])
         rows.append([("Last frozen release version", {"colspan": 1}), (config.frozen_version or '-', {"colspan": 1})])
@@ -44,8 +44,16 @@ class FinalReleaseException(BaseException):
 class FrozenReleaseException(BaseException):
     DEFAULT_MESSAGE = "The release has been frozen and cannot be processed further"
 
-    def __init__(self):
-        super().__init__(self.DEFAULT_MESSAGE)
+    def __init__(self, keys=None, pages=None):
+        # The keys of the requirements that changed since the freeze and their pages, if known
+        self.keys = keys or []
+        self.pages = pages or []
+        message = self.DEFAULT_MESSAGE
+        if self.keys:
+            message = f"{message}, changed requirements: {', '.join(self.keys)}"
+        if self.pages:
+            message = f"{message}, changed pages: {', '.join(self.pages)}"
+        super().__init__(message)
 
 
 class FilePathNotExists(BaseException):
@@ -56,6 +64,10 @@ class FileFormatException(BaseException):
     pass
 
 
+class RequirementParseException(BaseException):
+    pass
+
+
 class DownloadException(BaseException):
     pass
 
@@ -67,3 +79,19 @@ class ExportFormatUnknown(BaseException):
 class StartUpError(BaseException):
     pass
 
+
+
+class StorageFormatUnknown(BaseException):
+    pass
+
+
+class FingerprintSchemeUnknown(BaseException):
+    pass
+
+
+class StorageCorruptedException(BaseException):
+    pass
+
+
+class LockTimeoutException(BaseException):
+    pass
@@ -4,6 +4,10 @@ from ..versioning import __VERSION__
 
 from .errors import MigrationError
 from .registry import MigrationRegistry
+from .steps import ConvertReleaseStorage, ConvertFingerprintScheme
+from ..specifications import ReleaseManager
+from ..specifications.storage import STORES
+from ..specifications.normalize import SCHEMES
 from .runners import apply_migrations, latest_registry_version, ensure_tool_not_older_than_config, validate_registry_against_tool_version
 
 
@@ -19,12 +23,18 @@ class MigrationCommand(Command):
     def configure_subparser(self, subparsers):
         parser = subparsers.add_parser("migrate", help="Run all pending igtools migrations")
         parser.add_argument("--dry-run", action="store_true", help="Show planned steps without applying")
+        parser.add_argument("--storage", choices=sorted(STORES), help="Convert the release directories and the archive to the given storage format")
+        parser.add_argument("--gc", action="store_true", help="Remove the stored requirement data no release refers to anymore (storage 'blobs')")
+        parser.add_argument("--fingerprint-scheme", choices=sorted(SCHEMES), help="Recompute the content hashes of all requirements with the given fingerprint scheme")
         arguments.add_config(parser=parser)
         return parser
 
     def match(self, args):
         return getattr(args, "command", None) == "migrate"
 
+    def is_writing(self, args):
+        return True
+
     def run(self, config, args):
         ensure_tool_not_older_than_config(config=config, tool_version=__VERSION__)
 
@@ -34,16 +44,43 @@ class MigrationCommand(Command):
 
         if config.migrated_with_version >= target:
             logger.log.info("Nothing to migrate. Already up to date.")
-            return
-
-        if args.dry_run:
+        elif args.dry_run:
             chain = registry.path(config.migrated_with_version, target)
             logger.log.info("Planned migrations:")
             for s in chain:
                 logger.log.info(f"{s.from_version} -> {s.to_version}: {s.description}")
             logger.log.info(f"Final target: {target}")
+        else:
+            apply_migrations(config, registry, target=target, logger=logger.log)
+            logger.log.info("-"*10)
+            logger.log.info(f"Migration finished. Current schema: {config.migrated_with_version}")
+
+        if args.storage:
+            self.convert_storage(config, storage=args.storage, dry_run=args.dry_run)
+        if args.fingerprint_scheme:
+            self.convert_fingerprint_scheme(config, scheme=args.fingerprint_scheme, dry_run=args.dry_run)
+        if args.gc or (args.storage and not args.dry_run):
+            self.collect_garbage(config, dry_run=args.dry_run)
+
+    def convert_storage(self, config, storage, dry_run=False):
+        if dry_run:
+            logger.log.info(f"Planned storage conversion: {config.storage} -> {storage}")
+            return
+        config.storage = storage
+        ConvertReleaseStorage().apply(config=config, logger=logger.log)
+        config.save()
+        logger.log.info(f"Storage format: {config.storage}")
+
+    def collect_garbage(self, config, dry_run=False):
+        if dry_run:
+            logger.log.info("Planned: remove the stored requirement data no release refers to")
             return
+        removed = ReleaseManager(config=config).collect_garbage()
+        logger.log.info(f"Removed {removed} unreferenced files")
 
-        apply_migrations(config, registry, target=target, logger=logger.log)
-        logger.log.info("-"*10)
-        logger.log.info(f"Migration finished. Current schema: {config.migrated_with_version}")
\ No newline at end of file
+    def convert_fingerprint_scheme(self, config, scheme, dry_run=False):
+        if dry_run:
+            logger.log.info(f"Planned fingerprint scheme conversion: {config.fingerprint_scheme} -> {scheme}")
+            return
+        ConvertFingerprintScheme(scheme=scheme).apply(config=config, logger=logger.log)
+        logger.log.info(f"Fingerprint scheme: {config.fingerprint_scheme}")
\ No newline at end of file
@@ -1 +1,3 @@
-from .drop_actors_and_test_procedures import DropActorsAndTestProceduresFromContentHash
\ No newline at end of file
+from .drop_actors_and_test_procedures import DropActorsAndTestProceduresFromContentHash
+from .convert_release_storage import ConvertReleaseStorage
+from .convert_fingerprint_scheme import ConvertFingerprintScheme
@@ -0,0 +1,52 @@
+from ...specifications import ReleaseManager, normalize, merkle
+
+
+class ConvertFingerprintScheme(object):
+    """
+    Recomputes the content hash of all requirements of all releases and the
+    archive with another fingerprint scheme and records the scheme in the
+    configuration ('fingerprint_scheme').
+
+    Not a version step, run by 'igtools migrate --fingerprint-scheme <scheme>':
+      - 'sha256-json' is SHA-256 over the JSON of the canonical fields, the
+        scheme of all configurations up to 0.4.x and the default.
+      - 'blake2b16-bin' hashes a length-prefixed encoding of the same fields
+        with BLAKE2b (16 bytes).
+      - Only the content hashes change, no requirement gets a new version.
+    """
+
+    description  = (
+        "Recompute the content hashes of all requirements with the given fingerprint scheme."
+    )
+
+    def __init__(self, scheme):
+        self.scheme = scheme
+
+    def apply(self, config, logger=None):
+        normalize.use_scheme(self.scheme)
+        config.fingerprint_scheme = self.scheme
+        release_manager = ReleaseManager(config=config)
+        directories = [release_manager.release_directory(version) for version in config.releases]
+        directories.append(release_manager.archive_directory())
+
+        for directory in directories:
+            if not release_manager.store.exists(directory):
+                continue
+            requirements = release_manager.store.load(directory)
+            for req in requirements:
+                req.content_hash, _ = normalize.build_fingerprint(text=req.text,
+                                                                  title=req.title,
+                                                                  conformance=req.conformance)
+            release_manager.store.save(directory, requirements)
+            if logger:
+                logger.info(f"Recomputed {len(requirements)} content hashes in {directory} with '{self.scheme}'")
+
+        # The frozen release keeps its requirements, only their hashes changed
+        if release_manager.is_current_release_frozen():
+            release = release_manager.load(columnar=True)
+            config.frozen_hash = normalize.build_fingerprint_columns(release.columns)
+            if config.frozen_tree:
+                config.frozen_tree = ReleaseManager.frozen_tree(merkle.ReleaseTree.from_columns(release.columns))
+            if logger:
+                logger.info(f"Release is frozen. Migrated frozen hash {config.frozen_hash}.")
+        config.save()
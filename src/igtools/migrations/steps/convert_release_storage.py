@@ -0,0 +1,38 @@
+from ...specifications import ReleaseManager, storage
+
+
+class ConvertReleaseStorage(object):
+    """
+    Converts the release directories and the archive to the storage format
+    set in the configuration ('storage').
+
+    Not a version step, run by 'igtools migrate --storage <format>':
+      - 'yaml' keeps one '<KEY>.yaml' file per requirement (default).
+      - 'packed' keeps one 'requirements.jsonl' file per directory with one
+        JSON record per requirement, sorted by key.
+      - The conversion works in both directions.
+    """
+
+    description  = (
+        "Convert the release directories and the archive to the configured storage format."
+    )
+
+    def apply(self, config, logger=None):
+        target = storage.create_store(config)
+        release_manager = ReleaseManager(config=config)
+        directories = [release_manager.release_directory(version) for version in config.releases]
+        directories.append(release_manager.archive_directory())
+
+        for directory in directories:
+            for name, store in storage.STORES.items():
+                if name == target.name:
+                    continue
+                source = store(config)
+                if not source.exists(directory):
+                    continue
+                requirements = source.load(directory)
+                # The target is written completely before the source is removed
+                target.save(directory, requirements)
+                source.clear(directory)
+                if logger:
+                    logger.info(f"Converted {len(requirements)} requirements in {directory} from '{name}' to '{target.name}'")
@@ -1,7 +1,7 @@
 from packaging.version import Version
 from ..base import Migration
 
-from ...specifications import ReleaseManager, normalize
+from ...specifications import ReleaseManager, normalize, merkle
 
 
 class DropActorsAndTestProceduresFromContentHash(Migration):
@@ -47,6 +47,8 @@ class DropActorsAndTestProceduresFromContentHash(Migration):
         # Step 4: Check if current release is frozen and update the frozen hash
         if release_manager.is_current_release_frozen():
             config.frozen_hash = normalize.build_fingerprint_release(requirements=release.requirements)
+            if config.frozen_tree:
+                config.frozen_tree = ReleaseManager.frozen_tree(merkle.ReleaseTree.from_requirements(release.requirements))
             config.save()
             logger.info(f"Release is frozen. Migrated frozen hash {config.frozen_hash}.")
         else:
@@ -1,11 +1,10 @@
 import os
-import json
 import yaml
 import importlib.resources as resources
 from functools import lru_cache
 from datetime import date, datetime, timezone
 
-from ..utils import utils, cli
+from ..utils import utils, cli, stream
 from ..errors import FilePathNotExists, ExportFormatUnknown, BaseException
 from ..specifications import ReleaseManager
 
@@ -156,9 +155,9 @@ class PolarionExporter:
 
     def export(self, output):
         if self.version is None or self.version == "current":
-            release = self.release_manager.load()
+            release = self.release_manager.load(streaming=True)
         else:
-            release = self.release_manager.load_version(version=self.version)
+            release = self.release_manager.load_version(version=self.version, streaming=True)
 
         document_info = {}
         document_info["id"] = self.ig_config.name
@@ -171,47 +170,44 @@ class PolarionExporter:
         document_info["status"] = "released"
         document_info["classification"] = "public"
 
-        requirements = []
-
+        # The requirements are checked while they are written, the export
+        # only replaces the output once all of them passed
         _errors = []
-        for req in release.requirements:
-            _data = req.serialize()
-
-            try:
-                product_types = self.map_product_types(requirement=req)
-            except PolarionExportMappingError as e:
-                _errors.append(str(e))
-                continue
-
-            if req.conformance not in self.ALLOWED_CONFORMANCE:
-                _errors.append(str(PolarionExportConformanceError(f"Conformance {req.conformance} not allowed; {req.source}; requirement key: {req.key}.")))
-                continue
-            
-
-            req_export = {}
-
-            req_export["key"] = req.key
-            req_export["title"] = req.title
-            req_export["version"] = req.version
-            req_export["status"] = req.status
-            req_export["text"] = req.text
-            req_export["conformance"] = req.conformance
-            req_export["characteristics"] = product_types
-            req_export["link"] = utils.convert_to_ig_requirement_link(base=self.ig_config.link,
-                                                                      source=req.source,
-                                                                      key=req.key,
-                                                                      version=req.version)
-            requirements.append(req_export)
-        if _errors:
-            error_msg = "\n" + "\n".join(_errors)
-            raise PolarionExportError(error_msg)
-
         data = {}
         data["document_info"] = document_info
-        data["requirements"] = requirements
-        self.save_export(output=output, data=data)
+        data["requirements"] = self.export_requirements(release=release, errors=_errors)
+        self.save_export(output=output, data=data, errors=_errors)
 
-    def save_export(self, output, data):
+    def export_requirements(self, release, errors):
+        # Requirements failing a check are collected in 'errors' and skipped
+        for req in release.iter_requirements():
+            try:
+                yield self.export_requirement(req)
+            except (PolarionExportMappingError, PolarionExportConformanceError) as e:
+                errors.append(str(e))
+
+    def export_requirement(self, req):
+        product_types = self.map_product_types(requirement=req)
+
+        if req.conformance not in self.ALLOWED_CONFORMANCE:
+            raise PolarionExportConformanceError(f"Conformance {req.conformance} not allowed; {req.source}; requirement key: {req.key}.")
+
+        req_export = {}
+
+        req_export["key"] = req.key
+        req_export["title"] = req.title
+        req_export["version"] = req.version
+        req_export["status"] = req.status
+        req_export["text"] = req.text
+        req_export["conformance"] = req.conformance
+        req_export["characteristics"] = product_types
+        req_export["link"] = utils.convert_to_ig_requirement_link(base=self.ig_config.link,
+                                                                  source=req.source,
+                                                                  key=req.key,
+                                                                  version=req.version)
+        return req_export
+
+    def save_export(self, output, data, errors=None):
         ext_map = {
             '.json': 'JSON'
         }
@@ -227,8 +223,11 @@ class PolarionExporter:
             raise FilePathNotExists(f"Path {dir_path} does not exist.")
 
         if file_format == 'JSON':
-            with open(filepath, 'w', encoding='utf-8') as file:
-                json.dump(data, file, indent=4, ensure_ascii=False)
+            with stream.atomic_output(filepath) as file:
+                stream.write_json(file, data)
+                if errors:
+                    error_msg = "\n" + "\n".join(errors)
+                    raise PolarionExportError(error_msg)
         else:
             raise ExportFormatUnknown(f"The format {file_format} is not supported.")
         
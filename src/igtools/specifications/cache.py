@@ -0,0 +1,296 @@
+import os
+import json
+import time
+import hashlib
+from collections import OrderedDict
+
+from ..versioning import __VERSION__
+from ..utils import transaction
+from . import normalize
+from . import scanner
+
+
+CACHE_DIRECTORY = "cache"
+
+# Pages modified this close to the moment they were recorded are verified by
+# digest, a second edit within the timestamp granularity would go unnoticed.
+RACY_WINDOW_NS = 2 * 10**9
+
+
+def cache_directory(config):
+    return os.path.join(config.path, CACHE_DIRECTORY)
+
+
+def ensure_cache_directory(directory):
+    # Created directly, caches are written past the unit of work (see transaction.write_cache)
+    if not os.path.isdir(directory):
+        os.makedirs(directory, exist_ok=True)
+        transaction.write_cache(os.path.join(directory, ".gitignore"), "*\n")
+
+
+def content_digest(content):
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class PageEntry(object):
+    """
+    Manifest entry of one page: stat data, content digest and the parsed
+    requirement records (including their fingerprints once known). The page
+    content is only kept while the page is processed, it is not serialized.
+    """
+
+    def __init__(self, file_path, mtime_ns=0, size=0, digest="", recorded_ns=0, tags=None):
+        self.file_path = file_path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.digest = digest
+        self.recorded_ns = recorded_ns
+        self.tags = tags or []
+        self.content = None
+
+    @classmethod
+    def from_content(cls, file_path, content, tags):
+        stat = os.stat(file_path)
+        entry = cls(file_path=file_path,
+                    mtime_ns=stat.st_mtime_ns,
+                    size=stat.st_size,
+                    digest=content_digest(content),
+                    recorded_ns=time.time_ns(),
+                    tags=tags)
+        entry.content = content
+        return entry
+
+    @classmethod
+    def from_file(cls, file_path):
+        content = transaction.read_text(file_path)
+        return cls.from_content(file_path=file_path, content=content, tags=scanner.scan(content, file_path=file_path))
+
+    def matches_stat(self, stat):
+        if self.mtime_ns != stat.st_mtime_ns or self.size != stat.st_size:
+            return False
+        return self.recorded_ns - self.mtime_ns >= RACY_WINDOW_NS
+
+    def serialize(self):
+        return dict(
+            mtime_ns=self.mtime_ns,
+            size=self.size,
+            digest=self.digest,
+            recorded_ns=self.recorded_ns,
+            requirements=[tag.serialize() for tag in self.tags]
+        )
+
+    def deserialize(self, data):
+        self.mtime_ns = data.get('mtime_ns', 0)
+        self.size = data.get('size', 0)
+        self.digest = data.get('digest', "")
+        self.recorded_ns = data.get('recorded_ns', 0)
+        self.tags = [scanner.RequirementTag(attrs={}).deserialize(r) for r in data.get('requirements', [])]
+        return self
+
+
+def scan_page(file_path):
+    # Read, digest and parse one page, runs in the worker processes
+    return PageEntry.from_file(file_path)
+
+
+class PageManifest(object):
+    """
+    On-disk manifest of the parsed input pages, used by 'process --incremental'.
+
+    Unchanged pages (same mtime and size, or same content digest) are served
+    from the manifest without parsing them again. The whole manifest is
+    dropped when it was written by another igtools version or with another
+    fingerprint scheme.
+    """
+    FILENAME = "pages.json"
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.entries = {}
+
+    @property
+    def filepath(self):
+        return os.path.join(self.directory, self.FILENAME)
+
+    def load(self):
+        self.entries = {}
+        if not transaction.exists(self.filepath):
+            return self
+        try:
+            data = json.loads(transaction.read_text(self.filepath))
+        except (OSError, ValueError):
+            return self
+        if data.get('version') != str(__VERSION__) or data.get('fingerprint_scheme') != normalize.FINGERPRINT_SCHEME:
+            return self
+        for file_path, entry in data.get('pages', {}).items():
+            self.entries[file_path] = PageEntry(file_path=file_path).deserialize(entry)
+        return self
+
+    def lookup(self, file_path):
+        """
+        Return the cached entry of a page or None if the page has to be parsed.
+        """
+        entry = self.entries.get(file_path)
+        if entry is None or transaction.is_staged(file_path):
+            return None
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        if entry.matches_stat(stat):
+            return entry
+        content = transaction.read_text(file_path)
+        if content_digest(content) != entry.digest:
+            return None
+        entry = PageEntry.from_content(file_path=file_path, content=content, tags=entry.tags)
+        self.entries[file_path] = entry
+        return entry
+
+    def add(self, entry):
+        self.entries[entry.file_path] = entry
+
+    def discard(self, file_path):
+        self.entries.pop(file_path, None)
+
+    def save(self, file_paths):
+        # Only the pages of this run are kept, removed pages drop out. Unlike
+        # the other caches the manifest is committed with the unit of work:
+        # entries of rewritten pages hold the staged content, not the page on disk.
+        pages = {}
+        for file_path in file_paths:
+            if file_path in self.entries:
+                pages[file_path] = self.entries[file_path].serialize()
+        ensure_cache_directory(self.directory)
+        data = dict(
+            version=str(__VERSION__),
+            fingerprint_scheme=normalize.FINGERPRINT_SCHEME,
+            pages=pages
+        )
+        transaction.write_text(self.filepath, json.dumps(data, ensure_ascii=False))
+
+
+class FingerprintCache(object):
+    """
+    Semantic fingerprints of requirements by a digest of their raw text,
+    title and conformance, so unchanged requirements are not normalized and
+    hashed again on every run.
+
+    An in-memory LRU of at most 'maxsize' entries, loaded from and saved to
+    the cache directory. Entries belong to the fingerprint scheme they were
+    built with: the scheme is part of every digest and the file is dropped
+    when it was written with another scheme or igtools version.
+    """
+    FILENAME = "fingerprints.json"
+    MAXSIZE = 100000
+
+    def __init__(self, directory, maxsize=MAXSIZE):
+        self.directory = directory
+        self.maxsize = maxsize
+        # digest -> fingerprint, least recently used first
+        self.entries = OrderedDict()
+        self.changed = False
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def filepath(self):
+        return os.path.join(self.directory, self.FILENAME)
+
+    def load(self):
+        self.entries = OrderedDict()
+        self.changed = False
+        if not transaction.exists(self.filepath):
+            return self
+        try:
+            data = json.loads(transaction.read_text(self.filepath))
+        except (OSError, ValueError):
+            return self
+        if data.get('version') != str(__VERSION__) or data.get('fingerprint_scheme') != normalize.FINGERPRINT_SCHEME:
+            return self
+        self.entries = OrderedDict(data.get('entries', []))
+        return self
+
+    @staticmethod
+    def digest(text, title, conformance):
+        raw = "\0".join((normalize.FINGERPRINT_SCHEME, text or "", title or "", conformance or ""))
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+    def fingerprint(self, text, title, conformance):
+        key = self.digest(text, title, conformance)
+        fingerprint = self.entries.get(key)
+        if fingerprint is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return fingerprint
+        self.misses += 1
+        fingerprint, _ = normalize.build_fingerprint(text=text, title=title, conformance=conformance)
+        self.entries[key] = fingerprint
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        self.changed = True
+        return fingerprint
+
+    def save(self):
+        # Only written when fingerprints were added, not for reordering
+        if not self.changed:
+            return
+        ensure_cache_directory(self.directory)
+        data = dict(
+            version=str(__VERSION__),
+            fingerprint_scheme=normalize.FINGERPRINT_SCHEME,
+            entries=list(self.entries.items())
+        )
+        transaction.write_cache(self.filepath, json.dumps(data))
+        self.changed = False
+
+
+class ReleaseNotesCache(object):
+    """
+    Release notes of past releases by the digest of their stored
+    requirements (see RequirementStore.digest), so 'ig-release-notes' only
+    loads the releases that changed since the notes were cached. The file is
+    dropped when it was written by another igtools version.
+    """
+    FILENAME = "release-notes.json"
+
+    def __init__(self, directory):
+        self.directory = directory
+        # version -> dict(digest, requirements)
+        self.entries = {}
+        self.changed = False
+
+    @property
+    def filepath(self):
+        return os.path.join(self.directory, self.FILENAME)
+
+    def load(self):
+        self.entries = {}
+        self.changed = False
+        if not transaction.exists(self.filepath):
+            return self
+        try:
+            data = json.loads(transaction.read_text(self.filepath))
+        except (OSError, ValueError):
+            return self
+        if data.get('version') != str(__VERSION__):
+            return self
+        self.entries = data.get('releases', {})
+        return self
+
+    def lookup(self, version, digest):
+        entry = self.entries.get(version)
+        if entry is None or entry.get('digest') != digest:
+            return None
+        return entry.get('requirements', [])
+
+    def add(self, version, digest, requirements):
+        self.entries[version] = dict(digest=digest, requirements=requirements)
+        self.changed = True
+
+    def save(self):
+        if not self.changed:
+            return
+        ensure_cache_directory(self.directory)
+        data = dict(version=str(__VERSION__), releases=self.entries)
+        transaction.write_cache(self.filepath, json.dumps(data, ensure_ascii=False))
+        self.changed = False
@@ -0,0 +1,216 @@
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    # The columns are arrays of the standard library
+    numpy = None
+
+from .data import Requirement, ReleaseState
+
+
+# Codes of the status column, in the order of ReleaseState
+STATUS_CODES = {state.value: code for code, state in enumerate(ReleaseState)}
+UNKNOWN = -1
+
+
+def status_codes(states):
+    return [STATUS_CODES.get(state.value if isinstance(state, ReleaseState) else state, UNKNOWN)
+            for state in states]
+
+
+def hash_bytes(content_hash):
+    # Lowercase hex hashes are stored as bytes, b"" means "ask the requirement"
+    if isinstance(content_hash, str) and content_hash == content_hash.lower():
+        try:
+            return bytes.fromhex(content_hash)
+        except ValueError:
+            pass
+    return b""
+
+
+class ReleaseColumns(object):
+    """
+    Column-oriented view of the requirements of a release for bulk
+    operations: parallel arrays of key, version, release status code, source
+    index and content hash, one row per requirement.
+
+    Filters, counts, sorts and joins run on the arrays (with NumPy if it is
+    installed) and return row indices. A row is only turned into a
+    Requirement when it is accessed; rows can be given as Requirement objects
+    or as their serialized data.
+
+    The view is a snapshot, changes to the requirements are not reflected.
+    """
+
+    def __init__(self, rows, use_numpy=None):
+        self._rows = list(rows)
+        self.numpy = numpy is not None and use_numpy is not False
+        # Distinct sources, the source column holds indices into it
+        self.sources = []
+        self._hashes = None
+
+        keys, versions, status, sources = [], array('q'), array('b'), array('l')
+        source_indices = {}
+        for row in self._rows:
+            if isinstance(row, Requirement):
+                key, version, release_status, source = row.key, row.version, row.release_status, row.source
+            else:
+                key, version = row.get('key'), row.get('version')
+                release_status, source = row.get('release_status'), row.get('source')
+            keys.append(key)
+            # Versions other than integers are read from the requirement
+            versions.append(version if type(version) is int and version >= 0 else UNKNOWN)
+            status.append(STATUS_CODES.get(release_status, UNKNOWN))
+            source_key = tuple(source) if isinstance(source, list) else source
+            index = source_indices.get(source_key)
+            if index is None:
+                index = source_indices[source_key] = len(self.sources)
+                self.sources.append(source)
+            sources.append(index)
+
+        if self.numpy:
+            self.keys = numpy.array(keys, dtype=object)
+            self.versions = numpy.frombuffer(versions, dtype=numpy.int64).copy()
+            self.status = numpy.frombuffer(status, dtype=numpy.int8).copy()
+            self.source = numpy.array(sources, dtype=numpy.intp)
+        else:
+            self.keys, self.versions, self.status, self.source = keys, versions, status, sources
+
+    def __len__(self):
+        return len(self._rows)
+
+    @property
+    def hashes(self):
+        # Content hashes as bytes, computed on first use
+        if self._hashes is None:
+            hashes = []
+            for row in self._rows:
+                if isinstance(row, Requirement):
+                    hashes.append(hash_bytes(row.content_hash))
+                else:
+                    hashes.append(hash_bytes(row.get('content_hash')))
+            self._hashes = numpy.array(hashes, dtype=object) if self.numpy else hashes
+        return self._hashes
+
+    def row(self, index):
+        row = self._rows[index]
+        if not isinstance(row, Requirement):
+            row = self._rows[index] = Requirement().deserialize(row)
+        return row
+
+    def rows(self, indices=None):
+        if indices is None:
+            indices = range(len(self))
+        return [self.row(int(index)) for index in indices]
+
+    def key(self, index):
+        return self.keys[index]
+
+    def version(self, index):
+        version = self.versions[index]
+        return int(version) if version != UNKNOWN else self.row(index).version
+
+    def content_hash(self, index):
+        value = self.hashes[index]
+        return value.hex() if value else self.row(index).content_hash
+
+    def entries(self, indices=None):
+        """
+        (key, version, content hash) of the rows in the order of 'indices',
+        read from the columns without building the requirements.
+        """
+        if indices is None:
+            indices = range(len(self))
+        if self.numpy:
+            indices = numpy.asarray(indices, dtype=numpy.intp)
+            keys, versions = self.keys[indices].tolist(), self.versions[indices].tolist()
+            hashes = self.hashes[indices].tolist()
+        else:
+            keys, versions = [self.keys[i] for i in indices], [self.versions[i] for i in indices]
+            hashes = [self.hashes[i] for i in indices]
+        for index, key, version, value in zip(indices, keys, versions, hashes):
+            if version == UNKNOWN:
+                version = self.row(int(index)).version
+            yield key, version, value.hex() if value else self.row(int(index)).content_hash
+
+    def where(self, status=None, exclude=None, source=None):
+        """
+        Indices of the rows with one of the release states 'status', none of
+        the states 'exclude' and the given source, in row order.
+        """
+        if self.numpy:
+            mask = numpy.ones(len(self), dtype=bool)
+            if status is not None:
+                mask &= numpy.isin(self.status, status_codes(status))
+            if exclude is not None:
+                mask &= ~numpy.isin(self.status, status_codes(exclude))
+            if source is not None:
+                mask &= self.source == self._source_index(source)
+            return numpy.flatnonzero(mask)
+
+        indices = range(len(self))
+        if status is not None:
+            codes = set(status_codes(status))
+            indices = [i for i in indices if self.status[i] in codes]
+        if exclude is not None:
+            codes = set(status_codes(exclude))
+            indices = [i for i in indices if self.status[i] not in codes]
+        if source is not None:
+            index = self._source_index(source)
+            indices = [i for i in indices if self.source[i] == index]
+        return array('l', indices)
+
+    def count(self, status=None, exclude=None, source=None):
+        return len(self.where(status=status, exclude=exclude, source=source))
+
+    def sort_by_key(self, indices=None):
+        # Row indices ordered by key, limited to 'indices' if given
+        if indices is None:
+            indices = range(len(self))
+        if self.numpy:
+            indices = numpy.asarray(indices, dtype=numpy.intp)
+            return indices[numpy.argsort(self.keys[indices], kind="stable")]
+        return array('l', sorted(indices, key=self.keys.__getitem__))
+
+    def join(self, other):
+        """
+        Rows with the same key in both views, as two parallel index arrays
+        into this view and 'other', ordered by key.
+        """
+        if self.numpy and other.numpy:
+            _, left, right = numpy.intersect1d(self.keys, other.keys, assume_unique=True, return_indices=True)
+            return left, right
+        positions = {key: index for index, key in enumerate(other.keys)}
+        pairs = sorted((key, index, positions[key]) for index, key in enumerate(self.keys) if key in positions)
+        return array('l', [left for _, left, _ in pairs]), array('l', [right for _, _, right in pairs])
+
+    def changed(self, other):
+        """
+        Indices of the rows that are new or differ in version or content hash
+        from the row with the same key in 'other'.
+        """
+        left, right = self.join(other)
+        if self.numpy and other.numpy:
+            differs = (self.versions[left] != other.versions[right]) | (self.hashes[left] != other.hashes[right])
+            # Rows without an integer version or a hex hash are compared one by one
+            unknown = ((self.versions[left] == UNKNOWN) | (other.versions[right] == UNKNOWN)
+                       | (self.hashes[left] == b"") | (other.hashes[right] == b""))
+            changed = numpy.ones(len(self), dtype=bool)
+            changed[left] = differs
+            for i, j in zip(left[unknown], right[unknown]):
+                changed[i] = self._differs(other, i, j)
+            return numpy.flatnonzero(changed)
+        changed = set(range(len(self))) - set(left)
+        changed.update(i for i, j in zip(left, right) if self._differs(other, i, j))
+        return array('l', sorted(changed))
+
+    def _differs(self, other, i, j):
+        return self.version(i) != other.version(j) or self.content_hash(i) != other.content_hash(j)
+
+    def _source_index(self, source):
+        source_key = tuple(source) if isinstance(source, list) else source
+        for index, known in enumerate(self.sources):
+            if (tuple(known) if isinstance(known, list) else known) == source_key:
+                return index
+        return UNKNOWN
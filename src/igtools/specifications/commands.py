@@ -1,4 +1,5 @@
 import os
+import sys
 
 from ..config import config, CliAppConfig
 from ..commands import Command
@@ -26,12 +27,17 @@ class ReleaseCommand(Command):
         parser.add_argument("--unfreeze", action="store_true", help="Unfreeze the current release: remove the frozen state and its release hash. After unfreezing, further modifications to the release are allowed again.")
         parser.add_argument("--yes", "-y",action="store_true", help="Automatically confirm all prompts without asking for user input")
         parser.add_argument("--is-frozen", action="store_true", help="Checks whether the release has been frozen. If set, no further changes are allowed")
+        parser.add_argument("--verify", action="store_true", help="Verify the pages against the frozen release without processing them. Only pages changed since the freeze are parsed, the changed requirements and their pages are reported.")
         arguments.add_common(parser=parser)
+        arguments.add_jobs(parser=parser)
         return parser
 
     def match(self, args):
         return getattr(args, "command", None) == "release"
 
+    def is_writing(self, args):
+        return bool(args.version or args.final or args.freeze or args.unfreeze)
+
     def run(self, config, args):
         if args.is_frozen:
             try:
@@ -40,13 +46,20 @@ class ReleaseCommand(Command):
             except FrozenReleaseException as e:
                 logger.log.info("Release has been frozen - no further changes allowed")
                 sys.exit(1) 
+        elif args.verify:
+            release_manager = ReleaseManager(config=config)
+            if release_manager.is_current_release_frozen():
+                Processor(config=config, input=args.directory, jobs=args.jobs).verify_frozen()
+                logger.log.info(f"Release {config.current} matches its frozen state")
+            else:
+                logger.log.warning(f"Release {config.current} is not frozen. Verify skipped.")
         elif args.final or args.freeze:
             if cli.confirm_action(f"Are you sure you want to freeze the release version {config.current}?", auto_confirm=args.yes):
                 release_manager = ReleaseManager(config=config)
+                processor = Processor(config=config, input=args.directory, jobs=args.jobs)
                 if not release_manager.is_current_release_frozen():
-                    processor = Processor(config=config, input=args.directory)
                     processor.process()
-                release_manager.freeze_release()
+                release_manager.freeze_release(pages=processor.all_filepaths())
                 logger.log.info(f"The release version {config.current} has been successfully frozen. No further changes are allowed.")
         elif args.unfreeze:
             release_manager = ReleaseManager(config=config)
@@ -63,7 +76,7 @@ class ReleaseCommand(Command):
 
                 release_manager.check_new_version(version=args.version, force=args.force)
 
-                processor = Processor(config=config, input=args.directory)
+                processor = Processor(config=config, input=args.directory, jobs=args.jobs)
                 if not config.current is None:
                     if not release_manager.is_current_release_frozen():
                         processor.process()
@@ -84,19 +97,26 @@ class ProcessCommand(Command):
     def configure_subparser(self, subparsers):
         parser = subparsers.add_parser("process", help="Process requirements")
         parser.add_argument("--check", action="store_true", help="Check for Duplicate ID")
+        parser.add_argument("--incremental", action="store_true", help="Only parse pages changed since the last run, unchanged pages are read from the page cache")
         arguments.add_common(parser=parser)
+        arguments.add_jobs(parser=parser)
         return parser
 
     def match(self, args):
         return getattr(args, "command", None) == "process"
 
+    def is_writing(self, args):
+        return not args.check
+
     def run(self, config, args):
-        processor = Processor(config=config, input=args.directory)
+        processor = Processor(config=config, input=args.directory, jobs=args.jobs, incremental=args.incremental)
         if args.check:
             processor.check()
             logger.log.info(f"Verified {config.current}")
         else:
-            processor.process()
+            result = processor.process()
+            if result is not None:
+                logger.log.info(f"Requirements: {result}")
             logger.log.info(f"Successfully processed release version: {config.current}")
 
 
@@ -108,6 +128,7 @@ class ReleaseNoteCommand(Command):
     def configure_subparser(self, subparsers):
         parser = subparsers.add_parser("ig-release-notes", help="Create release notes for a FHIR Implementation Guide")
         parser.add_argument("output", help=f"Output directory or export file, default is {ReleaseNoteManager.RELEASE_NOTES_FILENAME}")
+        parser.add_argument("--last", type=arguments.positive_int, help="Only the release notes of the last N releases")
         arguments.add_config(parser=parser)
         return parser
 
@@ -117,7 +138,7 @@ class ReleaseNoteCommand(Command):
     def run(self, config, args):
         logger.log.info(f"Create Release-Notes for {config.current} in {os.path.join(args.output)}")
         release_note_manager = ReleaseNoteManager(config=config)
-        release_note_manager.generate(output=args.output)
+        release_note_manager.generate(output=args.output, last=args.last)
 
 
 class RequirementExportCommand(Command):
@@ -160,6 +181,9 @@ class RequirementImportCommand(Command):
     def match(self, args):
         return getattr(args, "command", None) == "import" and getattr(args, "input", None)
 
+    def is_writing(self, args):
+        return not args.dry_run
+
     def run(self, config, args):
         logger.log.info(f"Import version {args.release} and propagate to {args.next}")
         importer = RequirementImporter(
@@ -1,4 +1,7 @@
+import sys
 import enum
+import json
+import hashlib
 from datetime import datetime
 
 from . import normalize
@@ -19,143 +22,230 @@ class PublicationStatus(enum.Enum):
     RETIRED = 'RETIRED'
     UNKNOWN = 'UNKNOWN'
 
-class Requirement(object):
+def encode_serialized(data):
+    # Canonical JSON of a serialized requirement, one line without newlines
+    return json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
 
-    def __init__(self, key=None, title=None, text=None, actor=None, source=None, version=None, process=None, conformance=None, status=None, test_procedures=None):
-        self.key = key
-        self.title = title
-        self.actor = actor or []
-        self.version = version
-        self.release_status = process or ReleaseState.NEW.value
-        self.status = status or PublicationStatus.ACTIVE.value
-        self.source = source
-        self.text = text
-        self._created =  ""
-        self._modified = ""
-        self._deleted = ""
-        self._date = ""
-        self.conformance = conformance or ""
-        self.test_procedures = test_procedures or {}
 
-        self._content_hash = ""
+def encoded_digest(encoded):
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def serialized_digest(data):
+    """
+    Digest of the serialized form of a requirement, used to detect requirements
+    that changed since they were loaded.
+    """
+    return encoded_digest(encode_serialized(data))
+
 
+class Unparsed(object):
+    # Marks a timestamp that was not parsed yet, stays the same object when copied
+    def __reduce__(self):
+        return "UNPARSED"
 
-    def _from_datetime(self, value):
+
+UNPARSED = Unparsed()
+
+
+def intern_list(values):
+    # Actors and test procedures repeat across all requirements, share the strings
+    try:
+        return list(map(sys.intern, values)) if type(values) is list else sys.intern(values)
+    except TypeError:
+        return values
+
+
+def intern_test_procedures(test_procedures):
+    if type(test_procedures) is not dict:
+        return test_procedures
+    try:
+        return {sys.intern(actor): list(map(sys.intern, procedures)) for actor, procedures in test_procedures.items()}
+    except TypeError:
+        return test_procedures
+
+
+class Timestamp(object):
+    """
+    ISO 8601 timestamp attribute of a Requirement. The string is kept in
+    '_<name>' as it is stored, it is parsed on first access only.
+    """
+
+    def __init__(self, name):
+        self.name = f"_{name}"
+        self.parsed = f"_{name}_parsed"
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        parsed = getattr(instance, self.parsed)
+        if parsed is UNPARSED:
+            value = getattr(instance, self.name)
+            parsed = datetime.fromisoformat(value) if value else None
+            setattr(instance, self.parsed, parsed)
+        return parsed
+
+    def __set__(self, instance, value):
         if not value:
-            return value
-        if isinstance(value, datetime):
-            return value.isoformat()
+            setattr(instance, self.name, value)
+            setattr(instance, self.parsed, None)
+        elif isinstance(value, datetime):
+            setattr(instance, self.name, value.isoformat())
+            setattr(instance, self.parsed, value)
         elif isinstance(value, str):
             try:
-                datetime.fromisoformat(value)
+                parsed = datetime.fromisoformat(value)
             except ValueError:
                 raise ValueError("Invalid date string format. Must be ISO 8601.")
-            return value
+            setattr(instance, self.name, value)
+            setattr(instance, self.parsed, parsed)
         else:
             raise TypeError("Created must be a datetime object or ISO 8601 string.")
 
-    def _to_datetime(self, value):
-        if value:
-            return datetime.fromisoformat(value)
-        return None
 
-    @property
-    def date(self):
-        return self._to_datetime(value=self._date)
+class Fingerprinted(object):
+    """
+    Attribute of a Requirement that its fingerprint is built from, kept in
+    '_<name>'. Setting it drops the fingerprint computed from the old value.
+    """
 
-    @date.setter
-    def date(self, value):
-        self._date = self._from_datetime(value=value)
+    def __init__(self, name):
+        self.name = f"_{name}"
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return getattr(instance, self.name)
+
+    def __set__(self, instance, value):
+        setattr(instance, self.name, value)
+        instance._fingerprint = None
 
-    @property
-    def created(self):
-        return self._to_datetime(value=self._created)
 
-    @created.setter
-    def created(self, value):
-        self._created = self._from_datetime(value=value)
+# Stored values to the enum members, unknown values are kept as they are
+RELEASE_STATES = {state.value: state for state in ReleaseState}
+PUBLICATION_STATES = {state.value: state for state in PublicationStatus}
+
+
+class Requirement(object):
+    __slots__ = ("key", "_title", "actor", "version", "_release_status", "_status", "source", "_text",
+                 "_created", "_created_parsed", "_modified", "_modified_parsed", "_deleted", "_deleted_parsed",
+                 "_date", "_date_parsed", "_conformance", "test_procedures", "_content_hash", "_fingerprint",
+                 "loaded_digest")
+
+    title = Fingerprinted("title")
+    text = Fingerprinted("text")
+    conformance = Fingerprinted("conformance")
+
+    created = Timestamp("created")
+    modified = Timestamp("modified")
+    deleted = Timestamp("deleted")
+    date = Timestamp("date")
+
+    def __init__(self, key=None, title=None, text=None, actor=None, source=None, version=None, process=None, conformance=None, status=None, test_procedures=None):
+        self.key = key
+        self.title = title
+        self.actor = actor or []
+        self.version = version
+        self.release_status = process or ReleaseState.NEW
+        self.status = status or PublicationStatus.ACTIVE
+        self.source = source
+        self.text = text
+        self._created = ""
+        self._modified = ""
+        self._deleted = ""
+        self._date = ""
+        self._created_parsed = self._modified_parsed = self._deleted_parsed = self._date_parsed = None
+        self.conformance = conformance or ""
+        self.test_procedures = test_procedures or {}
+
+        self._content_hash = ""
+        self._fingerprint = None
+        self.loaded_digest = None
 
     @property
-    def modified(self):
-        return self._to_datetime(value=self._modified)
+    def release_status(self):
+        state = self._release_status
+        return state.value if isinstance(state, ReleaseState) else state
 
-    @modified.setter
-    def modified(self, value):
-        self._modified = self._from_datetime(value=value)
+    @release_status.setter
+    def release_status(self, value):
+        self._release_status = value if isinstance(value, ReleaseState) else RELEASE_STATES.get(value, value)
 
     @property
-    def deleted(self):
-        return self._to_datetime(value=self._deleted)
+    def status(self):
+        state = self._status
+        return state.value if isinstance(state, PublicationStatus) else state
 
-    @deleted.setter
-    def deleted(self, value):
-        self._deleted = self._from_datetime(value=value)
+    @status.setter
+    def status(self, value):
+        self._status = value if isinstance(value, PublicationStatus) else PUBLICATION_STATES.get(value, value)
 
     @property
     def is_stable(self):
-        return self.release_status == ReleaseState.STABLE.value
+        return self._release_status is ReleaseState.STABLE
     
     @is_stable.setter
     @validate_type(bool)
     def is_stable(self, value: bool):
         if value:
-            self.release_status = ReleaseState.STABLE.value
-            self.status = PublicationStatus.ACTIVE.value
+            self._release_status = ReleaseState.STABLE
+            self._status = PublicationStatus.ACTIVE
 
     @property
     def is_new(self):
-        return self.release_status == ReleaseState.NEW.value
+        return self._release_status is ReleaseState.NEW
     
     @is_new.setter
     @validate_type(bool)
     def is_new(self, value: bool):
         if value:
-            self.release_status = ReleaseState.NEW.value
-            self.status = PublicationStatus.ACTIVE.value
+            self._release_status = ReleaseState.NEW
+            self._status = PublicationStatus.ACTIVE
 
     @property
     def is_modified(self):
-        return self.release_status == ReleaseState.MODIFIED.value
+        return self._release_status is ReleaseState.MODIFIED
     
     @is_modified.setter
     @validate_type(bool)
     def is_modified(self, value: bool):
         if value:
-            self.release_status = ReleaseState.MODIFIED.value
-            self.status = PublicationStatus.ACTIVE.value
+            self._release_status = ReleaseState.MODIFIED
+            self._status = PublicationStatus.ACTIVE
 
     @property
     def is_deleted(self):
-        return self.release_status == ReleaseState.DELETED.value or self.release_status == ReleaseState.MARKED_FOR_DELETION.value
+        return self._release_status is ReleaseState.DELETED or self._release_status is ReleaseState.MARKED_FOR_DELETION
     
     @is_deleted.setter
     @validate_type(bool)
     def is_deleted(self, value: bool):
         if value:
-            self.release_status = ReleaseState.DELETED.value
-            self.status = PublicationStatus.RETIRED.value
+            self._release_status = ReleaseState.DELETED
+            self._status = PublicationStatus.RETIRED
 
     @property
     def for_deletion(self):
-        return self.release_status == ReleaseState.MARKED_FOR_DELETION.value
+        return self._release_status is ReleaseState.MARKED_FOR_DELETION
     
     @for_deletion.setter
     @validate_type(bool)
     def for_deletion(self, value: bool):
         if value:
-            self.release_status = ReleaseState.MARKED_FOR_DELETION.value
-            self.status = PublicationStatus.RETIRED.value
+            self._release_status = ReleaseState.MARKED_FOR_DELETION
+            self._status = PublicationStatus.RETIRED
 
     @property
     def is_moved(self):
-        return self.release_status == ReleaseState.MOVED.value
+        return self._release_status is ReleaseState.MOVED
     
     @is_moved.setter
     @validate_type(bool)
     def is_moved(self, value: bool):
         if value:
-            self.release_status = ReleaseState.MOVED.value
-            self.status = PublicationStatus.ACTIVE.value
+            self._release_status = ReleaseState.MOVED
+            self._status = PublicationStatus.ACTIVE
 
     @property
     def actor_as_list(self):
@@ -167,32 +257,47 @@ class Requirement(object):
 
     @property
     def content_hash(self):
+        # The stored hash, else the fingerprint of the current content
         if self._content_hash:
             return self._content_hash
-        value, _ = normalize.build_requirement_fingerprint(self)
-        return value
+        # Memoized with its scheme, a switch of the scheme builds it again
+        memo = self._fingerprint
+        if memo is None or memo[0] != normalize.FINGERPRINT_SCHEME:
+            fingerprint, _ = normalize.build_requirement_fingerprint(self)
+            memo = self._fingerprint = (normalize.FINGERPRINT_SCHEME, fingerprint)
+        return memo[1]
 
     @content_hash.setter
     def content_hash(self, value):
         self._content_hash = value
 
-    def deserialize(self, data):
+    @property
+    def is_dirty(self):
+        # Requirements without a known loaded state are always written
+        return self.loaded_digest is None or self.loaded_digest != serialized_digest(self.serialize())
+
+    def deserialize(self, data, digest=None):
         if data is None:
             return self
+        self.loaded_digest = digest
         self.key = data.get('key')
-        self.title = data.get('title')
-        self.actor = data.get('actor', [])
-        self.test_procedures = data.get('test_procedures', {})
+        self._title = data.get('title')
+        self.actor = intern_list(data.get('actor', []))
+        self.test_procedures = intern_test_procedures(data.get('test_procedures', {}))
         self.version = data.get('version')
-        self.release_status = data.get('release_status')
-        self.status = data.get('status')
-        self.source = data.get('source')
-        self.text = data.get('text')
-        self.conformance = data.get('conformance', '')
+        release_status, status = data.get('release_status'), data.get('status')
+        self._release_status = RELEASE_STATES.get(release_status, release_status)
+        self._status = PUBLICATION_STATES.get(status, status)
+        self.source = intern_list(data.get('source'))
+        self._text = data.get('text')
+        self._conformance = intern_list(data.get('conformance', ''))
+        self._fingerprint = None
+        # The timestamps are parsed when they are accessed
         self._created = data.get('created', '')
         self._modified = data.get('modified', '')
         self._deleted = data.get('deleted', '')
         self._date = data.get('date', '')
+        self._created_parsed = self._modified_parsed = self._deleted_parsed = self._date_parsed = UNPARSED
         self._content_hash = data.get('content_hash', '')
         return self
 
@@ -224,7 +329,77 @@ class Release(object):
         self.name = name or ""
         self.version = version or ""
         self.requirements = []
-        self.archive = []
+        self._columns = None
+        self._archive = None
+        # Set by the ReleaseManager, the archive is loaded on first access
+        self.archive_loader = None
+        self.archive_keys_loader = None
+        # Set by the ReleaseManager for streamed releases, see iter_requirements
+        self.records_loader = None
+
+    @property
+    def requirements(self):
+        # A release loaded as columns or streamed builds its requirements on first access
+        if self._requirements is None:
+            if self._columns is not None:
+                self._requirements = self._columns.rows()
+            else:
+                self._requirements = list(self._iter_records())
+        return self._requirements
+
+    def iter_requirements(self):
+        """
+        The requirements one at a time. A streamed release reads them from
+        the store while they are iterated and does not keep them.
+        """
+        if self._requirements is None and self._columns is None:
+            return self._iter_records()
+        return iter(self.requirements)
+
+    def _iter_records(self):
+        # Stores yield serialized records or requirements (see RequirementStore.load_records)
+        for record in self.records_loader():
+            yield record if isinstance(record, Requirement) else Requirement().deserialize(record)
+
+    @requirements.setter
+    def requirements(self, value):
+        self._requirements = value
+        self._columns = None
+
+    @property
+    def columns(self):
+        """
+        Columnar view of the requirements (see ReleaseColumns). Once the
+        requirements were accessed, and possibly changed, it is built from them.
+        """
+        if self._columns is None or self._requirements is not None:
+            from .columns import ReleaseColumns
+            self._columns = ReleaseColumns(self.requirements)
+        return self._columns
+
+    @columns.setter
+    def columns(self, value):
+        self._columns = value
+        self._requirements = None
+
+    @property
+    def archive(self):
+        if self._archive is None:
+            self._archive = self.archive_loader() if self.archive_loader else []
+        return self._archive
+
+    @archive.setter
+    def archive(self, value):
+        self._archive = value
+
+    @property
+    def archive_keys(self):
+        """
+        Keys of the archived requirements, without loading the archive if possible.
+        """
+        if self._archive is None and self.archive_keys_loader:
+            return self.archive_keys_loader()
+        return [req.key for req in self.archive]
 
     def deserialize(self, data):
         self.name = data.get('name')
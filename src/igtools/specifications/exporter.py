@@ -1,10 +1,9 @@
 import os
-import json
-import yaml
 
-from ..utils import convert_to_link
+from ..utils import convert_to_link, stream
 from ..errors import ReleaseNotesOutputPathNotExists, ExportFormatUnknown
 from .release import ReleaseManager
+from .data import ReleaseState
 
 
 
@@ -18,18 +17,21 @@ class RequirementExporter:
 
     def export(self, output, with_deleted=False):
         if self.version is None or self.version == "current":
-            release = self.release_manager.load()
+            release = self.release_manager.load(streaming=True)
         else:
-            release = self.release_manager.load_version(version=self.version)
-        requirements = []
-        for req in release.requirements:
-            if req.is_deleted and not with_deleted:
+            release = self.release_manager.load_version(version=self.version, streaming=True)
+        self.save_export(output=output, data=self.export_records(release, with_deleted))
+
+    @staticmethod
+    def export_records(release, with_deleted=False):
+        # Read from the store while the export is written
+        for req in release.iter_requirements():
+            if not with_deleted and req.release_status == ReleaseState.DELETED.value:
                 continue
             data = req.serialize()
             data["path"] = convert_to_link(req.source)
             data["release"] = release.version
-            requirements.append(data)
-        self.save_export(output=output, data=requirements)
+            yield data
 
     @classmethod
     def generate_filename(cls, format, version):
@@ -70,9 +72,9 @@ class RequirementExporter:
         if not os.path.exists(out_dir):
             raise ReleaseNotesOutputPathNotExists(f"Path {out_dir} does not exists.")
         if file_format == 'JSON':
-            with open(filepath, 'w', encoding='utf-8') as file:
-                json.dump(data, file, indent=4, ensure_ascii=False)
+            with stream.atomic_output(filepath) as file:
+                stream.write_json(file, data)
         elif file_format == 'YAML':
-            with open(filepath, 'w', encoding='utf-8') as file:
-                yaml.dump(data, file, default_flow_style=False, allow_unicode=True)
+            with stream.atomic_output(filepath) as file:
+                stream.write_yaml_list(file, data)
         
@@ -0,0 +1,87 @@
+import os
+import json
+import hashlib
+
+from ..utils import transaction
+from .data import ReleaseState
+
+
+CHUNK_SIZE = 1 << 20
+
+
+def page_digest(file_path):
+    # Staged pages are read from the unit of work, the others streamed from disk
+    if transaction.is_staged(file_path):
+        return hashlib.sha256(transaction.read_bytes(file_path)).hexdigest()
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FrozenPages(object):
+    """
+    Manifest of the input pages of a frozen release, written next to the
+    config by 'release --freeze': the content digest of every page and the
+    keys of the requirements found in it.
+
+    A page with the same digest still holds the frozen requirements, only
+    added pages and pages whose digest changed have to be parsed to verify
+    the freeze.
+    """
+    FILENAME = "frozen-pages.json"
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.version = None
+        # file path -> dict(digest, keys)
+        self.pages = {}
+
+    @property
+    def filepath(self):
+        return os.path.join(self.directory, self.FILENAME)
+
+    def build(self, version, file_paths, columns):
+        keys = {}
+        for index in columns.where(exclude=[ReleaseState.DELETED]):
+            source = columns.sources[columns.source[index]]
+            keys.setdefault(source, []).append(str(columns.key(index)))
+        self.version = version
+        self.pages = {file_path: dict(digest=page_digest(file_path), keys=sorted(keys.get(file_path, [])))
+                      for file_path in file_paths}
+        return self
+
+    def load(self):
+        self.version = None
+        self.pages = {}
+        if not transaction.exists(self.filepath):
+            return self
+        try:
+            data = json.loads(transaction.read_text(self.filepath))
+        except (OSError, ValueError):
+            return self
+        self.version = data.get('version')
+        self.pages = data.get('pages', {})
+        return self
+
+    def save(self):
+        data = dict(version=self.version, pages=self.pages)
+        transaction.write_text(self.filepath, json.dumps(data, ensure_ascii=False, indent=2, sort_keys=True))
+
+    def remove(self):
+        if transaction.exists(self.filepath):
+            transaction.remove(self.filepath)
+
+    def changed(self, file_paths):
+        """
+        Pages that were added or whose content changed since the freeze.
+        Removed pages are not listed, their requirements stay in the release
+        as deleted ones.
+        """
+        changed = []
+        for file_path in file_paths:
+            page = self.pages.get(file_path)
+            if page is None or page.get('digest') != page_digest(file_path):
+                changed.append(file_path)
+        return changed
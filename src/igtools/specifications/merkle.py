@@ -0,0 +1,121 @@
+import json
+import bisect
+import hashlib
+
+
+# Hex digits of a key path, the children of a node
+DIGITS = "0123456789abcdef"
+
+
+def key_path(key):
+    # Position of a requirement in the tree, spreads keys sharing a prefix
+    return hashlib.sha256(str(key).encode("utf-8")).hexdigest()
+
+
+def leaf_hash(key, version, content_hash):
+    payload = json.dumps([key, version, content_hash], ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(b"L" + payload.encode("utf-8")).hexdigest()
+
+
+class ReleaseTree(object):
+    """
+    Merkle tree over (key, version, content hash) of the requirements of a
+    release. Requirements are bucketed by the hex digits of a digest of their
+    key: a node covers all keys whose path starts with its prefix, a node
+    with a single key is that key's leaf.
+
+    Node hashes are cached, changing a requirement only rehashes the nodes
+    on its path. Two trees are compared top down, only differing subtrees
+    are descended to name the keys that differ.
+    """
+
+    def __init__(self, entries=()):
+        # key -> leaf hash
+        self.leaves = {}
+        # sorted (path, key) of all keys
+        self.paths = []
+        # prefix -> node hash, None for empty nodes
+        self.nodes = {}
+        for key, version, content_hash in entries:
+            self.leaves[key] = leaf_hash(key, version, content_hash)
+        self.paths = sorted((key_path(key), key) for key in self.leaves)
+
+    @classmethod
+    def from_requirements(cls, requirements):
+        return cls((req.key, req.version, req.content_hash) for req in requirements)
+
+    @classmethod
+    def from_columns(cls, columns):
+        return cls(columns.entries())
+
+    def __len__(self):
+        return len(self.leaves)
+
+    def update(self, key, version, content_hash):
+        if key not in self.leaves:
+            bisect.insort(self.paths, (key_path(key), key))
+        self.leaves[key] = leaf_hash(key, version, content_hash)
+        self._invalidate(key)
+
+    def remove(self, key):
+        if self.leaves.pop(key, None) is not None:
+            path = key_path(key)
+            del self.paths[bisect.bisect_left(self.paths, (path, key))]
+            self._invalidate(key)
+
+    @property
+    def root(self):
+        return self.node("") or hashlib.sha256(b"E").hexdigest()
+
+    def buckets(self, depth=1):
+        # Hashes of the non-empty subtrees at 'depth', by key path prefix
+        prefixes = [""]
+        for _ in range(depth):
+            prefixes = [prefix + digit for prefix in prefixes for digit in DIGITS]
+        return {prefix: self.node(prefix) for prefix in prefixes if self.node(prefix) is not None}
+
+    def node(self, prefix):
+        if prefix in self.nodes:
+            return self.nodes[prefix]
+        start, end = self._range(prefix)
+        if start == end:
+            value = None
+        elif end - start == 1:
+            value = self.leaves[self.paths[start][1]]
+        else:
+            children = "".join(f"{digit}{self.node(prefix + digit)}" for digit in DIGITS
+                               if self.node(prefix + digit) is not None)
+            value = hashlib.sha256(b"N" + children.encode("ascii")).hexdigest()
+        self.nodes[prefix] = value
+        return value
+
+    def keys(self, prefix=""):
+        start, end = self._range(prefix)
+        return [key for _, key in self.paths[start:end]]
+
+    def diff(self, other, prefix=""):
+        """
+        Keys that are added, removed or changed between this tree and
+        'other', sorted.
+        """
+        if self.node(prefix) == other.node(prefix):
+            return []
+        mine, theirs = self._range(prefix), other._range(prefix)
+        if mine[1] - mine[0] <= 1 or theirs[1] - theirs[0] <= 1:
+            keys = set(self.keys(prefix)) | set(other.keys(prefix))
+            return sorted(key for key in keys if self.leaves.get(key) != other.leaves.get(key))
+        keys = []
+        for digit in DIGITS:
+            keys.extend(self.diff(other, prefix + digit))
+        return sorted(keys)
+
+    def _range(self, prefix):
+        # Positions of the keys below 'prefix' in the sorted paths
+        start = bisect.bisect_left(self.paths, (prefix,))
+        end = bisect.bisect_left(self.paths, (prefix + "g",))
+        return start, end
+
+    def _invalidate(self, key):
+        path = key_path(key)
+        for length in range(len(path) + 1):
+            self.nodes.pop(path[:length], None)
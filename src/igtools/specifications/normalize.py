@@ -4,6 +4,78 @@ import hashlib
 import html
 from typing import Dict, List, Tuple
 
+from ..errors import FingerprintSchemeUnknown
+
+
+def encode_json(canon) -> bytes:
+    # Stable JSON of the canonical fields
+    return json.dumps(canon, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def encode_binary(canon) -> bytes:
+    # The canonical fields in key order, each prefixed with its length
+    return "".join(f"{len(canon[name])}:{canon[name]}" for name in sorted(canon)).encode("utf-8")
+
+
+class FingerprintScheme(object):
+    """
+    How the canonical fields of a requirement are encoded and hashed to its
+    content hash. Content hashes of different schemes never match, a project
+    records its scheme in the config and changes it with a migration.
+    """
+
+    def __init__(self, name, encode, digest):
+        self.name = name
+        self.encode = encode
+        self.digest = digest
+
+    def hash(self, canon) -> str:
+        return self.digest(self.encode(canon)).hexdigest()
+
+
+SCHEMES = {
+    "sha256-json": FingerprintScheme("sha256-json", encode_json, hashlib.sha256),
+    "blake2b16-bin": FingerprintScheme("blake2b16-bin", encode_binary,
+                                       lambda data: hashlib.blake2b(data, digest_size=16)),
+}
+# Scheme of configurations written before the scheme was recorded
+LEGACY_SCHEME = "sha256-json"
+# Scheme of new configurations, other schemes are opt-in
+DEFAULT_SCHEME = LEGACY_SCHEME
+
+# Identifies how fingerprints are built; caches holding fingerprints are
+# dropped when it changes. Set from the config with use_scheme.
+FINGERPRINT_SCHEME = LEGACY_SCHEME
+active_scheme = SCHEMES[FINGERPRINT_SCHEME]
+
+
+def get_scheme(name) -> FingerprintScheme:
+    if name not in SCHEMES:
+        raise FingerprintSchemeUnknown(f"Unknown fingerprint scheme '{name}', supported schemes: {', '.join(SCHEMES)}")
+    return SCHEMES[name]
+
+
+def use_scheme(name) -> FingerprintScheme:
+    """
+    Build all following fingerprints with the scheme 'name'.
+    """
+    global FINGERPRINT_SCHEME, active_scheme
+    active_scheme = get_scheme(name)
+    FINGERPRINT_SCHEME = active_scheme.name
+    return active_scheme
+
+
+class FingerprintCounter(object):
+    # Number of requirement fingerprints computed, reported after each command
+    def __init__(self):
+        self.computed = 0
+
+    def reset(self):
+        self.computed = 0
+
+
+counter = FingerprintCounter()
+
 ZERO_WIDTH = (
     "\u200B"  # zero width space
     "\u200C"  # zero width non-joiner
@@ -21,33 +93,34 @@ ACTOR_BLOCK_RE = re.compile(r"<actor\b[^>]*?>.*?</actor>", re.IGNORECASE | re.DO
 # Remove generic HTML tags but keep their inner text (no BeautifulSoup to avoid reformatting)
 TAG_RE = re.compile(r"</?([a-zA-Z][a-zA-Z0-9]*)\b[^>]*>", re.DOTALL)
 
+# Non-rendered characters are dropped, NBSP becomes a space (it must not join
+# a "<" with a following tag name). Replaced one by one, str.translate has no
+# fast path for non-ASCII text.
+INVISIBLE_TABLE = tuple((char, "") for char in ZERO_WIDTH) + (("\u00AD", ""), ("\u00A0", " "))
+INVISIBLE_RE = re.compile(f"[{ZERO_WIDTH}\u00AD\u00A0]")
+
 def normalize_text_for_semantics(raw: str) -> str:
     """
     Make editorial changes vanish while preserving meaningful wording.
     - remove actor blocks (they are handled structurally)
-    - strip non-rendered characters (ZWSP, BOM)
     - unescape HTML entities (&amp; -> &)
-    - remove soft hyphens & NBSP
+    - strip non-rendered characters (ZWSP, BOM, soft hyphens), NBSP counts as whitespace
     - remove tags but keep inner text
-    - collapse whitespace runs to single spaces
-    - trim
+    - remove all whitespace and lowercase
+    The steps run in this order, each on the output of the previous one;
+    steps that cannot change the text are skipped.
     """
     if not raw:
         return ""
-    s = ACTOR_BLOCK_RE.sub("", raw)
-    s = html.unescape(s)
-    s = SOFT_HYPHEN_RE.sub("", s)
-    s = NBSP_RE.sub(" ", s)
-    s = ZW_RE.sub("", s)
-    s = TAG_RE.sub("", s)
-    s = re.sub(r"[ \t\f\r\v]+", " ", s)                     # collapse horizontal whitespace
-    s = re.sub(r"\s*\n\s*", " ", s)                         # collapse newlines to spaces
-    s = re.sub(r"\s{2,}", " ", s)                           # collapse leftover multi-spaces
-    s = s.replace("\r\n", "\n").replace("\r", "\n")         # 1) Newlines vereinheitlichen
-    s = s.strip(" ")                                        # 2) Nur normale Spaces am Anfang/Ende entfernen (keine anderen Whitespaces)
-    s = re.sub(r" {2,}", " ", s)                            # 3) Doppelte/mehrfache Spaces im Text zu einem Space machen
-    s = re.sub(r'\s+', '', s)
-    return s.strip().lower()
+    s = ACTOR_BLOCK_RE.sub("", raw) if "<" in raw else raw
+    if "&" in s:
+        s = html.unescape(s)
+    if INVISIBLE_RE.search(s):
+        for char, replacement in INVISIBLE_TABLE:
+            s = s.replace(char, replacement)
+    if "<" in s:
+        s = TAG_RE.sub("", s)
+    return "".join(s.split()).lower()
 
 def canonicalize_actors(actors: List[str]) -> List[str]:
     return sorted({a.strip() for a in (actors or []) if a and a.strip()})
@@ -77,9 +150,8 @@ def build_fingerprint(text, title, conformance, actors=None, test_procedures=Non
         # "test_procedures": canonicalize_test_procs(test_procedures or {}),
         "title": (title or "").strip(),
     }
-    # Stable JSON for hashing
-    payload = json.dumps(canon, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
-    h = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    h = active_scheme.hash(canon)
+    counter.computed += 1
     return h, canon
 
 
@@ -113,3 +185,19 @@ def build_fingerprint_release(requirements) -> str:
         })
     payload = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
     return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def build_fingerprint_columns(columns) -> str:
+    """
+    The fingerprint of build_fingerprint_release from a columnar view of the
+    release (see ReleaseColumns), without building the requirements.
+    """
+    data = []
+    for key, version, content_hash in columns.entries(columns.sort_by_key()):
+        data.append({
+            "version": version,
+            "key": key,
+            "hash": content_hash
+        })
+    payload = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
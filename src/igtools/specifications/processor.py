@@ -1,18 +1,20 @@
 import os
 import re
-import yaml
 import warnings
 from datetime import datetime
-from bs4 import BeautifulSoup
-from ..utils import id, utils
-from .data import Release, Requirement
+from concurrent.futures import ProcessPoolExecutor
+from ..utils import id, utils, transaction
+from .data import Requirement
 from ..errors import (NoReleaseVersionSetException, 
                       ReleaseNotFoundException, 
-                      ReleaseAlreadyExistsException, 
                       DuplicateRequirementIDException,
-                      FinalReleaseException)
+                      FrozenReleaseException)
 from . import normalize
 from . import release
+from . import scanner
+from . import cache
+from . import freeze
+from . import merkle
 
 
 warnings.simplefilter("ignore")
@@ -21,26 +23,33 @@ TRUE_VALUES = ["true", "True", "TRUE", "1"]
 
 
 class Processor:
-    def __init__(self, config, input=None):
+    def __init__(self, config, input=None, jobs=1, incremental=False):
         self.config = config
         self.release_manager = release.ReleaseManager(config)
         self._clean_up = False
         self.dry_run = False
         self.input_path = input or config.directory
         self.key_generator = None
+        self.jobs = (os.cpu_count() or 1) if jobs == 0 else max(jobs or 1, 1)
+        self.incremental = incremental
+        self.manifest = None
+        # Set while processing, FileProcessors fingerprint without it otherwise
+        self.fingerprints = None
 
     def is_process_file(self, file):
         return file.endswith(('.html', '.md'))
 
-    def check(self):
+    def check(self, release=None, pages=None):
         if not self.config.current:
             raise NoReleaseVersionSetException()
 
         if not os.path.exists(self.release_manager.release_directory(self.config.current)):
             raise ReleaseNotFoundException(f"Release version {self.config.current} does not exist.")
 
-        self._validate_requirements()
-        self._validate_input_files()
+        if release is None:
+            release = self.release_manager.load()
+        self._validate_requirements(release=release)
+        self._validate_input_files(release=release, pages=pages)
 
     def all_filepaths(self):
         file_paths = []
@@ -49,69 +58,185 @@ class Processor:
                 file_paths.append(os.path.join(root, file))
         return file_paths
 
-    def _validate_requirements(self):
-        release = self.release_manager.load()
+    def _validate_requirements(self, release=None):
+        if release is None:
+            release = self.release_manager.load()
+        # Only the keys of the archive are needed, its requirements are not loaded
         seen_keys = set()
 
-        for req in release.archive + release.requirements:
+        for key in release.archive_keys:
+            if key in seen_keys:
+                raise DuplicateRequirementIDException(f"Duplicate KEY detected: {key} in the archive")
+            seen_keys.add(key)
+
+        for req in release.requirements:
             if req.key in seen_keys:
                 raise DuplicateRequirementIDException(f"Duplicate KEY detected: {req.key} in file {req.source}")
             seen_keys.add(req.key)
 
-    def _validate_input_files(self):
-        seen_keys = set()
-        release = self.release_manager.load()
-
-        for req in release.archive:
-            seen_keys.add(req.key)
-
-        for file_path in self.all_filepaths():
-            with open(file_path, 'r', encoding='utf-8') as f:
-                soup = BeautifulSoup(f.read(), 'html.parser')
-
-            for soup_req in soup.find_all('requirement'):
-                if soup_req.has_attr('key'):
-                    req_key = soup_req['key']
+    def _validate_input_files(self, release=None, pages=None):
+        if release is None:
+            release = self.release_manager.load()
+        if pages is None:
+            pages = self.scan_pages()
+        seen_keys = set(release.archive_keys)
+
+        for file_path, page in pages.items():
+            for requirement_tag in page.tags:
+                if requirement_tag.has_attr('key'):
+                    req_key = requirement_tag['key']
                     if req_key and req_key in seen_keys:
                         raise DuplicateRequirementIDException(f"Duplicate ID detected in file {file_path}: {req_key}")
                     seen_keys.add(req_key)
 
     def process(self):
-        release = self.release_manager.load()
-        
+        self.fingerprints = cache.FingerprintCache(cache.cache_directory(self.config)).load()
         if self.release_manager.is_current_release_frozen():
-            requirements = self.process_requirements_from_files(release=release, dry_run=True)
-            self.release_manager.verify_release_integrity(requirements=requirements)
+            try:
+                self.verify_frozen()
+            finally:
+                self.fingerprints.save()
             return
-        self.check()
 
-        requirements = self.process_requirements_from_files(release=release, dry_run=False)
+        # The release is loaded and every page is read and parsed exactly once,
+        # validation and processing both run off these records.
+        release = self.release_manager.load()
+        pages = self.scan_pages()
+        self.check(release=release, pages=pages)
+
+        requirements = self.process_requirements_from_files(release=release, dry_run=False, pages=pages)
 
+        self.fingerprints.save()
         self.config.save()
         release.requirements = requirements
-        self.release_manager.save(release)
+        return self.release_manager.save(release)
+
+    def verify_frozen(self):
+        """
+        Verify the input pages against the frozen release, nothing is written.
+        With the page manifest of the freeze only added and changed pages are
+        parsed, otherwise all pages are processed in a dry run. Raises
+        FrozenReleaseException naming the changed requirements.
+        """
+        manifest = freeze.FrozenPages(self.config.path).load()
+        frozen_tree = self.config.frozen_tree
+        if manifest.version == self.config.current and frozen_tree:
+            release = self.release_manager.load(columnar=True)
+            stored = merkle.ReleaseTree.from_columns(release.columns)
+            # Unchanged pages match the stored release as long as it is the frozen one
+            if stored.root == frozen_tree.get('root'):
+                return self._verify_changed_pages(manifest.changed(self.all_filepaths()), release.columns, stored)
 
-    def process_requirements_from_files(self, release, dry_run=False):
+        release = self.release_manager.load()
+        requirements = self.process_requirements_from_files(release=release, dry_run=True, pages=self.scan_pages())
+        self.release_manager.verify_release_integrity(requirements=requirements)
+
+    def _verify_changed_pages(self, file_paths, columns, stored):
+        if not file_paths:
+            return
+        pages = self._scan_pages(file_paths)
+        rows = {str(key): index for index, key in enumerate(columns.keys)}
+        # Only the requirements of the parsed pages are built
+        existing_map = {}
+        for page in pages.values():
+            for requirement_tag in page.tags:
+                key = requirement_tag.get('key') if requirement_tag.has_attr('key') else None
+                if key in rows:
+                    existing_map[key] = columns.row(rows[key])
+        self.key_generator = id.create_generator(config=self.config, existing_keys=rows.keys())
+
+        keys, broken = [], []
+        for file_path, page in pages.items():
+            file_processor = FileProcessor(processor=self, file_path=file_path, existing_map=existing_map)
+            changed = [req.key for req in file_processor.apply(page.tags, content=page.content, dry_run=True)
+                       if stored.leaves.get(req.key) != merkle.leaf_hash(req.key, req.version, req.content_hash)]
+            page.content = None
+            if changed:
+                keys.extend(changed)
+                broken.append(file_path)
+        if keys:
+            raise FrozenReleaseException(keys=sorted(keys), pages=broken)
+
+    def process_requirements_from_files(self, release, dry_run=False, pages=None):
         existing_map = {req.key: req for req in release.requirements}
         self.key_generator = id.create_generator(config=self.config, existing_keys=existing_map.keys())
-        requirements = self._process_files(existing_map, dry_run=dry_run)
+        requirements = self._process_files(existing_map, dry_run=dry_run, pages=pages)
         self._detect_removed_requirements(requirements, existing_map)
         return requirements
 
-    def _process_files(self, existing_map, dry_run=False):
+    def scan_pages(self):
+        """
+        Read and parse all input pages, in parallel if requested. With
+        'incremental' unchanged pages are taken from the page manifest.
+        Returns the page entries by file path, in file order.
+        """
+        file_paths = self.all_filepaths()
+        self.manifest = None
+        if self.incremental:
+            self.manifest = cache.PageManifest(cache.cache_directory(self.config)).load()
+        return self._scan_pages(file_paths, manifest=self.manifest)
+
+    def _process_files(self, existing_map, dry_run=False, pages=None):
+        # Keys are assigned and the pages rewritten here, in the same
+        # file/offset order as a serial run.
+        if pages is None:
+            pages = self.scan_pages()
+        manifest = self.manifest
         requirements = []
 
-        for file_path in self.all_filepaths():
-            requirements.extend(
-                FileProcessor(
-                    processor=self,
-                    file_path=file_path,
-                    existing_map=existing_map
-                ).process(dry_run=dry_run)
+        for file_path, page in pages.items():
+            file_processor = FileProcessor(
+                processor=self,
+                file_path=file_path,
+                existing_map=existing_map
             )
-        
+            requirements.extend(file_processor.apply(page.tags, content=page.content, dry_run=dry_run))
+            # the page content is not needed anymore
+            page.content = None
+            if manifest is not None and file_processor.modified:
+                self._refresh_manifest(manifest, file_processor, dry_run=dry_run)
+
+        if manifest is not None:
+            manifest.save(list(pages))
         return requirements
 
+    def _scan_pages(self, file_paths, manifest=None):
+        pages = {}
+        pending = []
+        staged = []
+        for file_path in file_paths:
+            entry = manifest.lookup(file_path) if manifest is not None else None
+            if entry is None:
+                # The workers only see the pages on disk, not the staged writes
+                (staged if transaction.is_staged(file_path) else pending).append(file_path)
+            pages[file_path] = entry
+
+        if self.jobs > 1 and len(pending) > 1:
+            chunksize = max(1, len(pending) // (self.jobs * 4))
+            with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+                entries = list(executor.map(cache.scan_page, pending, chunksize=chunksize))
+        else:
+            entries = [cache.scan_page(file_path) for file_path in pending]
+        entries.extend(cache.scan_page(file_path) for file_path in staged)
+
+        for entry in entries:
+            pages[entry.file_path] = entry
+            if manifest is not None:
+                manifest.add(entry)
+        return pages
+
+    def _refresh_manifest(self, manifest, file_processor, dry_run=False):
+        # The records of a rewritten page no longer match the page on disk
+        if dry_run:
+            manifest.discard(file_processor.file_path)
+            return
+        tags = scanner.scan(file_processor.content, file_path=file_processor.file_path)
+        for tag, applied in zip(tags, file_processor.requirement_tags):
+            tag.fingerprint = applied.fingerprint
+        manifest.add(cache.PageEntry.from_content(file_path=file_processor.file_path,
+                                                  content=file_processor.content,
+                                                  tags=tags))
+
     def _detect_removed_requirements(self, requirements, existing_map):
         existing_keys = set(existing_map.keys())
         new_keys = {req.key for req in requirements}
@@ -141,32 +266,45 @@ class Processor:
 
 class FileProcessor:
 
-    # regex for the <requirement> tag
-    REQUIREMENT_PATTERN = re.compile(r'(<requirement\b[^>]*)(>.*?</requirement>)', re.DOTALL)
-    # tags to be stripped from the inner text
-    ACTOR_PATTERN = re.compile(r"<actor\b[^>]*/>|<actor\b[^>]*>.*?</actor>", re.IGNORECASE | re.DOTALL)
-    META_PATTERN = re.compile(r"<meta\b[^>]*/>|<meta\b[^>]*>.*?</meta>",   re.IGNORECASE | re.DOTALL)
-
     def __init__(self, processor, file_path, existing_map):
         self.processor = processor
         self.file_path = file_path
         self.existing_map = existing_map
         self.modified = False
         self.requirements = []
+        self.requirement_tags = []
+        self.content = None
 
     def process(self, dry_run=False):
-        with open(self.file_path, 'r', encoding='utf-8') as file:
-            original = file.read()
+        original = transaction.read_text(self.file_path)
+
+        return self.apply(scanner.scan(original, file_path=self.file_path), content=original, dry_run=dry_run)
 
+    def apply(self, requirement_tags, content=None, dry_run=False):
+        """
+        Update or create the requirements of already parsed records and write
+        the changed start tags back. The page is only read here if it has to
+        be rewritten and no content was passed.
+        """
         self.modified = False
         self.requirements = []
+        self.requirement_tags = requirement_tags
+        self.content = content
 
-        # Replace only the start requirement tag
-        updated_html = self.REQUIREMENT_PATTERN.sub(self._update_match, original)
+        for requirement_tag in requirement_tags:
+            req = self._update_or_create_requirement(requirement_tag, text=requirement_tag.text)
+            if req:
+                self.requirements.append(req)
+                if requirement_tag.render_start_tag() != requirement_tag.raw_start_tag:
+                    self.modified = True
 
         if self.modified and not dry_run:
-            with open(self.file_path, 'w', encoding='utf-8') as file:
-                file.write(updated_html)
+            if content is None:
+                content = transaction.read_text(self.file_path)
+            # Replace only the start requirement tag
+            updated_html = scanner.replace_start_tags(content, requirement_tags)
+            transaction.write_text(self.file_path, updated_html)
+            self.content = updated_html
 
         return self.requirements
 
@@ -174,15 +312,19 @@ class FileProcessor:
         """Generate next requirement key using the key generator"""
         return self.processor.key_generator.generate()
 
-    def update_existing_requirement(self, req, text, title, actor, conformance, test_procedures, meta=None):
+    def _fingerprint(self, text, title, conformance):
+        if self.processor.fingerprints is not None:
+            return self.processor.fingerprints.fingerprint(text, title, conformance)
+        fp, _ = normalize.build_fingerprint(text=text, title=title, conformance=conformance)
+        return fp
+
+    def update_existing_requirement(self, req, text, title, actor, conformance, test_procedures, meta=None, fingerprint=None):
         _now = datetime.now()
         actor = utils.to_list(actor)
         req.actor = utils.to_list(req.actor)
-        fp, _ = normalize.build_fingerprint(text=text,
-                                            title=title,
-                                            conformance=conformance,
-                                            actors=actor,
-                                            test_procedures=test_procedures)
+        fp = fingerprint
+        if fp is None:
+            fp = self._fingerprint(text, title, conformance)
 
         is_modified = req.content_hash != fp
         if is_modified:
@@ -248,53 +390,30 @@ class FileProcessor:
         req.date = datetime.now()
         return req
 
-    def _update_match(self, match: re.Match) -> str:
-        # nonlocal modified
-        start_tag, rest_of_tag = match.groups()
-
-        # Get the data from the xml tag
-        soup = BeautifulSoup(match.group(0), 'html.parser')
-        requirement_tag = soup.requirement  # Der gefundene <requirement>-Tag
-
-        inner_text = rest_of_tag[len(">"):-len("</requirement>")].strip()
-        inner_text = self.ACTOR_PATTERN.sub("", inner_text).strip()
-        inner_text = self.META_PATTERN.sub("", inner_text).strip()
-        req = self._update_or_create_requirement(requirement_tag, text=inner_text)
-        if req:
-            self.requirements.append(req)
-            # Extract the start tag
-            updated_start_tag = str(requirement_tag).split(">", 1)[0]
-            updated_requirement = updated_start_tag + rest_of_tag
-            if updated_requirement != match.group(0):
-                self.modified = True
-            return updated_requirement
-        # If no modification return original
-        return match.group(0)
-
-    def _update_or_create_requirement(self, soup_req, text=None):
+    def _update_or_create_requirement(self, requirement_tag, text=None):
         req_key = None
-        if soup_req.has_attr('key'):
-            req_key = soup_req['key']
+        if requirement_tag.has_attr('key'):
+            req_key = requirement_tag['key']
         if not req_key:
             req_key = self._next_key()
-            soup_req['key'] = req_key
+            requirement_tag['key'] = req_key
             id.add_id(req_key)
 
         if text is None:
-            text = soup_req.decode_contents().strip()
-        title = soup_req.get('title', "")
+            text = requirement_tag.text
+        title = requirement_tag.get('title', "")
 
-        actors = soup_req.get('actor', "")
+        actors = requirement_tag.get('actor', "")
         test_procedures = {}
 
-        if len(soup_req.find_all("actor")) > 0:
+        if len(requirement_tag.actors) > 0:
             actors = []
-            for actor_tag in soup_req.find_all("actor"):
+            for actor_tag in requirement_tag.actors:
                 if actor_tag.get("name"):
                     actors.append(actor_tag.get("name"))
                     test_ids = [
                         tp.get("id")
-                        for tp in actor_tag.find_all("testprocedure")
+                        for tp in actor_tag.test_procedures
                         if (tp.get("active") is None or tp.get("active").lower() in TRUE_VALUES)
                     ]
                     test_procedures[str(actor_tag.get("name"))] = sorted(set(test_ids))
@@ -302,22 +421,24 @@ class FileProcessor:
         if len(test_procedures) == 0:
             for actor in utils.to_list(actors):
                 test_procedures[str(actor)] = []
-        conformance = soup_req.get('conformance', "")
+        conformance = requirement_tag.get('conformance', "")
 
         meta = {"locakversion": False}
-        if len(soup_req.find_all("meta")) > 0:
-            for _meta in soup_req.find_all("meta"):
-                if _meta.has_attr("lockversion"):
-                    meta["lockversion"] = _meta.get("lockversion")
+        for _meta in requirement_tag.metas:
+            if "lockversion" in _meta:
+                meta["lockversion"] = _meta.get("lockversion")
 
         req = None
         if req_key in self.existing_map:
+            if requirement_tag.fingerprint is None:
+                requirement_tag.fingerprint = self._fingerprint(text, title, conformance)
             existing_req = self.existing_map[req_key]
-            req = self.update_existing_requirement(existing_req, text, title, actors, conformance, test_procedures, meta=meta)
+            req = self.update_existing_requirement(existing_req, text, title, actors, conformance, test_procedures, meta=meta,
+                                                   fingerprint=requirement_tag.fingerprint)
         else:
             req = self.create_new_requirement(req_key, text, title, actors, conformance, test_procedures)
         if req:
-            soup_req['version'] = req.version
+            requirement_tag['version'] = req.version
         
         return req
 
@@ -333,9 +454,8 @@ class ResetMetaTagsHelper:
         self.file_path = file_path
         self.modified = False
 
-    def replace_lock_attr_in_meta(self, meta_match: re.Match) -> str:
+    def replace_lock_attr_in_meta(self, tag: str) -> str:
         # Replaces the lockVersion/lockversion attribute value within a single <meta> tag.
-        tag = meta_match.group(0)
 
 
         def _repl(m: re.Match) -> str:
@@ -348,25 +468,29 @@ class ResetMetaTagsHelper:
             self.modified = True
         return new_tag
 
-    def update_match(self, req_match: re.Match) -> str:
+    def update_match(self, block: scanner.RequirementBlock) -> str:
         ####
         # Updates a <requirement> block:
         #   - start_tag: the opening <requirement ...>
         #   - rest_of_tag: everything up to and including </requirement>
         # Only <meta> tags inside the requirement block are modified.
         ####
-        start_tag, rest_of_tag = req_match.groups()
-        updated_rest = FileProcessor.META_PATTERN.sub(self.replace_lock_attr_in_meta, rest_of_tag)
-        return start_tag + updated_rest
+        rest_of_tag = block.rest
+        parts = []
+        pos = 0
+        for start, end in scanner.iter_element_spans(rest_of_tag, "meta"):
+            parts.append(rest_of_tag[pos:start])
+            parts.append(self.replace_lock_attr_in_meta(rest_of_tag[start:end]))
+            pos = end
+        parts.append(rest_of_tag[pos:])
+        return block.start_tag + "".join(parts)
 
     def reset(self):
-        with open(self.file_path, 'r', encoding='utf-8') as file:
-            original = file.read()
+        original = transaction.read_text(self.file_path)
         self.modified = False
 
-        updated = FileProcessor.REQUIREMENT_PATTERN.sub(self.update_match, original)
+        updated = scanner.substitute_requirements(original, self.update_match)
 
         if self.modified:
-            with open(self.file_path, 'w', encoding='utf-8') as file:
-                file.write(updated)
+            transaction.write_text(self.file_path, updated)
 
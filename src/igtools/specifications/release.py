@@ -6,6 +6,7 @@ from datetime import datetime
 from bs4 import BeautifulSoup
 from ..utils import id, utils
 from .data import Release, Requirement
+from .columns import ReleaseColumns
 from ..errors import (NoReleaseVersionSetException, 
                       ReleaseNotFoundException, 
                       ReleaseAlreadyExistsException, 
@@ -13,23 +14,30 @@ from ..errors import (NoReleaseVersionSetException,
                       FinalReleaseException,
                       FrozenReleaseException)
 from . import normalize
+from . import storage
+from . import merkle
+from . import freeze
 
 
 warnings.simplefilter("ignore")
 
 
 class ReleaseManager:
+    # Parsed YAML files, shared by all managers of one invocation
+    cache = storage.YamlRequirementStore.cache
+
     def __init__(self, config):
         self.config = config
+        self.store = storage.create_store(config)
 
     @property
     def directory(self):
         return os.path.join(self.config.path, "releases")
 
-    def load(self):
-        return self.load_version(self.config.current)
+    def load(self, columnar=False, streaming=False):
+        return self.load_version(self.config.current, columnar=columnar, streaming=streaming)
 
-    def load_version(self, version):
+    def load_version(self, version, changes_only=False, columnar=False, streaming=False):
         if version not in self.config.releases:
             if version is None:
                 error_msg = f"Release version is not set."
@@ -39,46 +47,59 @@ class ReleaseManager:
             raise ReleaseNotFoundException(error_msg)
         release = Release(name=self.config.name, version=version)
 
-        release.requirements = self._load_requirements(self.release_directory(version))
-        release.archive = self._load_requirements(self.archive_directory())
+        if streaming:
+            # Nothing is read until the requirements are iterated
+            directory = self.release_directory(version)
+            release.requirements = None
+            release.records_loader = lambda: self.store.iter_records(directory, changes_only)
+        elif columnar:
+            # Requirements are only built for the rows that are accessed
+            release.columns = ReleaseColumns(self.store.load_records(self.release_directory(version), changes_only))
+        elif changes_only:
+            # At least the requirements changed in this release, the delta
+            # store reads them without rebuilding the release
+            release.requirements = self.store.load_changes(self.release_directory(version))
+        else:
+            release.requirements = self._load_requirements(self.release_directory(version))
+        # The archive is only read when it is accessed
+        release.archive_loader = lambda: self._load_requirements(self.archive_directory())
+        release.archive_keys_loader = lambda: self.store.keys(self.archive_directory())
         return release
 
-    def _load_requirements(self, path):
-        if not os.path.exists(path):
-            return []
+    def find(self, key=None, source=None, release_status=None):
+        """
+        Requirements of all releases and the archive matching all given
+        filters, as (version, requirement) pairs; 'archive' for the archive.
+        """
+        versions = {self.release_directory(version): version for version in self.config.releases}
+        versions[self.archive_directory()] = "archive"
+        found = self.store.find(list(versions), key=key, source=source, release_status=release_status)
+        return [(versions[directory], requirement) for directory, requirement in found]
 
-        requirements = []
-        for file_name in filter(lambda f: f.endswith('.yaml'), os.listdir(path)):
-            with open(os.path.join(path, file_name), 'r', encoding='utf-8') as file:
-                requirements.append(Requirement().deserialize(yaml.safe_load(file)))
-        return requirements
+    def _load_requirements(self, path):
+        return self.store.load(path)
 
     def save(self, release):
-        release_dir = self.release_directory(release.version)
-        os.makedirs(release_dir, exist_ok=True)
-
-        for requirement in release.requirements:
-            if requirement.for_deletion:
-                self.delete_requirement(requirement=requirement, directory=release_dir)
-            else:
-                self.save_requirement(requirement=requirement, directory=release_dir)
+        """
+        Write the changed requirements of a release and delete the ones marked
+        for deletion. Requirements unchanged since they were loaded are skipped.
+        """
+        return self.store.save(self.release_directory(release.version), release.requirements)
 
     def delete_requirement(self, requirement, directory):
-        file_path = os.path.join(directory, f"{requirement.key}.yaml")
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        return self.store.delete(directory, [requirement]) > 0
 
     def save_requirement(self, requirement, directory):
-        file_path = os.path.join(directory, f"{requirement.key}.yaml")
-        with open(file_path, 'w', encoding='utf-8') as file:
-            yaml.dump(requirement.serialize(), file, default_flow_style=False, allow_unicode=True)
+        return self.store.save(directory, [requirement]).written > 0
 
     def archive(self, requirements):
-        archive_dir = self.archive_directory()
-        os.makedirs(archive_dir, exist_ok=True)
+        return self.store.save(self.archive_directory(), requirements)
 
-        for requirement in requirements:
-            self.save_requirement(requirement, archive_dir)
+    def collect_garbage(self):
+        # Data of all storage formats, a conversion leaves that of the old one behind
+        directories = [self.release_directory(version) for version in self.config.releases]
+        directories.append(self.archive_directory())
+        return sum(store(self.config).collect_garbage(directories) for store in storage.STORES.values())
 
     def archive_directory(self):
         return os.path.join(self.directory, 'archive')
@@ -101,6 +122,10 @@ class ReleaseManager:
             release = self.load()
 
         stable_requirements, archive_requirements = self._categorize_requirements(release, version)
+        # Requirements that stay as they are are linked into the new release,
+        # only the changed ones are written
+        if self.config.current is not None:
+            self.store.link(self.release_directory(self.config.current), self.release_directory(version), stable_requirements)
         self.save(release)
         self.archive(archive_requirements)
 
@@ -124,21 +149,31 @@ class ReleaseManager:
 
         return stable_requirements, archive_requirements
     
-    def freeze_release(self):
+    def freeze_release(self, pages=None):
+        """
+        Freeze the current release. With the input 'pages' the digests of the
+        pages are recorded as well, so the freeze is verified without parsing
+        the unchanged ones.
+        """
         if self.config.current is None:
             raise NoReleaseVersionSetException()
         elif not os.path.exists(self.release_directory(self.config.current)):
             raise ReleaseNotFoundException(f"Release version {self.config.current} does not exist.")
         self.raise_if_frozen()
-        release = self.load()
-        self.config.frozen_hash = normalize.build_fingerprint_release(requirements=release.requirements)
+        release = self.load(columnar=True)
+        self.config.frozen_hash = normalize.build_fingerprint_columns(release.columns)
+        self.config.frozen_tree = self.frozen_tree(merkle.ReleaseTree.from_columns(release.columns))
         self.config.frozen_version = self.config.current
+        if pages is not None:
+            freeze.FrozenPages(self.config.path).build(self.config.current, pages, release.columns).save()
         self.config.save()
 
     def unfreeze_release(self):
         if self.is_current_release_frozen():
             self.config.frozen_hash = None
+            self.config.frozen_tree = None
             self.config.frozen_version = None
+            freeze.FrozenPages(self.config.path).remove()
             self.config.save()
 
     def is_current_release_frozen(self):
@@ -153,7 +188,35 @@ class ReleaseManager:
 
     def verify_release_integrity(self, requirements):
         if self.is_current_release_frozen():
-            release_hash = normalize.build_fingerprint_release(requirements=requirements)
-            if self.config.frozen_hash != release_hash:
-                raise FrozenReleaseException()
-
+            frozen_tree = self.config.frozen_tree
+            if not frozen_tree:
+                # Frozen before the tree was recorded, only the release hash is known
+                release_hash = normalize.build_fingerprint_release(requirements=requirements)
+                if self.config.frozen_hash != release_hash:
+                    raise FrozenReleaseException()
+                return
+            tree = merkle.ReleaseTree.from_requirements(requirements)
+            if tree.root != frozen_tree.get('root'):
+                raise FrozenReleaseException(keys=self.changed_keys(tree, frozen_tree))
+
+    @staticmethod
+    def frozen_tree(tree):
+        return dict(root=tree.root, buckets=tree.buckets())
+
+    def changed_keys(self, tree, frozen_tree):
+        """
+        Keys of the requirements in 'tree' that differ from the frozen release.
+        The stored release is the frozen state as long as its tree matches the
+        recorded one, otherwise all keys of the differing buckets are reported.
+        """
+        stored = merkle.ReleaseTree.from_columns(self.load(columnar=True).columns)
+        if stored.root == frozen_tree.get('root'):
+            return tree.diff(stored)
+        buckets = frozen_tree.get('buckets', {})
+        current = tree.buckets()
+        keys = set()
+        for prefix in set(buckets) | set(current):
+            if buckets.get(prefix) != current.get(prefix):
+                keys.update(tree.keys(prefix))
+                keys.update(stored.keys(prefix))
+        return sorted(keys)
@@ -1,9 +1,11 @@
 import os
-import json
+from packaging.version import Version
 
 from .release import ReleaseManager
+from .data import ReleaseState
+from . import cache
 from ..errors import ReleaseNotesOutputPathNotExists, ExportFormatUnknown
-from ..utils import convert_to_link
+from ..utils import convert_to_link, stream
 
 
 
@@ -24,30 +26,65 @@ class ReleaseNoteManager(object):
             filepath = os.path.join(output, base)
         return filepath
 
-    def generate(self, output):
-        releases = []
-        for version in self.config.releases:
-            release = dict(version=version, requirements=[])
-            data = self.release_manager.load_version(version=version)
-            for req in data.requirements:
-                if req.is_stable:
-                    continue
-                release['requirements'].append(dict(
-                    title=req.title,
-                    key=req.key,
-                    actor=req.actor_as_list,
-                    version=req.version,
-                    release_status=req.release_status.upper(),
-                    status=req.status.upper(),
-                    conformance=req.conformance,
-                    path=convert_to_link(req.source)
-                ))
-            releases.append(release)
-        
+    def generate(self, output, last=None):
+        """
+        Write the release notes of all releases, or of the 'last' ones. The
+        notes of past releases are read from the cache unless their stored
+        requirements changed, only the current release is always loaded.
+        """
+        versions = list(self.config.releases)
+        if last is not None:
+            if last < 1:
+                raise ValueError(f"The number of releases must be positive, got {last}")
+            # config.releases is sorted as strings, the last ones are picked by version
+            selected = set(sorted(versions, key=Version)[-last:])
+            versions = [version for version in versions if version in selected]
+        notes_cache = cache.ReleaseNotesCache(cache.cache_directory(self.config)).load()
+        # The releases are written one by one as they are generated
+        releases = (dict(version=version, requirements=self.release_notes(version, notes_cache))
+                    for version in reversed(versions))
+
         notes = dict(
-            releases=list(reversed(releases))
+            releases=releases
         )
         self.save_export(output=output, data=notes)
+        notes_cache.save()
+
+    def release_notes(self, version, notes_cache=None):
+        if notes_cache is None or version == self.config.current:
+            return self._release_notes(version, streaming=notes_cache is not None)
+        digest = self.release_manager.store.digest(self.release_manager.release_directory(version))
+        requirements = notes_cache.lookup(version, digest)
+        if requirements is None:
+            requirements = self._release_notes(version)
+            notes_cache.add(version, digest, requirements)
+        return requirements
+
+    def _release_notes(self, version, streaming=False):
+        """
+        The notes of the requirements changed in 'version'. With 'streaming'
+        they are produced one at a time while they are written.
+        """
+        if streaming:
+            data = self.release_manager.load_version(version=version, changes_only=True, streaming=True)
+            return self._notes(req for req in data.iter_requirements() if not req.is_stable)
+        data = self.release_manager.load_version(version=version, changes_only=True, columnar=True)
+        columns = data.columns
+        return list(self._notes(columns.rows(columns.where(exclude=[ReleaseState.STABLE]))))
+
+    @staticmethod
+    def _notes(requirements):
+        for req in requirements:
+            yield dict(
+                title=req.title,
+                key=req.key,
+                actor=req.actor_as_list,
+                version=req.version,
+                release_status=req.release_status.upper(),
+                status=req.status.upper(),
+                conformance=req.conformance,
+                path=convert_to_link(req.source)
+            )
 
     def save_export(self, output, data):
         ext_map = {
@@ -65,8 +102,8 @@ class ReleaseNoteManager(object):
             raise ReleaseNotesOutputPathNotExists(f"Path {dir_path} does not exist.")
 
         if file_format == 'JSON':
-            with open(filepath, 'w', encoding='utf-8') as file:
-                json.dump(data, file, indent=4, ensure_ascii=False)
+            with stream.atomic_output(filepath) as file:
+                stream.write_json(file, data)
         else:
             raise ExportFormatUnknown(f"The format {file_format} is not supported.")
 
@@ -0,0 +1,498 @@
+import re
+from html import unescape
+
+from ..errors import RequirementParseException
+
+
+REQUIREMENT_TAG = "requirement"
+
+# Start of a <requirement> block (same boundary rule as the former
+# REQUIREMENT_PATTERN: <requirement\b)
+REQUIREMENT_START_RE = re.compile(r"<requirement\b")
+REQUIREMENT_END = "</requirement>"
+
+# Tag name and attribute grammar of the tolerant html.parser tokenizer,
+# so attribute values come out exactly as BeautifulSoup would report them.
+TAGNAME_RE = re.compile(r"([a-zA-Z][^\t\n\r\f />\x00]*)(?:\s|/(?!>))*")
+ATTRIBUTE_RE = re.compile(
+    r"((?<=['\"\s/])[^\s/>][^\s/=>]*)(\s*=+\s*"
+    r"('[^']*'|\"[^\"]*\"|(?![\'\"])[^>\s]*))?(?:\s|/(?!>))*"
+)
+START_TAG_END_RE = re.compile(r"""
+  <[a-zA-Z][^\t\n\r\f />\x00]*
+  (?:[\s/]*
+    (?:(?<=['"\s/])[^\s/>][^\s/=>]*
+      (?:\s*=+\s*
+        (?:'[^']*'
+          |"[^"]*"
+          |(?!['"])[^>\s]*
+         )
+        \s*
+       )?(?:\s|/(?!>))*
+     )*
+   )?
+  \s*
+""", re.VERBOSE)
+ENDTAG_RE = re.compile(r"</\s*([a-zA-Z][-.a-zA-Z0-9:_]*)\s*>")
+COMMENT_CLOSE_RE = re.compile(r"--\s*>")
+
+# Elements which are closed right after their start tag (html.parser tree builder)
+VOID_ELEMENTS = frozenset([
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link",
+    "menuitem", "meta", "param", "source", "track", "wbr", "basefont", "bgsound",
+    "command", "frame", "image", "isindex", "nextid", "spacer"
+])
+# Elements whose content is raw text until the matching end tag
+RAW_TEXT_ELEMENTS = ("script", "style")
+# Attributes BeautifulSoup treats as whitespace separated lists on every tag
+LIST_ATTRIBUTES = frozenset(["class", "accesskey", "dropzone"])
+
+WHITESPACE_RE = re.compile(r"\S+")
+
+
+class _Finder(object):
+    """
+    Memoized forward search for a literal or a pattern.
+
+    Queries must come with non-decreasing start positions. Because the
+    answer for a start position stays valid for every later start up to that
+    answer, each character of the text is examined at most once for a finder,
+    which keeps a whole scan linear even when blocks are never closed.
+    """
+
+    def __init__(self, text, needle, end=None):
+        self.text = text
+        self.end = len(text) if end is None else end
+        self.regex = needle if hasattr(needle, "search") else None
+        self.needle = needle
+        self.start = -1
+        self.found = None
+
+    def find(self, pos):
+        if self.found is not None and self.start <= pos:
+            if self.found[0] == -1 or self.found[0] >= pos:
+                return self.found
+        if self.regex is not None:
+            m = self.regex.search(self.text, pos, self.end)
+            self.found = (m.start(), m.end()) if m else (-1, -1)
+        else:
+            idx = self.text.find(self.needle, pos, self.end)
+            self.found = (idx, idx + len(self.needle)) if idx >= 0 else (-1, -1)
+        self.start = pos
+        return self.found
+
+
+class RequirementBlock(object):
+    """
+    One <requirement ...>...</requirement> occurrence inside a page.
+
+    - start: offset of '<requirement'
+    - start_tag_end: offset of the '>' closing the start tag
+    - end: offset right after '</requirement>'
+    """
+
+    def __init__(self, content, start, start_tag_end, end):
+        self.content = content
+        self.start = start
+        self.start_tag_end = start_tag_end
+        self.end = end
+
+    @property
+    def raw(self):
+        return self.content[self.start:self.end]
+
+    @property
+    def start_tag(self):
+        return self.content[self.start:self.start_tag_end]
+
+    @property
+    def rest(self):
+        return self.content[self.start_tag_end:self.end]
+
+    @property
+    def contents(self):
+        return self.content[self.start_tag_end + 1:self.end - len(REQUIREMENT_END)]
+
+    def inner_text(self):
+        # The requirement text without the structural <actor> and <meta> children
+        text = self.contents.strip()
+        text = strip_elements(text, "actor").strip()
+        text = strip_elements(text, "meta").strip()
+        return text
+
+
+class ActorTag(object):
+
+    def __init__(self, attrs):
+        self.attrs = attrs
+        self.test_procedures = []
+
+    def get(self, key, default=None):
+        return self.attrs.get(key, default)
+
+    def serialize(self):
+        return dict(attrs=self.attrs, test_procedures=self.test_procedures)
+
+    def deserialize(self, data):
+        self.attrs = data.get('attrs', {})
+        self.test_procedures = data.get('test_procedures', [])
+        return self
+
+
+class RequirementTag(object):
+    """
+    The parsed <requirement> start tag plus the <actor>, <testProcedure> and
+    <meta> descendants of the block. Attribute access mirrors a bs4 Tag.
+
+    Only plain data is kept (offsets into the page, the original start tag
+    and the inner text), so records can be passed between processes and the
+    page can be rewritten later without parsing it again.
+    """
+
+    def __init__(self, attrs, actors=None, metas=None, text="", start=0, start_tag_end=0, end=0, raw_start_tag=""):
+        self.attrs = attrs
+        self.actors = actors or []
+        self.metas = metas or []
+        self.text = text
+        self.start = start
+        self.start_tag_end = start_tag_end
+        self.end = end
+        self.raw_start_tag = raw_start_tag
+        # Semantic fingerprint of text, title and conformance, once computed
+        self.fingerprint = None
+
+    def has_attr(self, key):
+        return key in self.attrs
+
+    def get(self, key, default=None):
+        return self.attrs.get(key, default)
+
+    def __getitem__(self, key):
+        return self.attrs[key]
+
+    def __setitem__(self, key, value):
+        self.attrs[key] = value
+
+    def render_start_tag(self):
+        # Start tag without the closing '>', serialized like bs4's minimal formatter
+        parts = [f"<{REQUIREMENT_TAG}"]
+        for key, value in sorted(self.attrs.items()):
+            parts.append(f" {key}={quote_attribute_value(value)}")
+        return "".join(parts)
+
+    def serialize(self):
+        return dict(
+            attrs={key: str(value) for key, value in self.attrs.items()},
+            actors=[actor.serialize() for actor in self.actors],
+            metas=self.metas,
+            text=self.text,
+            start=self.start,
+            start_tag_end=self.start_tag_end,
+            end=self.end,
+            raw_start_tag=self.raw_start_tag,
+            fingerprint=self.fingerprint
+        )
+
+    def deserialize(self, data):
+        self.attrs = data.get('attrs', {})
+        self.actors = [ActorTag(attrs={}).deserialize(a) for a in data.get('actors', [])]
+        self.metas = data.get('metas', [])
+        self.text = data.get('text', "")
+        self.start = data.get('start', 0)
+        self.start_tag_end = data.get('start_tag_end', 0)
+        self.end = data.get('end', 0)
+        self.raw_start_tag = data.get('raw_start_tag', "")
+        self.fingerprint = data.get('fingerprint')
+        return self
+
+
+def quote_attribute_value(value):
+    value = str(value).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    if '"' in value:
+        if "'" in value:
+            return '"' + value.replace('"', "&quot;") + '"'
+        return "'" + value + "'"
+    return '"' + value + '"'
+
+
+def iter_requirement_blocks(content):
+    """
+    Yield every RequirementBlock of a page in document order.
+
+    Matches exactly what the regex (<requirement\\b[^>]*)(>.*?</requirement>)
+    with DOTALL matched, but without its quadratic behaviour on start tags
+    that are never closed.
+    """
+    gt = _Finder(content, ">")
+    closing = _Finder(content, REQUIREMENT_END)
+    pos = 0
+    while True:
+        m = REQUIREMENT_START_RE.search(content, pos)
+        if not m:
+            return
+        start = m.start()
+        tag_end, _ = gt.find(m.end())
+        if tag_end == -1:
+            return
+        close_start, close_end = closing.find(tag_end + 1)
+        if close_start == -1:
+            return
+        yield RequirementBlock(content, start, tag_end, close_end)
+        pos = close_end
+
+
+def substitute_requirements(content, repl):
+    """
+    Replace each requirement block with repl(block); returns the new content.
+    """
+    parts = []
+    pos = 0
+    for block in iter_requirement_blocks(content):
+        parts.append(content[pos:block.start])
+        parts.append(repl(block))
+        pos = block.end
+    if pos == 0:
+        return content
+    parts.append(content[pos:])
+    return "".join(parts)
+
+
+def scan(content, file_path=None):
+    """
+    Parse every requirement block of a page into RequirementTag records.
+    A block whose start tag is not a valid tag raises, it would otherwise
+    be taken as a removed requirement.
+    """
+    tags = []
+    for block in iter_requirement_blocks(content):
+        tag = parse_requirement(block)
+        if tag is None:
+            line = content.count("\n", 0, block.start) + 1
+            raise RequirementParseException(f"Malformed requirement start tag in {file_path or 'page'}, "
+                                            f"line {line}: {block.start_tag[:80]!r}")
+        tags.append(tag)
+    return tags
+
+
+def replace_start_tags(content, tags):
+    """
+    Write the (updated) start tags of the records back into the page content.
+    """
+    parts = []
+    pos = 0
+    for tag in tags:
+        parts.append(content[pos:tag.start])
+        parts.append(tag.render_start_tag())
+        pos = tag.start_tag_end
+    parts.append(content[pos:])
+    return "".join(parts)
+
+
+def iter_element_spans(text, name):
+    """
+    Yield (start, end) of every element matched by
+    <name\\b[^>]*/>|<name\\b[^>]*>.*?</name> (IGNORECASE, DOTALL) in linear time.
+    """
+    opening = re.compile(rf"<{name}\b", re.IGNORECASE)
+    gt = _Finder(text, ">")
+    closing = _Finder(text, re.compile(rf"</{name}>", re.IGNORECASE))
+    pos = 0
+    for m in opening.finditer(text):
+        if m.start() < pos:
+            continue
+        tag_end, _ = gt.find(m.end())
+        if tag_end == -1:
+            return
+        if text[tag_end - 1] == "/":
+            pos = tag_end + 1
+            yield m.start(), pos
+            continue
+        close_start, close_end = closing.find(tag_end + 1)
+        if close_start == -1:
+            continue
+        pos = close_end
+        yield m.start(), pos
+
+
+def strip_elements(text, name):
+    parts = []
+    pos = 0
+    for start, end in iter_element_spans(text, name):
+        parts.append(text[pos:start])
+        pos = end
+    if pos == 0:
+        return text
+    parts.append(text[pos:])
+    return "".join(parts)
+
+
+def parse_attributes(text, start, end):
+    """
+    Parse the start tag text[start:end] (end right after '>').
+
+    Returns (name, attrs, self_closing) or None when html.parser would treat
+    the markup as text instead of a tag.
+    """
+    m = TAGNAME_RE.match(text, start + 1, end)
+    if not m:
+        return None
+    name = m.group(1).lower()
+    attrs = {}
+    k = m.end()
+    while k < end:
+        m = ATTRIBUTE_RE.match(text, k, end)
+        if not m:
+            break
+        attrname, rest, value = m.group(1, 2, 3)
+        if not rest:
+            value = ""
+        elif value[:1] == "'" == value[-1:] or value[:1] == '"' == value[-1:]:
+            value = value[1:-1]
+        if value:
+            value = unescape(value)
+        attrs[attrname.lower()] = value
+        k = m.end()
+    tail = text[k:end].strip()
+    if tail not in (">", "/>"):
+        return None
+    for key in LIST_ATTRIBUTES.intersection(attrs):
+        attrs[key] = " ".join(WHITESPACE_RE.findall(attrs[key]))
+    return name, attrs, tail == "/>"
+
+
+def find_start_tag_end(text, start, end):
+    """
+    Offset right after the start tag at text[start] ('<' + letter), or -1 if
+    html.parser would find it incomplete within text[:end].
+
+    Follows html.parser's check_for_whole_start_tag, so degenerate markup
+    such as a quote right after the tag name or a '=' without an attribute
+    name ends the tag at the same '>' as in BeautifulSoup.
+    """
+    m = START_TAG_END_RE.match(text, start, end)
+    j = m.end()
+    nxt = text[j:j + 1] if j < end else ""
+    if nxt == ">":
+        return j + 1
+    if text.startswith("/>", j, end):
+        return j + 2
+    if nxt in ("", "=", "/") or (nxt.isascii() and nxt.isalpha()):
+        return -1
+    return j
+
+
+def parse_requirement(block):
+    """
+    Build the RequirementTag of a block the way html.parser + bs4 would see
+    the fragment: attributes of the start tag, <actor> elements in document
+    order with the <testProcedure> elements nested inside them and all <meta>
+    elements. Returns None if the start tag is not a valid tag.
+    """
+    content = block.content
+    parsed = parse_attributes(content, block.start, block.start_tag_end + 1)
+    if parsed is None or parsed[0] != REQUIREMENT_TAG:
+        return None
+    _, attrs, self_closing = parsed
+    tag = RequirementTag(attrs=attrs,
+                         text=block.inner_text(),
+                         start=block.start,
+                         start_tag_end=block.start_tag_end,
+                         end=block.end,
+                         raw_start_tag=block.start_tag)
+    if self_closing:
+        return tag
+
+    actors, metas, test_procedures = tag.actors, tag.metas, []
+    # Open elements as [name, actor, first test procedure index]
+    stack = [[REQUIREMENT_TAG, None, 0]]
+    open_count = {REQUIREMENT_TAG: 1}
+    already_closed = {}
+    end = block.end - len(REQUIREMENT_END)
+
+    def close(name):
+        if not open_count.get(name):
+            return
+        while stack:
+            entry = stack.pop()
+            open_count[entry[0]] -= 1
+            if entry[1] is not None:
+                entry[1].test_procedures = test_procedures[entry[2]:]
+            if entry[0] == name:
+                return
+
+    comment_close = _Finder(content, COMMENT_CLOSE_RE, end)
+    gt = _Finder(content, ">", end)
+    # Start tags may run past </requirement>, which is part of the fragment
+    tag_gt = _Finder(content, ">", block.end)
+    pos = block.start_tag_end + 1
+    while stack:
+        lt = content.find("<", pos, end)
+        if lt == -1:
+            break
+        nxt = content[lt + 1:lt + 2]
+        if nxt.isascii() and nxt.isalpha():
+            stop = find_start_tag_end(content, lt, block.end)
+            if stop == -1:
+                # Incomplete at the end of the input: text up to the next '>'
+                pos = tag_gt.find(lt + 1)[0] + 1
+                continue
+            pos = stop
+            parsed = parse_attributes(content, lt, stop)
+            if parsed is None:
+                continue
+            name, element_attrs, self_closing = parsed
+            entry = [name, None, len(test_procedures)]
+            if name == "actor":
+                entry[1] = ActorTag(element_attrs)
+                actors.append(entry[1])
+            elif name == "testprocedure":
+                test_procedures.append(element_attrs)
+            elif name == "meta":
+                metas.append(element_attrs)
+            stack.append(entry)
+            open_count[name] = open_count.get(name, 0) + 1
+            if self_closing:
+                close(name)
+            elif name in VOID_ELEMENTS:
+                close(name)
+                already_closed[name] = already_closed.get(name, 0) + 1
+            elif name in RAW_TEXT_ELEMENTS:
+                raw_end = re.compile(rf"</\s*{name}\s*>", re.IGNORECASE).search(content, pos, end)
+                if not raw_end:
+                    break
+                pos = raw_end.end()
+                close(name)
+        elif nxt == "/":
+            m = ENDTAG_RE.match(content, lt, end)
+            if m:
+                name, pos = m.group(1).lower(), m.end()
+            else:
+                m = TAGNAME_RE.match(content, lt + 2, end)
+                stop, _ = gt.find(lt + 2)
+                if stop == -1:
+                    break
+                pos = stop + 1
+                if not m:
+                    continue
+                name = m.group(1).lower()
+            if already_closed.get(name):
+                already_closed[name] -= 1
+            else:
+                close(name)
+        elif content.startswith("<!--", lt):
+            _, stop = comment_close.find(lt + 4)
+            if stop == -1:
+                break
+            pos = stop
+        elif nxt in ("!", "?"):
+            stop, _ = gt.find(lt + 2)
+            if stop == -1:
+                break
+            pos = stop + 1
+        else:
+            pos = lt + 1
+
+    for entry in stack:
+        if entry[1] is not None:
+            entry[1].test_procedures = test_procedures[entry[2]:]
+    return tag
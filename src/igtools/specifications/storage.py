@@ -0,0 +1,1156 @@
+import os
+import copy
+import time
+import pathlib
+import json
+import yaml
+import hashlib
+import sqlite3
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from packaging.version import Version, InvalidVersion
+
+from ..versioning import __VERSION__
+from ..errors import StorageFormatUnknown, StorageCorruptedException
+from ..utils import transaction
+from .data import Requirement, encode_serialized, encoded_digest, serialized_digest
+from . import cache
+
+
+DEFAULT_STORAGE = "yaml"
+
+class RequirementFileCache(object):
+    """
+    Parsed requirement YAML files, keyed by directory and validated against
+    the mtime and size of every file.
+
+    Within one invocation the data is kept in memory. Across invocations a
+    JSON snapshot per directory (see 'snapshot') spares the YAML parsing
+    of all unchanged files. The YAML files stay the source of truth.
+
+    Callers get fresh Requirement objects built from copies of the cached
+    data, so mutating a loaded release never changes the cache. As for the
+    page manifest, files modified within cache.RACY_WINDOW_NS of when they
+    were recorded are verified by their content digest.
+    """
+    # Entries are (signature, data, digest of data, recorded_ns, content digest)
+    SNAPSHOT_FORMAT = 4
+
+    def __init__(self):
+        self.directories = {}
+        self.dirty = set()
+
+    def clear(self):
+        self.directories = {}
+        self.dirty = set()
+
+    def load(self, path, snapshot=None):
+        directory = os.path.abspath(path)
+        cached = self.directories.get(directory)
+        if cached is None:
+            cached = self._read_snapshot(snapshot) if snapshot else {}
+        entries = {}
+        changed = directory in self.dirty
+        requirements = []
+        for file_name in filter(lambda f: f.endswith('.yaml'), transaction.listdir(path)):
+            file_path = os.path.join(path, file_name)
+            signature = self._signature(file_path)
+            entry = self._validate(cached.get(file_name), file_path, signature)
+            if entry is None:
+                text = transaction.read_text(file_path)
+                data = yaml.safe_load(text)
+                entry = (signature, data, serialized_digest(data), time.time_ns(), cache.content_digest(text))
+                changed = True
+            elif entry is not cached.get(file_name):
+                changed = True
+            if signature is not None:
+                entries[file_name] = entry
+            requirements.append(Requirement().deserialize(copy.deepcopy(entry[1]), digest=entry[2]))
+        changed = changed or len(entries) != len(cached)
+        self.directories[directory] = entries
+        if snapshot and changed and entries:
+            self._write_snapshot(snapshot, entries)
+        self.dirty.discard(directory)
+        return requirements
+
+    def iter_records(self, path, snapshot=None):
+        """
+        The data of the requirement files of 'path' one at a time, taken from
+        the cached or snapshot entries still valid and parsed for the others.
+        Unlike load() nothing is added to the cache.
+        """
+        cached = self.directories.get(os.path.abspath(path))
+        shared = cached is not None
+        if not shared:
+            cached = self._read_snapshot(snapshot) if snapshot else {}
+        for file_name in filter(lambda f: f.endswith('.yaml'), transaction.listdir(path)):
+            file_path = os.path.join(path, file_name)
+            # Snapshot entries are dropped once yielded, cached ones are copied
+            entry = cached.get(file_name) if shared else cached.pop(file_name, None)
+            entry = self._validate(entry, file_path, self._signature(file_path))
+            if entry is None:
+                yield yaml.safe_load(transaction.read_text(file_path))
+            else:
+                yield copy.deepcopy(entry[1]) if shared else entry[1]
+
+    def store(self, file_path, data, text, digest=None):
+        # 'text' is the content written to the file
+        self._record(file_path, data, digest or serialized_digest(data), cache.content_digest(text))
+
+    def _record(self, file_path, data, digest, content_digest):
+        directory = os.path.abspath(os.path.dirname(file_path))
+        entries = self.directories.setdefault(directory, {})
+        signature = self._signature(file_path)
+        if signature is None:
+            entries.pop(os.path.basename(file_path), None)
+        else:
+            entries[os.path.basename(file_path)] = (signature, copy.deepcopy(data), digest,
+                                                    time.time_ns(), content_digest)
+        self.dirty.add(directory)
+
+    def _lookup(self, file_path):
+        # The valid entry of a file, None if it is not cached or changed since
+        entries = self.directories.get(os.path.abspath(os.path.dirname(file_path)), {})
+        name = os.path.basename(file_path)
+        entry = self._validate(entries.get(name), file_path, self._signature(file_path))
+        if entry is not None:
+            entries[name] = entry
+        return entry
+
+    def _validate(self, entry, file_path, signature):
+        """
+        'entry' if it still holds the content of the file, refreshed once it
+        is verified outside the racy window, None otherwise.
+        """
+        if entry is None or signature is None or entry[0] != signature:
+            return None
+        # Staged files are only changed through the unit of work
+        if signature[0] == "staged" or entry[3] - signature[0] >= cache.RACY_WINDOW_NS:
+            return entry
+        # Modified within the timestamp granularity of when it was recorded,
+        # a second edit of the same size would have the same signature
+        if entry[4] != cache.content_digest(transaction.read_text(file_path)):
+            return None
+        now = time.time_ns()
+        if now - signature[0] >= cache.RACY_WINDOW_NS:
+            return entry[:3] + (now, entry[4])
+        return entry
+
+    def digest(self, file_path):
+        """
+        Digest of the data a file was loaded or saved with, None if the file
+        is not cached or changed since.
+        """
+        entry = self._lookup(file_path)
+        return None if entry is None else entry[2]
+
+    def copy(self, source, target):
+        """
+        Take over the cached data of 'source' for its copy 'target'. Returns
+        False if 'source' is not cached or changed since.
+        """
+        entry = self._lookup(source)
+        if entry is None:
+            return False
+        self._record(target, entry[1], entry[2], entry[4])
+        return True
+
+    def discard(self, file_path):
+        directory = os.path.abspath(os.path.dirname(file_path))
+        entries = self.directories.get(directory)
+        if entries is not None:
+            entries.pop(os.path.basename(file_path), None)
+        self.dirty.add(directory)
+
+    def _signature(self, file_path):
+        return transaction.signature(file_path)
+
+    def _read_snapshot(self, snapshot):
+        # A missing, broken or outdated snapshot is ignored, the YAML files are parsed
+        try:
+            data = json.loads(transaction.read_bytes(snapshot))
+            if not isinstance(data, dict) or data.get('version') != str(__VERSION__) \
+                    or data.get('format') != self.SNAPSHOT_FORMAT:
+                return {}
+            return self._snapshot_entries(data.get('entries'))
+        except (OSError, ValueError, EOFError):
+            return {}
+
+    @staticmethod
+    def _snapshot_entries(entries):
+        if not isinstance(entries, dict):
+            raise ValueError("Snapshot entries are not a mapping")
+        result = {}
+        for file_name, entry in entries.items():
+            if not (isinstance(entry, list) and len(entry) == 5 and isinstance(entry[0], list)
+                    and isinstance(entry[1], dict) and isinstance(entry[2], str)
+                    and isinstance(entry[3], int) and isinstance(entry[4], str)):
+                raise ValueError(f"Malformed snapshot entry {file_name}")
+            result[file_name] = (tuple(entry[0]), entry[1], entry[2], entry[3], entry[4])
+        return result
+
+    def _write_snapshot(self, snapshot, entries):
+        # Files written by a pending unit of work get their signature on commit.
+        # Data JSON cannot hold (e.g. unquoted YAML dates) is parsed again next time.
+        encoded = []
+        for name, entry in entries.items():
+            if entry[0][0] == "staged":
+                continue
+            try:
+                encoded.append(f"{json.dumps(name)}: {json.dumps(list(entry), ensure_ascii=False)}")
+            except (TypeError, ValueError):
+                continue
+        content = (f'{{"version": {json.dumps(str(__VERSION__))}, "format": {self.SNAPSHOT_FORMAT}, '
+                   f'"entries": {{{", ".join(encoded)}}}}}')
+        try:
+            cache.ensure_cache_directory(os.path.dirname(os.path.dirname(snapshot)))
+            os.makedirs(os.path.dirname(snapshot), exist_ok=True)
+            transaction.write_cache(snapshot, content)
+        except OSError:
+            pass
+
+
+class LRUCache(object):
+    """
+    Least recently used values by key, at most 'maxsize' of them and, with
+    'maxbytes', at most that total of sizeof(value).
+    """
+
+    def __init__(self, maxsize=8192, maxbytes=None, sizeof=len):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.pop(key)
+        self.entries[key] = value
+        if self.maxbytes is not None:
+            self.size += self.sizeof(value)
+        while len(self.entries) > self.maxsize or (self.maxbytes is not None and self.size > self.maxbytes
+                                                   and len(self.entries) > 1):
+            self._evict(next(iter(self.entries)))
+
+    def pop(self, key):
+        if key in self.entries:
+            self._evict(key)
+
+    def _evict(self, key):
+        value = self.entries.pop(key)
+        if self.maxbytes is not None:
+            self.size -= self.sizeof(value)
+
+
+class SaveResult(object):
+
+    def __init__(self):
+        self.written = 0
+        self.skipped = 0
+        self.deleted = 0
+
+    def __str__(self):
+        return f"{self.written} written, {self.skipped} unchanged, {self.deleted} deleted"
+
+
+class RequirementStore(ABC):
+    """
+    Storage backend for the requirements of one directory, either a release
+    directory or the archive.
+    """
+    name = None
+
+    def __init__(self, config):
+        self.config = config
+
+    @abstractmethod
+    def exists(self, directory):
+        # True if the directory holds requirements in this format
+        pass
+
+    @abstractmethod
+    def load(self, directory):
+        pass
+
+    def keys(self, directory):
+        # Keys of the stored requirements, subclasses avoid loading them
+        return [requirement.key for requirement in self.load(directory)]
+
+    def load_changes(self, directory):
+        """
+        At least all requirements of the directory that changed against the
+        previous release; stores without deltas return all requirements.
+        """
+        return self.load(directory)
+
+    def load_records(self, directory, changes_only=False):
+        """
+        The requirements of the directory for a columnar view (see
+        ReleaseColumns): their serialized data if the store can read it without
+        building Requirement objects, the requirements otherwise.
+        """
+        return self.load_changes(directory) if changes_only else self.load(directory)
+
+    def iter_records(self, directory, changes_only=False):
+        """
+        The records (or requirements) of load_records one at a time. Stores
+        that can read them one by one do so without keeping them all.
+        """
+        yield from self.load_records(directory, changes_only)
+
+    @abstractmethod
+    def save(self, directory, requirements):
+        """
+        Write the changed requirements and delete the ones marked for deletion.
+        Requirements unchanged since they were loaded are skipped.
+        """
+        pass
+
+    @abstractmethod
+    def delete(self, directory, requirements):
+        pass
+
+    def link(self, source, directory, requirements):
+        """
+        Prepare 'directory' with the stored state of the requirements of
+        'source' that did not change since they were loaded, so the following
+        save() only writes the changed ones. Returns the number of requirements
+        taken over; stores without per-requirement files take over none.
+        """
+        return 0
+
+    @abstractmethod
+    def clear(self, directory):
+        # Remove all requirement files of this format from the directory
+        pass
+
+    def collect_garbage(self, directories):
+        """
+        Remove the shared data none of the given directories (all release
+        directories and the archive) refers to anymore. Returns the number of
+        removed files; stores without shared data remove none.
+        """
+        return 0
+
+    def digest(self, directory):
+        """
+        Content digest of what is stored for the directory, it changes
+        whenever a requirement of the directory is saved or deleted. Stores
+        keeping deltas only cover the directory itself, not the releases it
+        is based on.
+        """
+        digest = hashlib.sha256()
+        if transaction.isdir(directory):
+            for name in sorted(transaction.listdir(directory)):
+                path = os.path.join(directory, name)
+                if transaction.isdir(path):
+                    continue
+                data = transaction.read_bytes(path)
+                digest.update(f"{name}\0{len(data)}\0".encode("utf-8"))
+                digest.update(data)
+        return digest.hexdigest()
+
+    def find(self, directories, key=None, source=None, release_status=None):
+        """
+        Requirements of the given directories matching all given filters, as
+        (directory, requirement) pairs.
+        """
+        found = []
+        for directory in directories:
+            for requirement in self.load(directory):
+                if key is not None and requirement.key != key:
+                    continue
+                if source is not None and requirement.source != source:
+                    continue
+                if release_status is not None and requirement.release_status != release_status:
+                    continue
+                found.append((directory, requirement))
+        return found
+
+
+class YamlRequirementStore(RequirementStore):
+    """
+    One '<KEY>.yaml' file per requirement, the default layout.
+    """
+    name = "yaml"
+
+    # Shared by all stores of one invocation
+    cache = RequirementFileCache()
+
+    def requirement_path(self, requirement, directory):
+        return os.path.join(directory, f"{requirement.key}.yaml")
+
+    def exists(self, directory):
+        return transaction.isdir(directory) and any(f.endswith('.yaml') for f in transaction.listdir(directory))
+
+    def load(self, directory):
+        if not transaction.exists(directory):
+            return []
+        return self.cache.load(directory, snapshot=self.snapshot_path(directory))
+
+    def keys(self, directory):
+        # The file names are the keys
+        if not transaction.exists(directory):
+            return []
+        return [f[:-len('.yaml')] for f in transaction.listdir(directory) if f.endswith('.yaml')]
+
+    def iter_records(self, directory, changes_only=False):
+        # File by file without adding them to the shared cache, which would keep them all
+        if not transaction.exists(directory):
+            return
+        yield from self.cache.iter_records(directory, snapshot=self.snapshot_path(directory))
+
+    def snapshot_path(self, directory):
+        # .igtools/cache/releases/<directory>.json
+        return os.path.join(cache.cache_directory(self.config), "releases", f"{os.path.basename(directory)}.json")
+
+    def save(self, directory, requirements):
+        transaction.makedirs(directory)
+        result = SaveResult()
+
+        for requirement in requirements:
+            if requirement.for_deletion:
+                result.deleted += self.delete(directory, [requirement])
+            elif self.save_requirement(requirement=requirement, directory=directory, skip_unchanged=True):
+                result.written += 1
+            else:
+                result.skipped += 1
+        return result
+
+    def delete(self, directory, requirements):
+        deleted = 0
+        for requirement in requirements:
+            file_path = self.requirement_path(requirement, directory)
+            if transaction.exists(file_path):
+                transaction.remove(file_path)
+                deleted += 1
+            self.cache.discard(file_path)
+        return deleted
+
+    def link(self, source, directory, requirements):
+        transaction.makedirs(directory)
+        linked = 0
+        for requirement in requirements:
+            if requirement.loaded_digest is None or requirement.is_dirty:
+                continue
+            source_path = self.requirement_path(requirement, source)
+            # Only files still holding the loaded state are shared
+            if self.cache.digest(source_path) != requirement.loaded_digest:
+                continue
+            target_path = self.requirement_path(requirement, directory)
+            transaction.link(source_path, target_path)
+            self.cache.copy(source_path, target_path)
+            linked += 1
+        return linked
+
+    def save_requirement(self, requirement, directory, skip_unchanged=False):
+        file_path = self.requirement_path(requirement, directory)
+        data = requirement.serialize()
+        digest = serialized_digest(data)
+        # Unchanged since loaded and the file still holds the loaded state
+        if skip_unchanged and digest == requirement.loaded_digest and self.cache.digest(file_path) == digest:
+            return False
+        self._unshare(file_path)
+        text = yaml.dump(data, default_flow_style=False, allow_unicode=True)
+        transaction.write_text(file_path, text)
+        requirement.loaded_digest = digest
+        self.cache.store(file_path, data, text, digest=digest)
+        return True
+
+    def _unshare(self, file_path):
+        # A hardlinked file belongs to other releases too, never write through
+        # it. A unit of work replaces the file on commit instead.
+        if transaction.active() is not None:
+            return
+        try:
+            if os.stat(file_path).st_nlink > 1:
+                os.remove(file_path)
+        except OSError:
+            pass
+
+    def clear(self, directory):
+        if not transaction.isdir(directory):
+            return
+        for file_name in filter(lambda f: f.endswith('.yaml'), transaction.listdir(directory)):
+            file_path = os.path.join(directory, file_name)
+            transaction.remove(file_path)
+            self.cache.discard(file_path)
+
+
+class PackedRequirementStore(RequirementStore):
+    """
+    All requirements of a directory in one 'requirements.jsonl' file: one
+    canonical JSON record per line, sorted by key so git diffs stay readable.
+    """
+    name = "packed"
+    FILENAME = "requirements.jsonl"
+
+    def file_path(self, directory):
+        return os.path.join(directory, self.FILENAME)
+
+    def exists(self, directory):
+        return transaction.exists(self.file_path(directory))
+
+    def load(self, directory):
+        requirements = []
+        if not self.exists(directory):
+            return requirements
+        for line in transaction.read_text(self.file_path(directory)).split("\n"):
+            if line:
+                requirements.append(Requirement().deserialize(json.loads(line), digest=encoded_digest(line)))
+        return requirements
+
+    def keys(self, directory):
+        return list(self._read(directory))
+
+    def load_records(self, directory, changes_only=False):
+        if not self.exists(directory):
+            return []
+        return [json.loads(line) for line in transaction.read_text(self.file_path(directory)).split("\n") if line]
+
+    def iter_records(self, directory, changes_only=False):
+        if not self.exists(directory):
+            return
+        # A staged file only exists in the unit of work
+        if transaction.is_staged(self.file_path(directory)):
+            yield from self.load_records(directory, changes_only)
+            return
+        with open(self.file_path(directory), 'r', encoding='utf-8') as file:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+    def save(self, directory, requirements):
+        records = self._read(directory)
+        result = SaveResult()
+
+        for requirement in requirements:
+            if requirement.for_deletion:
+                if records.pop(requirement.key, None) is not None:
+                    result.deleted += 1
+                continue
+            line = encode_serialized(requirement.serialize())
+            if records.get(requirement.key) == line:
+                result.skipped += 1
+            else:
+                records[requirement.key] = line
+                result.written += 1
+            requirement.loaded_digest = encoded_digest(line)
+
+        if result.written or result.deleted or not self.exists(directory):
+            self._write(directory, records)
+        return result
+
+    def delete(self, directory, requirements):
+        records = self._read(directory)
+        deleted = 0
+        for requirement in requirements:
+            if records.pop(requirement.key, None) is not None:
+                deleted += 1
+        if deleted:
+            self._write(directory, records)
+        return deleted
+
+    def clear(self, directory):
+        if self.exists(directory):
+            transaction.remove(self.file_path(directory))
+
+    def _read(self, directory):
+        # key -> record line
+        records = {}
+        if not self.exists(directory):
+            return records
+        for line in transaction.read_text(self.file_path(directory)).split("\n"):
+            if line:
+                records[json.loads(line)['key']] = line
+        return records
+
+    def _write(self, directory, records):
+        transaction.makedirs(directory)
+        transaction.write_text(self.file_path(directory), "".join(f"{records[key]}\n" for key in sorted(records)))
+
+
+class SqliteRequirementStore(RequirementStore):
+    """
+    All release directories and the archive in one SQLite database
+    ('releases/releases.db'), one row per requirement and directory. The
+    directories themselves are kept as markers of the releases.
+    """
+    name = "sqlite"
+    FILENAME = "releases.db"
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS requirements (
+            release TEXT NOT NULL,
+            key TEXT NOT NULL,
+            source TEXT,
+            release_status TEXT,
+            version INTEGER,
+            digest TEXT NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (release, key)
+        );
+        CREATE INDEX IF NOT EXISTS requirements_key ON requirements (key);
+        CREATE INDEX IF NOT EXISTS requirements_source ON requirements (source);
+        CREATE INDEX IF NOT EXISTS requirements_release_status ON requirements (release_status);
+    """
+    UPSERT = """
+        INSERT INTO requirements (release, key, source, release_status, version, digest, data)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (release, key) DO UPDATE SET
+            source = excluded.source,
+            release_status = excluded.release_status,
+            version = excluded.version,
+            digest = excluded.digest,
+            data = excluded.data
+    """
+
+    def __init__(self, config):
+        super().__init__(config)
+        self._connection = None
+        self._connected_path = None
+        self._connected_writable = False
+
+    @property
+    def database_path(self):
+        return os.path.join(self.config.path, "releases", self.FILENAME)
+
+    @property
+    def connection(self):
+        """
+        Connection for reading. Within a unit of work a written database is a
+        working copy, opened as written; the database itself is only read
+        ('mode=ro'), so commands holding the shared lock never write to it.
+        """
+        path = transaction.resolve(self.database_path)
+        return self._connect(path, writable=path != self.database_path)
+
+    def writable(self):
+        transaction.makedirs(os.path.dirname(self.database_path))
+        transaction.working_copy(self.database_path)
+        transaction.before_commit(self.close)
+        return self._connect(transaction.resolve(self.database_path), writable=True)
+
+    def _connect(self, path, writable):
+        if self._connection is not None and self._connected_path == path \
+                and (self._connected_writable or not writable):
+            return self._connection
+        self.close()
+        if writable:
+            if path == self.database_path:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._connection = sqlite3.connect(path)
+            # The schema is only created where the database is written
+            with self._connection:
+                self._connection.executescript(self.SCHEMA)
+        else:
+            self._connection = sqlite3.connect(f"{pathlib.Path(os.path.abspath(path)).as_uri()}?mode=ro", uri=True)
+        self._connected_path = path
+        self._connected_writable = writable
+        return self._connection
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+        self._connection = None
+        self._connected_path = None
+        self._connected_writable = False
+
+    def release(self, directory):
+        return os.path.basename(os.path.normpath(directory))
+
+    def exists(self, directory):
+        if not transaction.exists(self.database_path):
+            return False
+        row = self.connection.execute("SELECT 1 FROM requirements WHERE release = ? LIMIT 1",
+                                      (self.release(directory),)).fetchone()
+        return row is not None
+
+    def load(self, directory):
+        if not transaction.exists(self.database_path):
+            return []
+        rows = self.connection.execute("SELECT data, digest FROM requirements WHERE release = ? ORDER BY key",
+                                       (self.release(directory),))
+        return [Requirement().deserialize(json.loads(data), digest=digest) for data, digest in rows]
+
+    def load_records(self, directory, changes_only=False):
+        if not transaction.exists(self.database_path):
+            return []
+        rows = self.connection.execute("SELECT data FROM requirements WHERE release = ? ORDER BY key",
+                                       (self.release(directory),))
+        return [json.loads(data) for data, in rows]
+
+    def iter_records(self, directory, changes_only=False):
+        if not transaction.exists(self.database_path):
+            return
+        rows = self.connection.execute("SELECT data FROM requirements WHERE release = ? ORDER BY key",
+                                       (self.release(directory),))
+        for data, in rows:
+            yield json.loads(data)
+
+    def keys(self, directory):
+        if not transaction.exists(self.database_path):
+            return []
+        rows = self.connection.execute("SELECT key FROM requirements WHERE release = ? ORDER BY key",
+                                       (self.release(directory),))
+        return [key for key, in rows]
+
+    def digest(self, directory):
+        # The rows carry the digests of their data, the directory is only a marker
+        digest = hashlib.sha256()
+        if transaction.exists(self.database_path):
+            rows = self.connection.execute("SELECT key, digest FROM requirements WHERE release = ? ORDER BY key",
+                                           (self.release(directory),))
+            for key, row_digest in rows:
+                digest.update(f"{key}\0{row_digest}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    def save(self, directory, requirements):
+        transaction.makedirs(directory)
+        release = self.release(directory)
+        connection = self.writable()
+        digests = dict(connection.execute("SELECT key, digest FROM requirements WHERE release = ?", (release,)))
+        result = SaveResult()
+        upserts, deletions = [], []
+
+        for requirement in requirements:
+            if requirement.for_deletion:
+                if digests.pop(requirement.key, None) is not None:
+                    deletions.append((release, requirement.key))
+                continue
+            data = requirement.serialize()
+            encoded = encode_serialized(data)
+            digest = encoded_digest(encoded)
+            if digests.get(requirement.key) == digest:
+                result.skipped += 1
+            else:
+                digests[requirement.key] = digest
+                upserts.append((release, requirement.key, requirement.source, requirement.release_status,
+                                requirement.version, digest, encoded))
+            requirement.loaded_digest = digest
+
+        # One transaction for the whole release
+        with connection:
+            connection.executemany(self.UPSERT, upserts)
+            connection.executemany("DELETE FROM requirements WHERE release = ? AND key = ?", deletions)
+        result.written = len(upserts)
+        result.deleted = len(deletions)
+        return result
+
+    def delete(self, directory, requirements):
+        release = self.release(directory)
+        connection = self.writable()
+        with connection:
+            cursor = connection.executemany("DELETE FROM requirements WHERE release = ? AND key = ?",
+                                                 [(release, requirement.key) for requirement in requirements])
+        return cursor.rowcount
+
+    def clear(self, directory):
+        if transaction.exists(self.database_path):
+            connection = self.writable()
+            with connection:
+                connection.execute("DELETE FROM requirements WHERE release = ?", (self.release(directory),))
+
+    def find(self, directories, key=None, source=None, release_status=None):
+        if not transaction.exists(self.database_path):
+            return []
+        by_release = {self.release(directory): directory for directory in directories}
+        conditions = [f"release IN ({', '.join('?' * len(by_release))})"]
+        parameters = list(by_release)
+        for column, value in (("key", key), ("source", source), ("release_status", release_status)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                parameters.append(value)
+        rows = self.connection.execute(
+            f"SELECT release, data, digest FROM requirements WHERE {' AND '.join(conditions)} ORDER BY release, key",
+            parameters)
+        return [(by_release[release], Requirement().deserialize(json.loads(data), digest=digest))
+                for release, data, digest in rows]
+
+
+class BlobRequirement(Requirement):
+    """
+    Requirement of the blob store that reads its blob on first access: until
+    then only the key and the blob digest are set, the unset slots of
+    Requirement fall through to __getattr__.
+    """
+    __slots__ = ("_store", "_blob")
+
+    def __init__(self, store, key, digest):
+        self._store = store
+        self._blob = digest
+        self.key = key
+        self.loaded_digest = digest
+
+    @property
+    def is_resolved(self):
+        return self._blob is None
+
+    def resolve(self):
+        if self._blob is not None:
+            digest, self._blob = self._blob, None
+            self.deserialize(json.loads(self._store.read_blob(digest)), digest=digest)
+        return self
+
+    def __getattr__(self, name):
+        if name in ("_store", "_blob") or self._blob is None:
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+
+    def __setattr__(self, name, value):
+        # Set before the blob is read, a value would be overwritten by it
+        if name not in ("_store", "_blob", "key", "loaded_digest") and getattr(self, "_blob", None) is not None:
+            self.resolve()
+        object.__setattr__(self, name, value)
+
+
+class BlobRequirementStore(RequirementStore):
+    """
+    Content-addressed requirements: every distinct serialized requirement is
+    stored once as a blob under '.igtools/blobs/', named by its digest. A
+    release directory only holds 'requirements.index' with one
+    '<key> <digest>' line per requirement, sorted by key, so unchanged
+    requirements are shared by all releases.
+
+    Loaded requirements read their blob on first access (see BlobRequirement).
+    Blobs no index refers to anymore are removed by collect_garbage.
+    """
+    name = "blobs"
+    FILENAME = "requirements.index"
+
+    # Shared by all stores of one invocation, blobs of up to 64 MiB in total
+    cache = LRUCache(maxsize=8192, maxbytes=64 * 2**20)
+
+    @property
+    def blob_directory(self):
+        return os.path.join(self.config.path, "blobs")
+
+    def blob_path(self, digest):
+        return os.path.join(self.blob_directory, digest[:2], f"{digest}.json")
+
+    def index_path(self, directory):
+        return os.path.join(directory, self.FILENAME)
+
+    def exists(self, directory):
+        return transaction.exists(self.index_path(directory))
+
+    def keys(self, directory):
+        return list(self._read_index(directory))
+
+    def load(self, directory):
+        index = self._read_index(directory)
+        return [BlobRequirement(self, key, index[key]) for key in sorted(index)]
+
+    def load_records(self, directory, changes_only=False):
+        index = self._read_index(directory)
+        return [json.loads(self.read_blob(index[key])) for key in sorted(index)]
+
+    def iter_records(self, directory, changes_only=False):
+        index = self._read_index(directory)
+        for key in sorted(index):
+            yield json.loads(self.read_blob(index[key]))
+
+    def read_blob(self, digest):
+        encoded = self.cache.get(digest)
+        if encoded is None:
+            encoded = transaction.read_text(self.blob_path(digest))
+            self.cache.put(digest, encoded)
+        return encoded
+
+    def write_blob(self, digest, encoded):
+        # Blobs never change, an existing blob is not written again
+        file_path = self.blob_path(digest)
+        if not transaction.exists(file_path):
+            transaction.makedirs(os.path.dirname(file_path))
+            transaction.write_text(file_path, encoded)
+        self.cache.put(digest, encoded)
+
+    def save(self, directory, requirements):
+        index = self._read_index(directory)
+        result = SaveResult()
+
+        for requirement in requirements:
+            if isinstance(requirement, BlobRequirement) and not requirement.is_resolved \
+                    and index.get(requirement.key) == requirement.loaded_digest:
+                # Never accessed since it was loaded, so unchanged
+                result.skipped += 1
+                continue
+            if requirement.for_deletion:
+                if index.pop(requirement.key, None) is not None:
+                    result.deleted += 1
+                continue
+            encoded = encode_serialized(requirement.serialize())
+            digest = encoded_digest(encoded)
+            if index.get(requirement.key) == digest:
+                result.skipped += 1
+            else:
+                self.write_blob(digest, encoded)
+                index[requirement.key] = digest
+                result.written += 1
+            requirement.loaded_digest = digest
+
+        if result.written or result.deleted or not self.exists(directory):
+            self._write_index(directory, index)
+        return result
+
+    def delete(self, directory, requirements):
+        index = self._read_index(directory)
+        deleted = 0
+        for requirement in requirements:
+            if index.pop(requirement.key, None) is not None:
+                deleted += 1
+        if deleted:
+            self._write_index(directory, index)
+        return deleted
+
+    def clear(self, directory):
+        if self.exists(directory):
+            transaction.remove(self.index_path(directory))
+
+    def collect_garbage(self, directories):
+        referenced = set()
+        for directory in directories:
+            referenced.update(self._read_index(directory).values())
+        removed = 0
+        if not os.path.isdir(self.blob_directory):
+            return removed
+        for root, _, names in os.walk(self.blob_directory):
+            for name in names:
+                if name.endswith('.json') and name[:-len('.json')] not in referenced:
+                    transaction.remove(os.path.join(root, name))
+                    self.cache.pop(name[:-len('.json')])
+                    removed += 1
+        return removed
+
+    def _read_index(self, directory):
+        # key -> blob digest
+        index = {}
+        if not self.exists(directory):
+            return index
+        for line in transaction.read_text(self.index_path(directory)).splitlines():
+            if line.strip():
+                key, digest = line.split()
+                index[key] = digest
+        return index
+
+    def _write_index(self, directory, index):
+        transaction.makedirs(directory)
+        transaction.write_text(self.index_path(directory), "".join(f"{key} {index[key]}\n" for key in sorted(index)))
+
+
+class DeltaRequirementStore(RequirementStore):
+    """
+    A release directory holds 'requirements.delta': a header line and the
+    records added or changed plus the keys removed against the previous
+    release. Every CHECKPOINT_INTERVAL releases, and always for the archive,
+    the file is a full checkpoint, so rebuilding a release replays a bounded
+    number of deltas.
+    """
+    name = "delta"
+    FILENAME = "requirements.delta"
+    CHECKPOINT_INTERVAL = 8
+
+    # Recently rebuilt releases: directory -> (chain signature, records). Twice
+    # the longest chain, so a replay never evicts its own bases.
+    states = LRUCache(maxsize=2 * CHECKPOINT_INTERVAL)
+
+    def file_path(self, directory):
+        return os.path.join(directory, self.FILENAME)
+
+    def exists(self, directory):
+        return transaction.exists(self.file_path(directory))
+
+    def load(self, directory):
+        return self._requirements(self._state(directory)[1])
+
+    def load_changes(self, directory):
+        # The delta itself, no previous release is rebuilt
+        _, puts, _ = self._read(directory)
+        return self._requirements(puts)
+
+    def keys(self, directory):
+        return list(self._state(directory)[1])
+
+    def load_records(self, directory, changes_only=False):
+        records = self._read(directory)[1] if changes_only else self._state(directory)[1]
+        return [json.loads(records[key]) for key in sorted(records)]
+
+    def save(self, directory, requirements):
+        records = dict(self._state(directory)[1])
+        result = SaveResult()
+
+        for requirement in requirements:
+            if requirement.for_deletion:
+                if records.pop(requirement.key, None) is not None:
+                    result.deleted += 1
+                continue
+            line = encode_serialized(requirement.serialize())
+            if records.get(requirement.key) == line:
+                result.skipped += 1
+            else:
+                records[requirement.key] = line
+                result.written += 1
+            requirement.loaded_digest = encoded_digest(line)
+
+        if result.written or result.deleted or not self.exists(directory):
+            self._write(directory, records)
+        return result
+
+    def delete(self, directory, requirements):
+        records = dict(self._state(directory)[1])
+        deleted = 0
+        for requirement in requirements:
+            if records.pop(requirement.key, None) is not None:
+                deleted += 1
+        if deleted:
+            self._write(directory, records)
+        return deleted
+
+    def clear(self, directory):
+        if self.exists(directory):
+            self._materialize_dependents(directory)
+            transaction.remove(self.file_path(directory))
+            self.states.pop(os.path.abspath(directory))
+
+    def base_directory(self, directory):
+        """
+        The directory of the previous release: the predecessor in version
+        order, or the current release for a release that is being created.
+        """
+        name = os.path.basename(os.path.normpath(directory))
+        releases = {version.replace('.', '_'): version for version in self.config.releases}
+        try:
+            if name in releases:
+                ordered = sorted(releases.values(), key=Version)
+                index = ordered.index(releases[name])
+                base = ordered[index - 1] if index > 0 else None
+            else:
+                base = self.config.current if self.config.current in self.config.releases else None
+        except (InvalidVersion, TypeError):
+            return None
+        if base is None:
+            return None
+        return os.path.join(os.path.dirname(os.path.normpath(directory)), base.replace('.', '_'))
+
+    def _requirements(self, records):
+        return [Requirement().deserialize(json.loads(records[key]), digest=encoded_digest(records[key]))
+                for key in sorted(records)]
+
+    def _read(self, directory):
+        # header, key -> record line of the added/changed records, removed keys
+        header, puts, removed = {"base": None, "depth": 0}, {}, []
+        if not self.exists(directory):
+            return header, puts, removed
+        lines = transaction.read_text(self.file_path(directory)).split("\n")
+        header = json.loads(lines[0])
+        for line in lines[1:]:
+            if not line:
+                continue
+            data = json.loads(line)
+            if "removed" in data and "key" not in data:
+                removed.append(data["removed"])
+            else:
+                puts[data["key"]] = line
+        return header, puts, removed
+
+    def _signature(self, directory):
+        return transaction.signature(self.file_path(directory))
+
+    def _state(self, directory, visiting=None):
+        """
+        Rebuild the records of a release by replaying its deltas from the last
+        checkpoint. Returns (chain signature, key -> record line).
+        """
+        directory = os.path.abspath(directory)
+        visiting = visiting or set()
+        if directory in visiting:
+            raise StorageCorruptedException(f"Cyclic release deltas at {directory}")
+        visiting.add(directory)
+
+        header = self._header(directory)
+        base_signature, base_records = (None, {})
+        if header.get("base"):
+            base_signature, base_records = self._state(
+                os.path.join(os.path.dirname(directory), header["base"]), visiting)
+        signature = (self._signature(directory), base_signature)
+        cached = self.states.get(directory)
+        if cached is not None and cached[0] == signature:
+            return cached
+
+        _, puts, removed = self._read(directory)
+        records = dict(base_records)
+        for key in removed:
+            records.pop(key, None)
+        records.update(puts)
+        self.states.put(directory, (signature, records))
+        return signature, records
+
+    def _header(self, directory):
+        if not self.exists(directory):
+            return {"base": None, "depth": 0}
+        return json.loads(transaction.read_text(self.file_path(directory)).split("\n", 1)[0])
+
+    def _materialize_dependents(self, directory):
+        # Deltas based on this directory become checkpoints before it changes
+        parent = os.path.dirname(os.path.abspath(directory))
+        name = os.path.basename(os.path.abspath(directory))
+        for sibling in transaction.listdir(parent):
+            dependent = os.path.join(parent, sibling)
+            if sibling == name or not self.exists(dependent):
+                continue
+            if self._header(dependent).get("base") == name:
+                self._write_lines(dependent, {"base": None, "depth": 0}, self._state(dependent)[1], [])
+
+    def _write(self, directory, records):
+        transaction.makedirs(directory)
+        self._materialize_dependents(directory)
+
+        base = None
+        if os.path.basename(os.path.normpath(directory)) != "archive":
+            base = self.base_directory(directory)
+        header = {"base": None, "depth": 0}
+        puts, removed = records, []
+        depth = self._header(base).get("depth", 0) + 1 if base is not None and self.exists(base) else None
+        if depth is not None and depth < self.CHECKPOINT_INTERVAL:
+            base_records = self._state(base)[1]
+            header = {"base": os.path.basename(os.path.normpath(base)), "depth": depth}
+            puts = {key: line for key, line in records.items() if base_records.get(key) != line}
+            removed = [key for key in base_records if key not in records]
+        self._write_lines(directory, header, puts, removed)
+
+    def _write_lines(self, directory, header, puts, removed):
+        lines = [json.dumps(header, sort_keys=True)]
+        lines.extend(puts[key] for key in sorted(puts))
+        lines.extend(json.dumps({"removed": key}) for key in sorted(removed))
+        transaction.write_text(self.file_path(directory), "".join(f"{line}\n" for line in lines))
+        self.states.pop(os.path.abspath(directory))
+
+
+STORES = {store.name: store for store in (YamlRequirementStore, PackedRequirementStore, SqliteRequirementStore,
+                                          BlobRequirementStore, DeltaRequirementStore)}
+
+
+def create_store(config, storage=None):
+    if storage is None:
+        storage = getattr(config, "storage", None)
+    if not isinstance(storage, str) or not storage:
+        storage = DEFAULT_STORAGE
+    if storage not in STORES:
+        raise StorageFormatUnknown(f"Unknown storage format '{storage}', supported formats: {', '.join(STORES)}")
+    return STORES[storage](config)
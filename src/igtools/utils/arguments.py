@@ -1,10 +1,24 @@
+import argparse
+
 from ..config import CONFIG_DEFAULT_DIR
+from .lock import DEFAULT_TIMEOUT
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive number, got {value}")
+    return number
 
 
 def add_config(parser):
     parser.add_argument("-c", "--config", help=f"Directory for configuration files, default is '{CONFIG_DEFAULT_DIR}'", default=CONFIG_DEFAULT_DIR)
+    parser.add_argument("--lock-timeout", type=float, default=DEFAULT_TIMEOUT, help=f"Seconds to wait while other igtools commands lock the configuration directory (default is {DEFAULT_TIMEOUT})")
 
 
 def add_common(parser):
     parser.add_argument("--directory", help="Input directory for processing", required=False)
-    add_config(parser=parser)
\ No newline at end of file
+    add_config(parser=parser)
+
+def add_jobs(parser):
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of processes used to parse the input pages, 0 uses all CPUs (default is 1)")
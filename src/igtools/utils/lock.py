@@ -0,0 +1,88 @@
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks on this platform, commands are not coordinated
+    fcntl = None
+
+from ..errors import LockTimeoutException
+
+
+LOCK_FILE = "igtools.lock"
+
+# Seconds to wait for the lock, changed with --lock-timeout
+DEFAULT_TIMEOUT = 300
+
+POLL_INTERVAL = 0.05
+
+
+class DirectoryLock(object):
+    """
+    Reader-writer lock between igtools processes working on the same config
+    directory. Read-only commands hold it shared and run concurrently, commands
+    that write hold it exclusively. The lock is an flock on a file in the cache
+    directory, so it is released when the process ends, however it ends.
+    """
+
+    def __init__(self, path, exclusive=False, timeout=DEFAULT_TIMEOUT):
+        self.path = path
+        self.exclusive = exclusive
+        self.timeout = timeout
+        self.file = None
+
+    @property
+    def mode(self):
+        return "exclusive" if self.exclusive else "shared"
+
+    def acquire(self):
+        # Without the directory there is nothing to protect yet
+        if fcntl is None or not os.path.isdir(os.path.dirname(self.path)):
+            return self
+        if self.file is None:
+            self.file = open(self.path, 'a+')
+        self._lock(fcntl.LOCK_EX if self.exclusive else fcntl.LOCK_SH)
+        return self
+
+    def upgrade(self):
+        """
+        Hold the lock exclusively. flock converts the lock by releasing it
+        first, so two shared holders upgrading never deadlock.
+        """
+        if not self.exclusive:
+            self.exclusive = True
+            if fcntl is not None and self.file is not None:
+                self._lock(fcntl.LOCK_EX)
+
+    def downgrade(self):
+        if self.exclusive:
+            self.exclusive = False
+            if fcntl is not None and self.file is not None:
+                self._lock(fcntl.LOCK_SH)
+
+    def release(self):
+        if self.file is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+            self.file.close()
+            self.file = None
+
+    def _lock(self, operation):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                fcntl.flock(self.file.fileno(), operation | fcntl.LOCK_NB)
+                return
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    self.release()
+                    raise LockTimeoutException(
+                        f"Timed out after {self.timeout}s waiting for the {self.mode} lock {self.path}, "
+                        "another igtools command is still running")
+                time.sleep(POLL_INTERVAL)
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
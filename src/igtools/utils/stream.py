@@ -0,0 +1,87 @@
+import os
+import json
+import yaml
+from contextlib import contextmanager
+from collections.abc import Iterator
+from json.encoder import encode_basestring
+
+from . import transaction
+
+
+@contextmanager
+def atomic_output(path):
+    """
+    The file to stream an output to: a temporary file next to 'path', renamed
+    over it when the block ends without an error and removed otherwise, so a
+    failed export never leaves a truncated file behind.
+    """
+    temp = transaction.temp_path(path)
+    try:
+        with open(temp, 'w', encoding='utf-8') as file:
+            yield file
+        os.replace(temp, path)
+    finally:
+        if os.path.lexists(temp):
+            os.remove(temp)
+
+
+def write_json(file, data, indent=4):
+    """
+    Write 'data' exactly as json.dump(data, file, indent=indent,
+    ensure_ascii=False) does. Iterators (generators) within 'data' are
+    written as JSON arrays item by item, so records produced one at a time
+    are never all in memory.
+    """
+    _write_json(file, data, indent, 0)
+
+
+def _write_json(file, value, indent, level):
+    if isinstance(value, dict):
+        items, start, end = iter(value.items()), "{", "}"
+    elif isinstance(value, (list, tuple, Iterator)):
+        items, start, end = iter(value), "[", "]"
+    else:
+        file.write(_scalar(value))
+        return
+    newline = "\n" + " " * (indent * (level + 1))
+    first = True
+    for item in items:
+        file.write(start + newline if first else "," + newline)
+        first = False
+        if end == "}":
+            key, item = item
+            file.write(_key(key) + ": ")
+        _write_json(file, item, indent, level + 1)
+    file.write(start + end if first else "\n" + " " * (indent * level) + end)
+
+
+def _scalar(value):
+    if isinstance(value, str):
+        return encode_basestring(value)
+    if value is None:
+        return "null"
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _key(key):
+    # Keys other than strings are converted as the json module does
+    if isinstance(key, str):
+        return encode_basestring(key)
+    return encode_basestring(_scalar(key))
+
+
+def write_yaml_list(file, items):
+    """
+    Write the sequence 'items' as yaml.dump(list(items), file,
+    default_flow_style=False, allow_unicode=True) does, one item at a time.
+    """
+    empty = True
+    for item in items:
+        yaml.dump([item], file, default_flow_style=False, allow_unicode=True)
+        empty = False
+    if empty:
+        yaml.dump([], file, default_flow_style=False, allow_unicode=True)
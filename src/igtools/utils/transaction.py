@@ -0,0 +1,473 @@
+import os
+import json
+import shutil
+from contextlib import contextmanager
+
+
+# ioctl request to clone a file (reflink) on Linux (btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+TRANSACTION_DIRECTORY = "transaction"
+JOURNAL_FILE = "journal.json"
+TEMP_SUFFIX = ".igtools-tmp"
+
+PREPARED = "prepared"
+COMMITTED = "committed"
+
+# The unit of work of the running command, None outside of a command
+_active = None
+
+
+def link_file(source, target):
+    """
+    Hardlink 'source' to 'target', reflink it if hardlinks are not supported
+    and copy it as the last resort.
+    """
+    if os.path.lexists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+        return
+    except (OSError, AttributeError):
+        pass
+    try:
+        import fcntl
+        with open(source, 'rb') as src, open(target, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        return
+    except (OSError, ImportError):
+        if os.path.lexists(target):
+            os.remove(target)
+    shutil.copyfile(source, target)
+
+
+def fsync_directory(directory):
+    # Persist renames and new entries of a directory, not supported everywhere
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def temp_path(path):
+    # Unique per process, readers holding a shared lock commit concurrently
+    return os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{os.getpid()}{TEMP_SUFFIX}")
+
+
+class UnitOfWork(object):
+    """
+    All file writes of one command. Writes, removals and links are staged in
+    memory and only flushed on commit: every file is written to a temporary
+    file next to its target and fsynced, then a journal marks the commit and
+    the temporary files are renamed over their targets. Reads through this
+    unit of work see the staged state.
+
+    If the command fails or is interrupted before the commit nothing is
+    written. A commit interrupted after the journal was marked committed is
+    completed by 'recover' on the next start, one interrupted before is
+    rolled back.
+    """
+
+    def __init__(self, directory):
+        self.directory = os.path.abspath(directory)
+        # path -> (kind, value), kind is text, bytes, link, file or remove
+        self.staged = {}
+        self.directories = set()
+        self.serials = {}
+        self.callbacks = []
+        self.committed = False
+        self._serial = 0
+
+    @property
+    def staging_directory(self):
+        return os.path.join(self.directory, TRANSACTION_DIRECTORY, str(os.getpid()))
+
+    @property
+    def journal_path(self):
+        return os.path.join(self.staging_directory, JOURNAL_FILE)
+
+    def _stage(self, path, kind, value):
+        path = os.path.abspath(path)
+        self.staged[path] = (kind, value)
+        self._serial += 1
+        self.serials[path] = self._serial
+        if kind != "remove":
+            self.makedirs(os.path.dirname(path))
+
+    def write_text(self, path, text):
+        self._stage(path, "text", text)
+
+    def write_bytes(self, path, data):
+        self._stage(path, "bytes", data)
+
+    def remove(self, path):
+        if self.exists(path):
+            self._stage(path, "remove", None)
+
+    def link(self, source, target):
+        kind, value = self.staged.get(os.path.abspath(source), (None, None))
+        if kind in ("text", "bytes", "link"):
+            self._stage(target, kind, value)
+        elif kind == "file":
+            self._stage(target, "bytes", self.read_bytes(source))
+        else:
+            self._stage(target, "link", os.path.abspath(source))
+
+    def working_copy(self, path):
+        """
+        A private copy of 'path' that is renamed over 'path' on commit, for
+        files modified in place (SQLite databases).
+        """
+        path = os.path.abspath(path)
+        kind, value = self.staged.get(path, (None, None))
+        if kind == "file":
+            return value
+        os.makedirs(self.staging_directory, exist_ok=True)
+        copy_path = os.path.join(self.staging_directory, f"{len(self.staged)}-{os.path.basename(path)}")
+        if kind is None and os.path.exists(path):
+            shutil.copyfile(path, copy_path)
+        elif kind is not None and kind != "remove":
+            with open(copy_path, 'wb') as file:
+                file.write(self.read_bytes(path))
+        self._stage(path, "file", copy_path)
+        return copy_path
+
+    def resolve(self, path):
+        # The file to open for reading 'path', its working copy if there is one
+        kind, value = self.staged.get(os.path.abspath(path), (None, None))
+        return value if kind == "file" else path
+
+    def makedirs(self, directory):
+        directory = os.path.abspath(directory)
+        while directory not in self.directories and not os.path.isdir(directory):
+            self.directories.add(directory)
+            directory = os.path.dirname(directory)
+
+    def before_commit(self, callback):
+        if callback not in self.callbacks:
+            self.callbacks.append(callback)
+
+    def is_staged(self, path):
+        return os.path.abspath(path) in self.staged
+
+    def exists(self, path):
+        path = os.path.abspath(path)
+        if path in self.staged:
+            return self.staged[path][0] != "remove"
+        return path in self.directories or os.path.exists(path)
+
+    def isdir(self, path):
+        return os.path.abspath(path) in self.directories or os.path.isdir(path)
+
+    def listdir(self, directory):
+        directory = os.path.abspath(directory)
+        names = set(os.listdir(directory)) if os.path.isdir(directory) else set()
+        for path, (kind, _) in self.staged.items():
+            if os.path.dirname(path) == directory:
+                if kind == "remove":
+                    names.discard(os.path.basename(path))
+                else:
+                    names.add(os.path.basename(path))
+        for path in self.directories:
+            if os.path.dirname(path) == directory:
+                names.add(os.path.basename(path))
+        return sorted(names)
+
+    def signature(self, path):
+        path = os.path.abspath(path)
+        if path in self.staged:
+            return None if self.staged[path][0] == "remove" else ("staged", self.serials[path])
+        return stat_signature(path)
+
+    def read_bytes(self, path):
+        kind, value = self.staged.get(os.path.abspath(path), (None, None))
+        if kind == "text":
+            return value.encode("utf-8")
+        if kind == "bytes":
+            return value
+        if kind == "remove":
+            raise FileNotFoundError(path)
+        with open(value if kind in ("link", "file") else path, 'rb') as file:
+            return file.read()
+
+    def read_text(self, path):
+        kind, value = self.staged.get(os.path.abspath(path), (None, None))
+        if kind == "text":
+            return value
+        return self.read_bytes(path).decode("utf-8")
+
+    def commit(self):
+        for callback in self.callbacks:
+            callback()
+        self.callbacks = []
+        if not self.staged:
+            self.discard()
+            return
+
+        operations = []
+        for path, (kind, value) in sorted(self.staged.items()):
+            if kind == "remove":
+                operations.append([None, path])
+            else:
+                operations.append([value if kind == "file" else temp_path(path), path])
+        created = sorted(directory for directory in self.directories if not os.path.isdir(directory))
+
+        self._write_journal(PREPARED, operations, created)
+        try:
+            for directory in created:
+                os.makedirs(directory, exist_ok=True)
+            for path, (kind, value) in self.staged.items():
+                if kind in ("text", "bytes"):
+                    self._write_temp(temp_path(path), value)
+                elif kind == "link":
+                    link_file(value, temp_path(path))
+                elif kind == "file" and os.path.exists(value):
+                    self._fsync_file(value)
+            for directory in {os.path.dirname(path) for path in self.staged}:
+                fsync_directory(directory)
+        except BaseException:
+            rollback(operations, created)
+            self.discard()
+            raise
+
+        # The commit point, from here on the changes are completed by 'recover'
+        self._write_journal(COMMITTED, operations, created)
+        self.committed = True
+        apply(operations)
+        self.committed = False
+        self.discard()
+
+    def discard(self):
+        self.staged = {}
+        self.directories = set()
+        self.callbacks = []
+        # An interrupted commit keeps its journal for 'recover'
+        if not self.committed and os.path.isdir(self.staging_directory):
+            shutil.rmtree(self.staging_directory, ignore_errors=True)
+            try:
+                os.rmdir(os.path.dirname(self.staging_directory))
+            except OSError:
+                pass
+
+    def _write_temp(self, path, value):
+        with open(path, 'wb') as file:
+            file.write(value.encode("utf-8") if isinstance(value, str) else value)
+            file.flush()
+            os.fsync(file.fileno())
+
+    def _fsync_file(self, path):
+        with open(path, 'rb+') as file:
+            os.fsync(file.fileno())
+
+    def _write_journal(self, state, operations, created):
+        os.makedirs(self.staging_directory, exist_ok=True)
+        content = json.dumps(dict(state=state, operations=operations, directories=created))
+        self._write_temp(temp_path(self.journal_path), content)
+        os.replace(temp_path(self.journal_path), self.journal_path)
+        fsync_directory(self.staging_directory)
+
+
+def stat_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def apply(operations):
+    # Rename the temporary files over their targets and remove the removed files
+    for temp, path in operations:
+        if temp is None:
+            if os.path.lexists(path):
+                os.remove(path)
+        elif os.path.exists(temp):
+            os.replace(temp, path)
+    for directory in {os.path.dirname(path) for _, path in operations}:
+        fsync_directory(directory)
+
+
+def rollback(operations, created):
+    for temp, _ in operations:
+        if temp is not None and os.path.lexists(temp):
+            os.remove(temp)
+    for directory in sorted(created, reverse=True):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            pass
+
+
+def pending(directory):
+    # True if units of work of other commands were left behind
+    return os.path.isdir(os.path.join(directory, TRANSACTION_DIRECTORY))
+
+
+def recover(directory):
+    """
+    Complete or roll back the units of work of commands that were interrupted
+    while committing. Must not run while other commands are writing (see
+    'lock'). Returns the states found in their journals.
+    """
+    transaction_directory = os.path.join(directory, TRANSACTION_DIRECTORY)
+    if not os.path.isdir(transaction_directory):
+        return []
+    states = []
+    for name in sorted(os.listdir(transaction_directory)):
+        staging_directory = os.path.join(transaction_directory, name)
+        journal_path = os.path.join(staging_directory, JOURNAL_FILE)
+        if os.path.exists(journal_path):
+            try:
+                with open(journal_path, 'r', encoding='utf-8') as file:
+                    journal = json.load(file)
+            except ValueError:
+                # A torn journal was never marked committed
+                journal = dict(state=PREPARED, operations=[], directories=[])
+            if journal.get('state') == COMMITTED:
+                apply(journal.get('operations', []))
+            else:
+                rollback(journal.get('operations', []), journal.get('directories', []))
+            states.append(journal.get('state'))
+        shutil.rmtree(staging_directory, ignore_errors=True)
+    shutil.rmtree(transaction_directory, ignore_errors=True)
+    return states
+
+
+@contextmanager
+def unit_of_work(directory):
+    """
+    Stage all writes of the block and commit them when it ends without an
+    error; on an error or Ctrl-C the staged writes are dropped.
+    """
+    global _active
+    if _active is not None:
+        yield _active
+        return
+    _active = UnitOfWork(directory)
+    try:
+        yield _active
+        _active.commit()
+    except BaseException:
+        _active.discard()
+        raise
+    finally:
+        _active = None
+
+
+def active():
+    return _active
+
+
+# File access of all commands: staged inside a unit of work, direct otherwise
+
+def write_text(path, text):
+    if _active is not None:
+        return _active.write_text(path, text)
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(text)
+
+
+def write_bytes(path, data):
+    if _active is not None:
+        return _active.write_bytes(path, data)
+    with open(path, 'wb') as file:
+        file.write(data)
+
+
+def write_cache(path, text):
+    """
+    Write derived data (caches) directly, past the unit of work, through a
+    temporary file renamed over 'path'. Read-only commands thus never leave
+    a staging directory that other commands take for an interrupted one.
+    """
+    temp = temp_path(path)
+    try:
+        with open(temp, 'w', encoding='utf-8') as file:
+            file.write(text)
+        os.replace(temp, path)
+    finally:
+        if os.path.lexists(temp):
+            os.remove(temp)
+
+
+def read_text(path):
+    if _active is not None:
+        return _active.read_text(path)
+    with open(path, 'r', encoding='utf-8') as file:
+        return file.read()
+
+
+def read_bytes(path):
+    if _active is not None:
+        return _active.read_bytes(path)
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+def remove(path):
+    if _active is not None:
+        return _active.remove(path)
+    os.remove(path)
+
+
+def link(source, target):
+    if _active is not None:
+        return _active.link(source, target)
+    link_file(source, target)
+
+
+def makedirs(directory):
+    if _active is not None:
+        return _active.makedirs(directory)
+    os.makedirs(directory, exist_ok=True)
+
+
+def working_copy(path):
+    if _active is not None:
+        return _active.working_copy(path)
+    return path
+
+
+def resolve(path):
+    if _active is not None:
+        return _active.resolve(path)
+    return path
+
+
+def before_commit(callback):
+    if _active is not None:
+        _active.before_commit(callback)
+
+
+def exists(path):
+    if _active is not None:
+        return _active.exists(path)
+    return os.path.exists(path)
+
+
+def isdir(path):
+    if _active is not None:
+        return _active.isdir(path)
+    return os.path.isdir(path)
+
+
+def listdir(directory):
+    if _active is not None:
+        return _active.listdir(directory)
+    return os.listdir(directory)
+
+
+def is_staged(path):
+    return _active is not None and _active.is_staged(path)
+
+
+def signature(path):
+    if _active is not None:
+        return _active.signature(path)
+    return stat_signature(path)
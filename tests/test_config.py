@@ -45,6 +45,15 @@ def test_to_dict_and_from_dict():
     assert new_config.to_dict() == d
 
 
+def test_fingerprint_scheme_of_older_configs():
+    c = config.Config()
+    assert c.to_dict()["fingerprint_scheme"] == "sha256-json"
+    d = c.to_dict()
+    del d["fingerprint_scheme"]
+    c.from_dict(d)
+    assert c.fingerprint_scheme == "sha256-json"
+
+
 def test_save_and_load():
     c = config.Config()
     c.directory = "test"
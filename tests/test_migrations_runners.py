@@ -25,6 +25,14 @@ def test_latest_registry_version():
     assert latest_registry_version(registry=MigrationRegistry.build()) == Version("0.3.0")
 
 
+def test_registry_path_has_no_storage_conversion():
+    # Storage and fingerprint scheme conversions only run on request ('migrate --storage' / '--fingerprint-scheme')
+    chain = MigrationRegistry.build().path(Version("0.0.0"), Version("0.3.0"))
+    assert [type(step).__name__ for step in chain] == ["DropActorsAndTestProceduresFromContentHash"]
+    # Configurations without a fingerprint scheme default to sha256-json, 0.3.x projects need no migration
+    assert MigrationRegistry.build().path(Version("0.3.0"), latest_registry_version(MigrationRegistry.build())) == []
+
+
 def test_ensure_tool_not_older_than_config_correct(mock_config):
     try:
         ensure_tool_not_older_than_config(config=mock_config, tool_version=Version("1.2.0"))
@@ -0,0 +1,83 @@
+import os
+import pytest
+from unittest.mock import MagicMock
+
+from igtools.migrations.steps import ConvertReleaseStorage, ConvertFingerprintScheme
+from igtools.specifications import storage, normalize
+from igtools.specifications.merkle import ReleaseTree
+from igtools.specifications.data import Requirement
+from igtools.specifications.release import ReleaseManager
+
+
+@pytest.fixture
+def mock_config(tmp_path):
+    return MagicMock(
+        path=str(tmp_path / ".igtools"),
+        name="Test Project",
+        current="1.1.0",
+        releases=["1.0.0", "1.1.0"],
+        storage="yaml"
+    )
+
+
+def keys(manager, version):
+    release = manager.load_version(version)
+    return sorted(r.key for r in release.requirements), sorted(r.key for r in release.archive)
+
+
+@pytest.mark.parametrize("storage_format", ["packed", "sqlite", "blobs", "delta"])
+def test_convert_release_storage_both_directions(mock_config, storage_format):
+    manager = ReleaseManager(mock_config)
+    for version, keys_ in (("1.0.0", ["REQ-1", "REQ-2"]), ("1.1.0", ["REQ-1", "REQ-3"])):
+        release = manager.load_version(version)
+        release.requirements = [Requirement(key=key, title=key) for key in keys_]
+        manager.save(release)
+    manager.archive([Requirement(key="REQ-2", title="REQ-2")])
+    expected = {version: keys(manager, version) for version in mock_config.releases}
+
+    mock_config.storage = storage_format
+    ConvertReleaseStorage().apply(config=mock_config, logger=MagicMock())
+    converted = ReleaseManager(mock_config)
+    assert {version: keys(converted, version) for version in mock_config.releases} == expected
+    for directory in [converted.release_directory("1.0.0"), converted.archive_directory()]:
+        assert not any(f.endswith(".yaml") for f in os.listdir(directory))
+
+    mock_config.storage = "yaml"
+    ConvertReleaseStorage().apply(config=mock_config, logger=MagicMock())
+    manager = ReleaseManager(mock_config)
+    assert {version: keys(manager, version) for version in mock_config.releases} == expected
+    assert sorted(os.listdir(manager.release_directory("1.1.0"))) == ["REQ-1.yaml", "REQ-3.yaml"]
+
+
+def test_convert_fingerprint_scheme_recomputes_content_hashes(mock_config):
+    mock_config.frozen_version = "1.1.0"
+    mock_config.frozen_tree = {"root": ""}
+    manager = ReleaseManager(mock_config)
+    for version in mock_config.releases:
+        release = manager.load_version(version)
+        release.requirements = [Requirement(key=key, title=key, text=f"<b>Text</b> {key}", conformance="SHALL", version=2)
+                                for key in ("REQ-1", "REQ-2")]
+        for req in release.requirements:
+            req.content_hash = req.content_hash
+        manager.save(release)
+    manager.archive([Requirement(key="REQ-3", title="REQ-3", text="Text")])
+    legacy = {req.key: req.content_hash for req in manager.load().requirements}
+
+    try:
+        ConvertFingerprintScheme(scheme="blake2b16-bin").apply(config=mock_config, logger=MagicMock())
+        assert mock_config.fingerprint_scheme == "blake2b16-bin"
+        ReleaseManager.cache.clear()
+        for version in mock_config.releases:
+            requirements = manager.load_version(version).requirements
+            assert all(len(req.content_hash) == 32 and req.version == 2 for req in requirements)
+        assert len(manager.load().archive[0].content_hash) == 32
+        assert mock_config.frozen_hash == normalize.build_fingerprint_release(manager.load().requirements)
+        assert mock_config.frozen_tree["root"] == ReleaseTree.from_requirements(manager.load().requirements).root
+
+        ConvertFingerprintScheme(scheme="sha256-json").apply(config=mock_config, logger=MagicMock())
+        ReleaseManager.cache.clear()
+        assert {req.key: req.content_hash for req in manager.load().requirements} == legacy
+    finally:
+        normalize.use_scheme(normalize.LEGACY_SCHEME)
+        ReleaseManager.cache.clear()
+
@@ -1,10 +1,12 @@
 import os
 import json
+import hashlib
 import pytest
 from unittest.mock import patch, mock_open, MagicMock
 
 from igtools.specifications.data import Requirement, ReleaseState
 import igtools.specifications.normalize as normalize
+from igtools.errors import FingerprintSchemeUnknown
 
 
 def test_editorial_whitespace_does_not_change_fingerprint():
@@ -69,3 +71,106 @@ def test_normalize_normalize_text_for_semantics_empty_string():
 def test_normalize_normalize_text_for_semantics_only_whitespace():
     assert normalize.normalize_text_for_semantics(" \t\n  ") == ""
 
+
+
+def reference_normalize(raw):
+    # The multi-pass normalizer the single-pass one replaced, output must stay identical
+    import re
+    import html
+    if not raw:
+        return ""
+    s = normalize.ACTOR_BLOCK_RE.sub("", raw)
+    s = html.unescape(s)
+    s = normalize.SOFT_HYPHEN_RE.sub("", s)
+    s = normalize.NBSP_RE.sub(" ", s)
+    s = normalize.ZW_RE.sub("", s)
+    s = normalize.TAG_RE.sub("", s)
+    s = re.sub(r"[ \t\f\r\v]+", " ", s)
+    s = re.sub(r"\s*\n\s*", " ", s)
+    s = re.sub(r"\s{2,}", " ", s)
+    s = s.replace("\r\n", "\n").replace("\r", "\n")
+    s = s.strip(" ")
+    s = re.sub(r" {2,}", " ", s)
+    s = re.sub(r'\s+', '', s)
+    return s.strip().lower()
+
+
+IG_PAGES = [
+    '### Medikationsliste\n\n'
+    '<requirement conformance="SHALL" key="IG-EPA-001" title="Abruf der Medikationsliste" version="2">\n'
+    '    <actor name="EPA-Medication-Service">\n        <testProcedure id="Produkttest"/>\n    </actor>\n'
+    '    Der Medication Service MUSS die Operation <i>$medication-list</i> gem&auml;&szlig; '
+    '<a href="https://simplifier.net/epa">Spezifikation</a> anbieten.&nbsp;Die Antwort MUSS '
+    'ein <code>Bundle</code> vom Typ <b>searchset</b> sein.\n</requirement>\n',
+    '<requirement conformance="SHOULD" key="IG-EPA-002" title="Anzeige &amp; Filter">\n'
+    '    <actor name="EPA-PS"/>\n'
+    '    <table>\n      <tr><th>Parameter</th><th>Beschreibung</th></tr>\n'
+    '      <tr><td>date</td><td>Zeitraum &lt;= 12 Monate</td></tr>\n'
+    '      <tr><td>status</td><td>active | completed</td></tr>\n    </table>\n'
+    '    Das PS SOLL die Liste filtern kön­nen​.\n</requirement>\n',
+    '<requirement conformance="SHALL" key="IG-EPA-003" title="Pflichtfelder">\n'
+    '    <Actor NAME="EPA-FdV"><testProcedure id="AN04"/></Actor>\n'
+    '    <ul>\n      <li>Medication.code&#160;(Pflicht)</li>\n      <li>Medication.form&#x200B;</li>\n'
+    '      <li>&lt;b&gt;Hinweis&lt;/b&gt;: &lt;actor&gt;kein Akteur&lt;/actor&gt;</li>\n    </ul>\n'
+    '    <br/>\n    ﻿Die Felder MÜSSEN befüllt sein.\r\n</requirement>\n',
+]
+
+EDGE_CASES = [
+    "< b>not a tag</b>", "< b>nbsp</b>", "<­b>soft hyphen</b>", "<b​x>joined</bx>",
+    "&nbsp;<b>x</b>", "&lt; b&gt;", "<b<actor>x</actor>>", "<actor>a</actor><ACTOR name='x'>b</Actor>c",
+    "<bİ>dotted</bİ>", "İSTANBUL", "x\x1cy\x1dz\x1e\x1f", "a b　c\x85d", "<br\nclass='x'>",
+    "&amp;lt;b&amp;gt;", "<1>digits</1>", "<a href='x'>", "&#xad;&#8203;&#xfeff;", "  ", None,
+]
+
+
+def ig_page_texts():
+    from igtools.specifications import scanner
+    texts = []
+    for page in IG_PAGES:
+        texts.extend(tag.text for tag in scanner.scan(page))
+    return texts
+
+
+@pytest.mark.parametrize("text", IG_PAGES + ig_page_texts() + EDGE_CASES)
+def test_single_pass_normalizer_matches_reference(text):
+    assert normalize.normalize_text_for_semantics(text) == reference_normalize(text)
+
+
+def test_single_pass_normalizer_matches_reference_on_random_texts():
+    import random
+    tokens = ["<b>", "</b>", "<actor name='A'>", "</actor>", "<", ">", "&amp;", "&nbsp;", "&lt;", "&gt;", "&shy;",
+              "&#8203;", " ", "­", "​", "﻿", " ", "\t", "\n", "\r\n", "　", "a", "B", "ß",
+              "İ", "/", "b", "actor", "1", "x"]
+    generator = random.Random(19)
+    for _ in range(3000):
+        text = "".join(generator.choice(tokens) for _ in range(generator.randint(0, 25)))
+        assert normalize.normalize_text_for_semantics(text) == reference_normalize(text), repr(text)
+
+
+@pytest.fixture
+def scheme():
+    yield normalize.use_scheme
+    normalize.use_scheme(normalize.LEGACY_SCHEME)
+
+
+def test_fingerprint_schemes(scheme):
+    legacy, canon = normalize.build_fingerprint(text="<b>Text</b> A", title="A", conformance="SHALL")
+    assert legacy == hashlib.sha256(normalize.encode_json(canon)).hexdigest()
+
+    scheme("blake2b16-bin")
+    assert normalize.FINGERPRINT_SCHEME == "blake2b16-bin"
+    fingerprint, _ = normalize.build_fingerprint(text="<b>Text</b> A", title="A", conformance="SHALL")
+    assert len(fingerprint) == 32 and fingerprint != legacy[:32]
+    # Editorial changes still do not change the fingerprint
+    assert normalize.build_fingerprint(text="Text  A", title="A ", conformance="SHALL")[0] == fingerprint
+
+    with pytest.raises(FingerprintSchemeUnknown):
+        scheme("md5")
+    assert normalize.FINGERPRINT_SCHEME == "blake2b16-bin"
+
+
+def test_binary_encoding_separates_fields():
+    first = normalize.encode_binary({"text": "a1:b", "title": "", "conformance": ""})
+    second = normalize.encode_binary({"text": "a", "title": "b", "conformance": ""})
+    assert first != second
+    assert normalize.encode_binary({"text": "ä", "title": "", "conformance": ""}) == "0:1:ä0:".encode("utf-8")
@@ -59,6 +59,7 @@ def test_polarion_export_writes_json_file(tmp_path, mock_config, mock_ig_config)
     with patch.object(exporter.release_manager, "load", return_value=release), \
          patch("os.path.exists", return_value=True), \
          patch("builtins.open", mock_open()) as mocked_file, \
+         patch("os.replace"), \
          patch("igtools.specifications.exporter.convert_to_link", return_value="file.html"), \
          patch("igtools.polarion.polarion.load_polarion_mappings", return_value=(fake_actor_map, fake_testproc_map)):
 
@@ -110,6 +111,7 @@ def test_polarion_export_raise_mapping_error(tmp_path, mock_config, mock_ig_conf
     with patch.object(exporter.release_manager, "load", return_value=release), \
          patch("os.path.exists", return_value=True), \
          patch("builtins.open", mock_open()) as mocked_file, \
+         patch("os.replace"), \
          patch("igtools.specifications.exporter.convert_to_link", return_value="file.html"), \
          patch("igtools.polarion.polarion.load_polarion_mappings", return_value=(fake_actor_map, fake_testproc_map)):
 
@@ -138,6 +140,7 @@ def test_polarion_export_skips_deleted_requirements(tmp_path, mock_config, mock_
     with patch.object(exporter.release_manager, "load", return_value=release), \
          patch("os.path.exists", return_value=True), \
          patch("builtins.open", mock_open()) as mocked_file, \
+         patch("os.replace"), \
          patch("igtools.specifications.exporter.convert_to_link", return_value="dummy.html"):
 
         exporter.export(str(tmp_path))
@@ -166,6 +169,33 @@ def test_polarion_export_skips_deleted_requirements(tmp_path, mock_config, mock_
         assert data["requirements"][0]["characteristics"] == []
 
 
+def test_polarion_export_reads_once_and_leaves_no_output_on_errors(tmp_path, mock_config, mock_ig_config):
+    good = Requirement(key="REQ-1", title="Good", version=0, conformance="SHALL", status="ACTIVE",
+                       source="file.md", test_procedures={"ACTOR": ["AN01"]})
+    bad = Requirement(key="REQ-2", title="Bad", version=0, conformance="SHALL", status="ACTIVE",
+                      source="file.md", test_procedures={"WRONG": ["AN01"]})
+    release = Release(name="Test Project", version="1.0.0")
+    release.requirements = [good, bad]
+    exporter = PolarionExporter(config=mock_config, ig_config=mock_ig_config)
+    filepath = PolarionExporter.generate_filepath(output=str(tmp_path), version=None)
+
+    with patch.object(exporter.release_manager, "load", return_value=release), \
+         patch.object(Release, "iter_requirements", autospec=True,
+                      side_effect=lambda self: iter(self.requirements)) as iter_requirements, \
+         patch("igtools.polarion.polarion.load_polarion_mappings",
+               return_value=({"ACTOR": "ProductTypeB"}, {"AN01": "TP-456"})):
+        with pytest.raises(PolarionExportError, match="WRONG"):
+            exporter.export(str(tmp_path))
+        assert iter_requirements.call_count == 1
+        assert os.listdir(tmp_path) == []
+
+        release.requirements = [good]
+        exporter.export(str(tmp_path))
+        assert os.listdir(tmp_path) == [os.path.basename(filepath)]
+        with open(filepath, encoding='utf-8') as file:
+            assert [r["key"] for r in json.load(file)["requirements"]] == ["REQ-1"]
+
+
 def test_polarion_export_raises_if_output_missing(mock_config, mock_ig_config):
     exporter = PolarionExporter(config=mock_config, ig_config=mock_ig_config)
 
@@ -220,6 +250,7 @@ def test_polarion_export_outputs_full_data_structure(tmp_path, mock_config, mock
     with patch.object(exporter.release_manager, "load", return_value=release), \
          patch("os.path.exists", return_value=True), \
          patch("builtins.open", mock_open()) as mocked_file, \
+         patch("os.replace"), \
          patch("igtools.specifications.exporter.convert_to_link", return_value="requirement.html"):
 
         exporter.export(str(tmp_path))
@@ -0,0 +1,172 @@
+import os
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+
+from igtools.specifications import cache, scanner, normalize
+from igtools.specifications.processor import Processor
+from igtools.specifications.data import Requirement
+from igtools.utils import id as id_module
+
+
+PAGE_A = '<requirement title="A" key="REQ-A" conformance="SHALL">\n    <actor name="X"><testProcedure id="T1"/></actor>\n    Text A\n</requirement>'
+PAGE_B = '<requirement title="B" key="REQ-B">Text B</requirement>'
+
+
+@pytest.fixture
+def mock_config(tmp_path):
+    return MagicMock(
+        path=str(tmp_path / ".igtools"),
+        current="1.0.0",
+        directory=str(tmp_path / "pages"),
+        prefix="REQ",
+        separator="-",
+        scope="PYT",
+        key_mode="sequential",
+        current_req_number=0
+    )
+
+
+@pytest.fixture
+def pages(tmp_path):
+    directory = tmp_path / "pages"
+    directory.mkdir()
+    (directory / "a.html").write_text(PAGE_A)
+    (directory / "b.md").write_text(PAGE_B)
+    return directory
+
+
+def run(config, existing=None):
+    processor = Processor(config, incremental=True)
+    existing_map = {r.key: r for r in (existing or [])}
+    processor.key_generator = id_module.create_generator(config=config, existing_keys=existing_map.keys())
+    with patch.object(id_module, "current_ids", set()):
+        return processor._process_files(existing_map=existing_map, dry_run=False)
+
+
+def age(path, seconds=10):
+    # Move the mtime out of the racy window
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns - seconds * 10**9))
+
+
+def test_incremental_reuses_unchanged_pages(mock_config, pages):
+    first = run(mock_config)
+    assert {r.key for r in first} == {"REQ-A", "REQ-B"}
+    manifest_file = os.path.join(mock_config.path, cache.CACHE_DIRECTORY, cache.PageManifest.FILENAME)
+    assert os.path.exists(manifest_file)
+
+    for page in pages.iterdir():
+        age(page)
+    # refresh the stat data of the aged pages
+    run(mock_config)
+
+    (pages / "b.md").write_text(PAGE_B.replace("Text B", "Text B changed"))
+    with patch.object(cache, "scan_page", wraps=cache.scan_page) as wrapped_scan:
+        second = run(mock_config)
+    wrapped_scan.assert_called_once_with(str(pages / "b.md"))
+    assert {r.key: r.text for r in second} == {"REQ-A": "Text A", "REQ-B": "Text B changed"}
+    assert {r.key: r.test_procedures for r in second}["REQ-A"] == {"X": ["T1"]}
+
+
+def test_incremental_keeps_full_key_set_and_drops_removed_pages(mock_config, pages):
+    run(mock_config)
+    os.remove(pages / "b.md")
+    requirements = run(mock_config)
+    assert {r.key for r in requirements} == {"REQ-A"}
+
+    manifest = cache.PageManifest(cache.cache_directory(mock_config)).load()
+    assert list(manifest.entries) == [str(pages / "a.html")]
+
+
+def test_incremental_caches_rewritten_pages(mock_config, pages):
+    (pages / "c.html").write_text('<requirement title="C">Text C</requirement>')
+    run(mock_config)
+    assert 'key="REQ-PYT1"' in (pages / "c.html").read_text()
+
+    manifest = cache.PageManifest(cache.cache_directory(mock_config)).load()
+    tags = manifest.entries[str(pages / "c.html")].tags
+    assert tags[0].get("key") == "REQ-PYT1"
+    assert tags[0].raw_start_tag == (pages / "c.html").read_text()[:tags[0].start_tag_end]
+
+
+def test_manifest_is_dropped_on_version_or_scheme_change(mock_config, pages):
+    run(mock_config)
+    manifest_file = os.path.join(cache.cache_directory(mock_config), cache.PageManifest.FILENAME)
+    assert cache.PageManifest(cache.cache_directory(mock_config)).load().entries
+
+    with patch.object(cache.normalize, "FINGERPRINT_SCHEME", "other"):
+        assert cache.PageManifest(cache.cache_directory(mock_config)).load().entries == {}
+
+    with open(manifest_file, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+    data["version"] = "0.0.1"
+    with open(manifest_file, 'w', encoding='utf-8') as file:
+        json.dump(data, file)
+    assert cache.PageManifest(cache.cache_directory(mock_config)).load().entries == {}
+
+
+def test_cached_fingerprint_is_used_for_existing_requirements(mock_config, pages):
+    existing = [Requirement(key="REQ-A", title="A", text="Text A", conformance="SHALL", version=1),
+                Requirement(key="REQ-B", title="B", text="Text B", version=1)]
+    for req in existing:
+        req.content_hash = req.content_hash
+    run(mock_config, existing=existing)
+    for page in pages.iterdir():
+        age(page)
+    run(mock_config, existing=existing)
+
+    with patch("igtools.specifications.processor.normalize.build_fingerprint") as build:
+        run(mock_config, existing=existing)
+    build.assert_not_called()
+
+
+def test_fingerprint_cache_is_persisted_per_scheme(tmp_path):
+    directory = str(tmp_path / "cache")
+    fingerprints = cache.FingerprintCache(directory).load()
+    expected, _ = normalize.build_fingerprint(text="Text A", title="A", conformance="SHALL")
+    assert fingerprints.fingerprint("Text A", "A", "SHALL") == expected
+    assert fingerprints.fingerprint("Text A", "A", "SHALL") == expected
+    assert (fingerprints.hits, fingerprints.misses) == (1, 1)
+    fingerprints.save()
+
+    with patch("igtools.specifications.cache.normalize.build_fingerprint") as build:
+        reloaded = cache.FingerprintCache(directory).load()
+        assert reloaded.fingerprint("Text A", "A", "SHALL") == expected
+    build.assert_not_called()
+
+    # Another scheme starts with an empty cache
+    digest = cache.FingerprintCache.digest("Text A", "A", "SHALL")
+    with patch.object(normalize, "FINGERPRINT_SCHEME", "other-scheme"):
+        assert cache.FingerprintCache(directory).load().entries == {}
+        assert cache.FingerprintCache.digest("Text A", "A", "SHALL") != digest
+
+
+def test_fingerprint_cache_evicts_least_recently_used(tmp_path):
+    fingerprints = cache.FingerprintCache(str(tmp_path), maxsize=2)
+    fingerprints.fingerprint("A", "", "")
+    fingerprints.fingerprint("B", "", "")
+    fingerprints.fingerprint("A", "", "")
+    fingerprints.fingerprint("C", "", "")
+    assert list(fingerprints.entries) == [cache.FingerprintCache.digest(text, "", "") for text in ("A", "C")]
+
+
+def test_processor_fingerprints_unchanged_requirements_once(mock_config, pages):
+    existing = [Requirement(key="REQ-A", title="A", text="Text A", conformance="SHALL", version=1),
+                Requirement(key="REQ-B", title="B", text="Text B", version=1)]
+    for req in existing:
+        req.content_hash = req.content_hash
+
+    def run_with_cache():
+        processor = Processor(mock_config)
+        processor.fingerprints = cache.FingerprintCache(cache.cache_directory(mock_config)).load()
+        processor.key_generator = id_module.create_generator(config=mock_config, existing_keys=["REQ-A", "REQ-B"])
+        with patch.object(id_module, "current_ids", set()):
+            processor._process_files(existing_map={r.key: r for r in existing}, dry_run=False)
+        processor.fingerprints.save()
+        return processor.fingerprints
+
+    assert run_with_cache().misses == 2
+    with patch("igtools.specifications.cache.normalize.build_fingerprint") as build:
+        assert run_with_cache().hits == 2
+    build.assert_not_called()
@@ -0,0 +1,108 @@
+import pytest
+from unittest.mock import MagicMock
+
+from igtools.specifications import columns as columns_module
+from igtools.specifications import normalize
+from igtools.specifications.columns import ReleaseColumns
+from igtools.specifications.data import Release, Requirement, ReleaseState
+from igtools.specifications.release import ReleaseManager
+
+
+BACKENDS = [False, pytest.param(True, marks=pytest.mark.skipif(columns_module.numpy is None,
+                                                                 reason="NumPy is not installed"))]
+
+
+def requirement(key, status, version=1, source="page.md", text=None):
+    req = Requirement(key=key, title=key, text=text or f"Text of {key}", version=version, source=source)
+    req.release_status = status
+    return req
+
+
+@pytest.fixture
+def requirements():
+    return [
+        requirement("REQ-3", "NEW", source="b.md"),
+        requirement("REQ-1", "STABLE"),
+        requirement("REQ-2", "DELETED", version="2"),
+        requirement("REQ-4", "MODIFIED", version=3, source="b.md"),
+    ]
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_filters_and_counts(requirements, use_numpy):
+    columns = ReleaseColumns(requirements, use_numpy=use_numpy)
+    assert len(columns) == 4
+    assert list(columns.where(exclude=[ReleaseState.STABLE])) == [0, 2, 3]
+    assert list(columns.where(status=["NEW", "MODIFIED"], source="b.md")) == [0, 3]
+    assert columns.count(exclude=[ReleaseState.DELETED]) == 3
+    assert columns.count(source="missing.md") == 0
+    assert [req.key for req in columns.rows(columns.where(status=["DELETED"]))] == ["REQ-2"]
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_rows_are_built_on_access(requirements, use_numpy):
+    columns = ReleaseColumns([req.serialize() for req in requirements], use_numpy=use_numpy)
+    assert not any(isinstance(row, Requirement) for row in columns._rows)
+
+    assert columns.version(2) == "2" and columns.version(3) == 3
+    assert columns.content_hash(0) == requirements[0].content_hash
+    assert not any(isinstance(row, Requirement) for row in columns._rows[:2])
+
+    req = columns.row(1)
+    assert isinstance(req, Requirement) and req.is_stable and req.key == "REQ-1"
+    assert columns.row(1) is req
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_sort_join_and_changes(requirements, use_numpy):
+    current = ReleaseColumns(requirements, use_numpy=use_numpy)
+    previous = ReleaseColumns([requirement("REQ-1", "NEW"),
+                               requirement("REQ-2", "NEW", version="2"),
+                               requirement("REQ-4", "NEW", version=2, source="b.md"),
+                               requirement("REQ-5", "NEW")], use_numpy=use_numpy)
+
+    assert [current.key(i) for i in current.sort_by_key()] == ["REQ-1", "REQ-2", "REQ-3", "REQ-4"]
+    assert [current.key(i) for i in current.sort_by_key([0, 1])] == ["REQ-1", "REQ-3"]
+
+    left, right = current.join(previous)
+    assert [current.key(i) for i in left] == ["REQ-1", "REQ-2", "REQ-4"]
+    assert [previous.key(i) for i in right] == ["REQ-1", "REQ-2", "REQ-4"]
+    # REQ-3 is new, the version of REQ-4 changed
+    assert [current.key(i) for i in current.changed(previous)] == ["REQ-3", "REQ-4"]
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_fingerprint_matches_requirements(requirements, use_numpy):
+    requirements[1].content_hash = "NOT-HEX"
+    expected = normalize.build_fingerprint_release(requirements)
+    assert normalize.build_fingerprint_columns(ReleaseColumns(requirements, use_numpy=use_numpy)) == expected
+    records = [req.serialize() for req in requirements]
+    assert normalize.build_fingerprint_columns(ReleaseColumns(records, use_numpy=use_numpy)) == expected
+
+
+def test_release_columns_follow_the_requirements(requirements):
+    release = Release(version="1.0.0")
+    release.columns = ReleaseColumns([req.serialize() for req in requirements])
+    assert release.columns.count(status=["STABLE"]) == 1
+
+    release.requirements[0].release_status = "STABLE"
+    assert release.columns.count(status=["STABLE"]) == 2
+
+
+@pytest.mark.parametrize("storage_format", ["yaml", "packed", "sqlite", "blobs", "delta"])
+def test_columnar_load(tmp_path, requirements, storage_format):
+    config = MagicMock(path=str(tmp_path / ".igtools"), current="1.0.0", releases=["1.0.0"], storage=storage_format)
+    manager = ReleaseManager(config)
+    release = Release(version="1.0.0")
+    release.requirements = requirements
+    manager.save(release)
+    ReleaseManager.cache.clear()
+
+    try:
+        loaded = manager.load(columnar=True)
+        assert sorted(loaded.columns.keys) == ["REQ-1", "REQ-2", "REQ-3", "REQ-4"]
+        assert normalize.build_fingerprint_columns(loaded.columns) == \
+            normalize.build_fingerprint_release(manager.load().requirements)
+        assert sorted(req.key for req in loaded.requirements) == ["REQ-1", "REQ-2", "REQ-3", "REQ-4"]
+    finally:
+        ReleaseManager.cache.clear()
@@ -1,6 +1,10 @@
+import copy
+import json
+import pickle
 import pytest
 from datetime import datetime
-from igtools.specifications.data import Requirement, Release, ReleaseState, PublicationStatus
+from unittest.mock import MagicMock, patch
+from igtools.specifications.data import Requirement, Release, ReleaseState, PublicationStatus, serialized_digest
 
 
 def test_requirement_basic_properties():
@@ -123,3 +127,96 @@ def test_release_serialize_deserialize():
 def test_enums():
     assert ReleaseState.NEW.value == "NEW"
     assert PublicationStatus.RETIRED.name == "RETIRED"
+
+
+def test_requirement_is_dirty():
+    data = Requirement(key="REQ-1", title="A", actor=["X"]).serialize()
+    req = Requirement().deserialize(data, digest=serialized_digest(data))
+    assert req.is_dirty is False
+    req.test_procedures["X"] = ["T1"]
+    assert req.is_dirty is True
+    assert Requirement().deserialize(data).is_dirty is True
+
+
+def test_release_archive_is_lazy():
+    release = Release(version="1.0.0")
+    assert release.archive == []
+
+    loader = MagicMock(return_value=[Requirement(key="REQ-0")])
+    release = Release(version="1.0.0")
+    release.archive_loader = loader
+    release.archive_keys_loader = MagicMock(return_value=["REQ-0"])
+    assert release.archive_keys == ["REQ-0"]
+    loader.assert_not_called()
+    assert [r.key for r in release.archive] == ["REQ-0"]
+    assert [r.key for r in release.archive] == ["REQ-0"]
+    loader.assert_called_once()
+
+
+def test_requirement_is_slotted_and_parses_dates_once():
+    data = Requirement(key="REQ-1", actor=["EPA-PS"], test_procedures={"EPA-PS": ["Produkttest"]}).serialize()
+    data["created"] = "2025-01-01T10:00:00"
+    r = Requirement().deserialize(data)
+    assert not hasattr(r, "__dict__")
+    with pytest.raises(AttributeError):
+        r.unknown = 1
+
+    with patch("igtools.specifications.data.datetime") as mocked:
+        mocked.fromisoformat.return_value = datetime(2025, 1, 1, 10)
+        assert r.created == r.created == datetime(2025, 1, 1, 10)
+    mocked.fromisoformat.assert_called_once_with("2025-01-01T10:00:00")
+    assert r.modified is None
+
+    copied = copy.deepcopy(r)
+    assert copied.created == datetime(2025, 1, 1, 10)
+    assert pickle.loads(pickle.dumps(Requirement().deserialize(data))).created == datetime(2025, 1, 1, 10)
+
+
+def test_requirement_status_is_an_enum_and_strings_are_interned():
+    data = Requirement(key="REQ-1", actor=["EPA-PS"], test_procedures={"EPA-PS": ["Produkttest"]}).serialize()
+    first = Requirement().deserialize(json.loads(json.dumps(data)))
+    second = Requirement().deserialize(json.loads(json.dumps(data)))
+
+    assert first._release_status is ReleaseState.NEW and first.release_status == "NEW"
+    assert type(first.release_status) is str and first.serialize() == data
+    assert first.actor[0] is second.actor[0]
+    assert first.test_procedures["EPA-PS"][0] is second.test_procedures["EPA-PS"][0]
+
+    first.release_status = "unknown"
+    assert first.release_status == "unknown" and not first.is_new
+
+
+def test_content_hash_is_computed_once_per_content():
+    from igtools.specifications import normalize
+    r = Requirement(key="REQ-1", title="Title", text="Some text", conformance="SHALL", actor=["EPA-PS"])
+    normalize.counter.reset()
+    first = r.content_hash
+    r.serialize()
+    r.actor = ["EPA-FdV"]
+    r.version = 2
+    assert r.content_hash == first and normalize.counter.computed == 1
+
+    for name, value in (("text", "Other text"), ("title", "Other"), ("conformance", "SHOULD")):
+        setattr(r, name, value)
+        expected, _ = normalize.build_requirement_fingerprint(r)
+        assert r.content_hash == expected != first
+        first = expected
+
+    # A stored hash is kept when the content changes
+    loaded = Requirement().deserialize(r.serialize())
+    loaded.text = "Changed again"
+    assert loaded.content_hash == first
+    assert copy.deepcopy(r).content_hash == r.content_hash
+
+
+def test_content_hash_follows_the_fingerprint_scheme():
+    from igtools.specifications import normalize
+    r = Requirement(key="REQ-1", title="Title", text="Some text", conformance="SHALL")
+    legacy = r.content_hash
+    try:
+        normalize.use_scheme("blake2b16-bin")
+        expected, _ = normalize.build_requirement_fingerprint(r)
+        assert r.content_hash == expected != legacy
+    finally:
+        normalize.use_scheme(normalize.LEGACY_SCHEME)
+    assert r.content_hash == legacy
@@ -1,10 +1,12 @@
 import os
 import json
+import yaml
 import pytest
 from unittest.mock import patch, mock_open, MagicMock
 from igtools.specifications.exporter import RequirementExporter
 from igtools.specifications.data import Requirement, Release
 from igtools.errors import ExportFormatUnknown, ReleaseNotesOutputPathNotExists
+from igtools.utils import convert_to_link
 
 
 @pytest.fixture
@@ -40,6 +42,7 @@ def test_export_writes_json_file(tmp_path, mock_config):
     with patch.object(exporter.release_manager, "load", return_value=release), \
          patch("os.path.exists", return_value=True), \
          patch("builtins.open", mock_open()) as mocked_file, \
+         patch("os.replace"), \
          patch("igtools.specifications.exporter.convert_to_link", return_value="file.html"):
 
         exporter.export(str(tmp_path))
@@ -71,6 +74,7 @@ def test_export_skips_deleted_requirements(tmp_path, mock_config):
     with patch.object(exporter.release_manager, "load", return_value=release), \
          patch("os.path.exists", return_value=True), \
          patch("builtins.open", mock_open()) as mocked_file, \
+         patch("os.replace"), \
          patch("igtools.specifications.exporter.convert_to_link", return_value="dummy.html"):
 
         exporter.export(str(tmp_path))
@@ -138,6 +142,7 @@ def test_export_outputs_full_data_structure(tmp_path, mock_config):
     with patch.object(exporter.release_manager, "load", return_value=release), \
          patch("os.path.exists", return_value=True), \
          patch("builtins.open", mock_open()) as mocked_file, \
+         patch("os.replace"), \
          patch("igtools.specifications.exporter.convert_to_link", return_value="path/to/requirement.html"):
 
         exporter.export(str(tmp_path))
@@ -148,3 +153,41 @@ def test_export_outputs_full_data_structure(tmp_path, mock_config):
 
         assert data == expected_data
 
+
+
+@pytest.mark.parametrize("storage_format", ["yaml", "packed", "sqlite", "blobs", "delta"])
+@pytest.mark.parametrize("format", ["JSON", "YAML"])
+def test_streamed_export_is_written_as_before(tmp_path, storage_format, format):
+    config = MagicMock(path=str(tmp_path / ".igtools"), current="1.0.0", releases=["1.0.0"], storage=storage_format)
+    config.name = "Test Project"
+    deleted = Requirement(key="REQ-3", title="C", text="Deleted", source="b.md")
+    deleted.release_status = "DELETED"
+    requirements = [Requirement(key="REQ-1", title="A", text="Text Ä", source="a.md"),
+                    Requirement(key="REQ-2", title="B", source="a.md"), deleted]
+    exporter = RequirementExporter(config=config, format=format)
+    exporter.release_manager.store.save(exporter.release_manager.release_directory("1.0.0"), requirements)
+
+    output = tmp_path / ("requirements.json" if format == "JSON" else "requirements.yaml")
+    exporter.export(str(output))
+
+    stored = exporter.release_manager.load(columnar=True)
+    expected = []
+    for req in stored.requirements:
+        if req.release_status != "DELETED":
+            expected.append(dict(req.serialize(), path=convert_to_link(req.source), release="1.0.0"))
+    if format == "JSON":
+        assert output.read_text(encoding="utf-8") == json.dumps(expected, indent=4, ensure_ascii=False)
+    else:
+        assert output.read_text(encoding="utf-8") == yaml.dump(expected, default_flow_style=False, allow_unicode=True)
+
+
+@pytest.mark.parametrize("format", ["JSON", "YAML"])
+def test_failed_export_leaves_no_truncated_file(tmp_path, mock_config, format):
+    release = Release(name="Demo", version="1.0.0")
+    release.requirements = [Requirement(key="REQ-1", title="A", source="file.md")]
+    exporter = RequirementExporter(config=mock_config, format=format)
+    with patch.object(exporter.release_manager, "load", return_value=release), \
+         patch.object(Requirement, "serialize", side_effect=RuntimeError("store failed")):
+        with pytest.raises(RuntimeError):
+            exporter.export(str(tmp_path))
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,103 @@
+import os
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+
+from igtools.errors import FrozenReleaseException
+from igtools.specifications import cache
+from igtools.specifications.freeze import FrozenPages
+from igtools.specifications.processor import Processor
+from igtools.specifications.release import ReleaseManager
+from igtools.utils import id as id_module
+
+
+PAGES = {
+    "a.html": '<p>Intro</p>\n<requirement title="A" key="REQ-PYT1">Text A</requirement>\n'
+              '<requirement title="B" key="REQ-PYT2">Text B</requirement>',
+    "b.md": '<requirement title="C" key="REQ-PYT3" conformance="SHALL">Text C</requirement>',
+    "c.html": '<p>no requirements</p>',
+}
+
+
+@pytest.fixture
+def project(tmp_path):
+    pages = tmp_path / "pages"
+    pages.mkdir()
+    for name, content in PAGES.items():
+        (pages / name).write_text(content)
+    config = MagicMock(path=str(tmp_path / ".igtools"), directory=str(pages), current="1.0.0", releases=["1.0.0"],
+                       storage="packed", frozen_version=None, frozen_hash=None, frozen_tree=None,
+                       prefix="REQ", separator="-", scope="PYT", key_mode="sequential", current_req_number=4)
+    manager = ReleaseManager(config)
+    os.makedirs(manager.release_directory("1.0.0"))
+    ReleaseManager.cache.clear()
+    with patch.object(id_module, "current_ids", set()):
+        processor = Processor(config, input=str(pages))
+        processor.process()
+        manager.freeze_release(pages=processor.all_filepaths())
+        yield config, pages
+    ReleaseManager.cache.clear()
+
+
+def verify(config, pages):
+    with patch.object(cache, "scan_page", side_effect=cache.scan_page) as scan_page:
+        Processor(config, input=str(pages)).verify_frozen()
+    return sorted(os.path.basename(call.args[0]) for call in scan_page.call_args_list)
+
+
+def test_freeze_records_page_digests_and_keys(project):
+    config, pages = project
+    manifest = FrozenPages(config.path).load()
+    assert manifest.version == "1.0.0"
+    assert manifest.pages[str(pages / "a.html")]["keys"] == ["REQ-PYT1", "REQ-PYT2"]
+    assert manifest.pages[str(pages / "c.html")]["keys"] == []
+    assert manifest.changed([str(pages / name) for name in PAGES]) == []
+
+    ReleaseManager(config).unfreeze_release()
+    assert not os.path.exists(manifest.filepath)
+
+
+def test_unchanged_pages_are_not_parsed(project):
+    assert verify(*project) == []
+
+
+def test_only_changed_pages_are_parsed(project):
+    config, pages = project
+    # Changes outside of the requirements do not break the freeze
+    (pages / "a.html").write_text(PAGES["a.html"].replace("Intro", "Introduction"))
+    (pages / "d.html").write_text("<p>new page</p>")
+    os.remove(pages / "c.html")
+    assert verify(config, pages) == ["a.html", "d.html"]
+
+
+def test_changed_requirements_and_pages_are_reported(project):
+    config, pages = project
+    (pages / "b.md").write_text(PAGES["b.md"].replace("Text C", "Changed C"))
+    (pages / "c.html").write_text('<requirement title="D">Text D</requirement>')
+    with pytest.raises(FrozenReleaseException) as error:
+        verify(config, pages)
+    # The new requirement is reported with the key it would get
+    assert error.value.keys[0] == "REQ-PYT3" and error.value.keys[1].startswith("REQ-PYT")
+    assert error.value.pages == [str(pages / "b.md"), str(pages / "c.html")]
+    # Nothing is written by the verification
+    assert (pages / "c.html").read_text() == '<requirement title="D">Text D</requirement>'
+
+
+def test_frozen_without_page_manifest_processes_all_pages(project):
+    config, pages = project
+    os.remove(FrozenPages(config.path).filepath)
+    assert verify(config, pages) == ["a.html", "b.md", "c.html"]
+
+    (pages / "a.html").write_text(PAGES["a.html"].replace("Text B", "Changed B"))
+    with pytest.raises(FrozenReleaseException) as error:
+        verify(config, pages)
+    assert error.value.keys == ["REQ-PYT2"]
+
+
+def test_process_of_frozen_release_verifies_changed_pages(project):
+    config, pages = project
+    (pages / "a.html").write_text(PAGES["a.html"].replace("Text A", "Changed A"))
+    with pytest.raises(FrozenReleaseException) as error:
+        Processor(config, input=str(pages)).process()
+    assert error.value.keys == ["REQ-PYT1"]
+    assert json.loads((pages.parent / ".igtools" / "frozen-pages.json").read_text())["version"] == "1.0.0"
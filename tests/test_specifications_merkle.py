@@ -0,0 +1,97 @@
+import random
+import hashlib
+import pytest
+from unittest.mock import MagicMock, patch
+
+from igtools.errors import FrozenReleaseException
+from igtools.specifications import merkle
+from igtools.specifications.data import Release, Requirement
+from igtools.specifications.merkle import ReleaseTree
+from igtools.specifications.release import ReleaseManager
+
+
+def entries(count):
+    return [(f"REQ-PYT{n:05d}", 1, hashlib.sha256(str(n).encode()).hexdigest()) for n in range(count)]
+
+
+def test_root_does_not_depend_on_order():
+    shuffled = entries(200)
+    random.Random(21).shuffle(shuffled)
+    assert ReleaseTree(entries(200)).root == ReleaseTree(shuffled).root
+    assert ReleaseTree(entries(200)).root != ReleaseTree(entries(199)).root
+    assert ReleaseTree().root == ReleaseTree([]).root
+
+
+def test_update_and_remove_match_a_rebuild():
+    tree = ReleaseTree(entries(300))
+    tree.root
+    tree.update("REQ-PYT00007", 2, "changed")
+    tree.update("REQ-NEW", 0, "new")
+    tree.remove("REQ-PYT00100")
+
+    expected = [e for e in entries(300) if e[0] not in ("REQ-PYT00007", "REQ-PYT00100")]
+    expected += [("REQ-PYT00007", 2, "changed"), ("REQ-NEW", 0, "new")]
+    assert tree.root == ReleaseTree(expected).root
+    assert tree.buckets() == ReleaseTree(expected).buckets()
+
+
+def test_update_only_rehashes_its_path():
+    tree = ReleaseTree(entries(2000))
+    tree.root
+    with patch.object(merkle.hashlib, "sha256", side_effect=hashlib.sha256) as sha256:
+        tree.update("REQ-PYT00042", 2, "changed")
+        tree.root
+    # Key path and leaf, then one node per level
+    assert sha256.call_count <= 2 + 6
+
+
+def test_diff_names_changed_keys():
+    frozen = ReleaseTree(entries(500))
+    current = ReleaseTree(entries(500))
+    current.update("REQ-PYT00010", 2, "changed")
+    current.update("REQ-NEW", 0, "new")
+    current.remove("REQ-PYT00400")
+    assert current.diff(frozen) == ["REQ-NEW", "REQ-PYT00010", "REQ-PYT00400"]
+    assert frozen.diff(ReleaseTree(entries(500))) == []
+    assert len(frozen.buckets()) == 16
+
+
+@pytest.fixture
+def manager(tmp_path):
+    config = MagicMock(path=str(tmp_path / ".igtools"), current="1.0.0", releases=["1.0.0"], storage="packed",
+                       frozen_version=None, frozen_tree=None)
+    manager = ReleaseManager(config)
+    release = Release(version="1.0.0")
+    release.requirements = [Requirement(key=f"REQ-{n}", title=f"T{n}", text=f"Text {n}", version=1) for n in range(20)]
+    manager.save(release)
+    ReleaseManager.cache.clear()
+    yield manager
+    ReleaseManager.cache.clear()
+
+
+def test_frozen_integrity_names_changed_requirements(manager):
+    manager.freeze_release()
+    assert manager.config.frozen_tree["root"] == ReleaseTree.from_requirements(manager.load().requirements).root
+
+    requirements = [Requirement().deserialize(req.serialize()) for req in manager.load().requirements]
+    manager.verify_release_integrity(requirements)
+
+    changed = next(req for req in requirements if req.key == "REQ-3")
+    changed.text = "Changed"
+    changed.content_hash = ""
+    requirements.append(Requirement(key="REQ-NEW", title="New", text="New"))
+    with pytest.raises(FrozenReleaseException) as error:
+        manager.verify_release_integrity(requirements)
+    assert error.value.keys == ["REQ-3", "REQ-NEW"]
+    assert "REQ-3, REQ-NEW" in str(error.value)
+
+
+def test_release_frozen_without_tree_is_verified_by_hash(manager):
+    manager.freeze_release()
+    manager.config.frozen_tree = None
+    requirements = [Requirement().deserialize(req.serialize()) for req in manager.load().requirements]
+    manager.verify_release_integrity(requirements)
+    requirements[0].version = 2
+    with pytest.raises(FrozenReleaseException) as error:
+        manager.verify_release_integrity(requirements)
+    assert error.value.keys == []
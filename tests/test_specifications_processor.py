@@ -6,6 +6,7 @@ from unittest.mock import MagicMock, patch, mock_open
 
 from igtools.config import CONFIG_DEFAULT_DIR
 from igtools.specifications.processor import Processor, FileProcessor
+from igtools.specifications import scanner
 from igtools.utils.id import SequentialIdGenerator, RandomIdGenerator
 from igtools.errors import NoReleaseVersionSetException, ReleaseNotFoundException, DuplicateRequirementIDException, FinalReleaseException
 from igtools.specifications.data import Requirement, Release, ReleaseState
@@ -142,14 +143,14 @@ def test_validate_input_files_duplicate_key(tmp_path, processor):
 
 
 def test_update_or_create_requirement_creates_new(processor):
-    soup = BeautifulSoup('<requirement title="Title" actor="EPA-Medication-Service">Text</requirement>', 'html.parser')
-    soup_tag = soup.requirement
+    content = '<requirement title="Title" actor="EPA-Medication-Service">Text</requirement>'
+    requirement_tag = scanner.parse_requirement(next(scanner.iter_requirement_blocks(content)))
 
     with patch("igtools.specifications.processor.id.generate_id", return_value="REQ-TST00001A00"), \
          patch("igtools.specifications.processor.id.add_id"):
 
         fp = FileProcessor(processor=processor, file_path="file.html", existing_map={})
-        req = fp._update_or_create_requirement(soup_req=soup_tag, text="Text")
+        req = fp._update_or_create_requirement(requirement_tag=requirement_tag, text="Text")
         assert req.key == "REQ-TST00001A00"
         assert req.version == 0
         assert req.title == "Title"
@@ -683,4 +684,69 @@ def test_process_file_preserves_requirement_actor_test_procedure_on_inactive(tmp
         assert requirements[0].test_procedures == expected_test_procedures
 
         # Ensure create_new_requirement was really called (not mocked)
-        wrapped_create.assert_called_once()
\ No newline at end of file
+        wrapped_create.assert_called_once()
+
+def test_process_files_parallel_matches_serial(tmp_path, mock_config):
+    from igtools.utils import id as id_module
+
+    mock_config.key_mode = "sequential"
+    pages = {
+        "a.html": '<requirement title="A" actor="ACTOR-A">Text A</requirement>\n<requirement title="B" key="REQ-PYT1">Text B</requirement>',
+        "b.md": '<requirement title="C" conformance="SHALL">\n    <actor name="X"><testProcedure id="T1"/></actor>\n    Text C\n</requirement>',
+        "c.html": '<p>no requirements</p>',
+        "d.html": '<requirement title="D">Text D</requirement><requirement title="E">Text E</requirement>',
+    }
+
+    results = {}
+    for jobs in (1, 2):
+        directory = tmp_path / f"jobs{jobs}"
+        directory.mkdir()
+        for name, content in pages.items():
+            (directory / name).write_text(content)
+        mock_config.current_req_number = 1
+        processor = Processor(mock_config, input=str(directory), jobs=jobs)
+        existing_map = {"REQ-PYT1": Requirement(key="REQ-PYT1", title="B", text="Text B")}
+        processor.key_generator = SequentialIdGenerator(config=mock_config, existing_keys=existing_map.keys())
+        with patch.object(id_module, "current_ids", set()):
+            requirements = processor._process_files(existing_map=existing_map, dry_run=False)
+        outputs = {p.name: p.read_text() for p in sorted(directory.iterdir())}
+        results[jobs] = ([(r.key, r.title, r.version, os.path.basename(r.source)) for r in requirements], outputs, mock_config.current_req_number)
+
+    assert results[1] == results[2]
+    assert results[2][2] == 5
+
+
+def test_process_loads_release_and_reads_pages_once(tmp_path, mock_config):
+    from igtools.utils import id as id_module
+
+    mock_config.key_mode = "sequential"
+    mock_config.current_req_number = 1
+    directory = tmp_path / "pages"
+    directory.mkdir()
+    (directory / "a.html").write_text('<requirement title="A" key="REQ-PYT1">Text A</requirement>')
+    (directory / "b.md").write_text('<requirement title="B">Text B</requirement>')
+
+    processor = Processor(mock_config, input=str(directory))
+    processor.release_manager = MagicMock()
+    processor.release_manager.load.return_value = Release()
+    processor.release_manager.is_current_release_frozen.return_value = False
+
+    real_open = open
+    reads = []
+
+    def tracking_open(file, mode='r', *args, **kwargs):
+        if 'r' in mode:
+            reads.append(os.path.basename(file))
+        return real_open(file, mode, *args, **kwargs)
+
+    with patch("builtins.open", side_effect=tracking_open), \
+         patch("os.path.exists", return_value=True), \
+         patch.object(id_module, "current_ids", set()):
+        processor.process()
+
+    processor.release_manager.load.assert_called_once()
+    # Besides the pages only the fingerprint cache is read
+    assert sorted(reads) == ["a.html", "b.md", "fingerprints.json"]
+    saved = processor.release_manager.save.call_args[0][0]
+    assert {r.key for r in saved.requirements} == {"REQ-PYT1", "REQ-PYT2"}
+    assert 'key="REQ-PYT2"' in (directory / "b.md").read_text()
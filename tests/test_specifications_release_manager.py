@@ -1,7 +1,11 @@
 import os
+import json
+import yaml
+import pickle
 import pytest
 from unittest.mock import patch, mock_open, MagicMock
 from igtools.config import CONFIG_DEFAULT_DIR
+from igtools.versioning import __VERSION__
 from igtools.specifications.release import ReleaseManager
 from igtools.specifications.data import Release, Requirement
 from igtools.errors import (
@@ -11,9 +15,10 @@ from igtools.errors import (
 
 
 @pytest.fixture
-def mock_config():
+def mock_config(tmp_path):
+    # Below tmp_path, nothing is written into the checkout
     return MagicMock(
-        path=CONFIG_DEFAULT_DIR,
+        path=str(tmp_path / CONFIG_DEFAULT_DIR),
         name="Test Project",
         current="1.0.0",
         releases=["1.0.0"],
@@ -29,20 +34,20 @@ def manager(mock_config):
 
 
 @pytest.fixture
-def directory():
-    return CONFIG_DEFAULT_DIR
+def directory(mock_config):
+    return mock_config.path
 
 
 def test_release_manager_directory(manager):
-    assert manager.directory == ".igtools/releases"
+    assert manager.directory == os.path.join(manager.config.path, "releases")
 
 
 def test_release_directory(manager):
-    assert manager.release_directory("1.0.0") == ".igtools/releases/1_0_0"
+    assert manager.release_directory("1.0.0") == os.path.join(manager.config.path, "releases", "1_0_0")
 
 
 def test_archive_directory(manager):
-    assert manager.archive_directory() == ".igtools/releases/archive"
+    assert manager.archive_directory() == os.path.join(manager.config.path, "releases", "archive")
 
 
 def test_check_new_version_ok(manager):
@@ -115,3 +120,239 @@ def test_load_version_returns_release(manager):
         assert isinstance(release, Release)
         assert len(release.requirements) == 1
         assert release.requirements[0].key == "REQ-TST01234A23"
+
+
+@pytest.fixture
+def release_manager(tmp_path, mock_config):
+    mock_config.path = str(tmp_path / ".igtools")
+    manager = ReleaseManager(mock_config)
+    manager.cache.clear()
+    manager.save(Release(version="1.0.0"))
+    release = Release(version="1.0.0")
+    release.requirements = [Requirement(key="REQ-1", title="A", actor=["X"], test_procedures={"X": ["T1"]}),
+                            Requirement(key="REQ-2", title="B")]
+    manager.save(release)
+    return manager
+
+
+def test_load_is_cached_and_copy_on_read(release_manager):
+    with patch("igtools.specifications.storage.yaml.safe_load") as safe_load:
+        release = release_manager.load()
+        safe_load.assert_not_called()
+    req = {r.key: r for r in release.requirements}["REQ-1"]
+    req.title = "changed"
+    req.actor.append("Y")
+    req.test_procedures["X"].append("T2")
+
+    req = {r.key: r for r in ReleaseManager(release_manager.config).load().requirements}["REQ-1"]
+    assert req.title == "A"
+    assert req.actor == ["X"]
+    assert req.test_procedures == {"X": ["T1"]}
+
+
+def test_load_reparses_changed_files(release_manager):
+    file_path = os.path.join(release_manager.release_directory("1.0.0"), "REQ-2.yaml")
+    with open(file_path, 'a', encoding='utf-8') as file:
+        file.write("conformance: SHALL\n")
+    with open(os.path.join(release_manager.release_directory("1.0.0"), "REQ-3.yaml"), 'w', encoding='utf-8') as file:
+        file.write("key: REQ-3\n")
+    os.remove(os.path.join(release_manager.release_directory("1.0.0"), "REQ-1.yaml"))
+
+    requirements = {r.key: r for r in release_manager.load().requirements}
+    assert set(requirements) == {"REQ-2", "REQ-3"}
+    assert requirements["REQ-2"].conformance == "SHALL"
+
+
+def test_save_and_delete_write_through(release_manager):
+    release = release_manager.load()
+    for req in release.requirements:
+        if req.key == "REQ-2":
+            req.title = "B2"
+        else:
+            req.for_deletion = True
+    release_manager.save(release)
+
+    with patch("igtools.specifications.storage.yaml.safe_load") as safe_load:
+        requirements = release_manager.load().requirements
+        safe_load.assert_not_called()
+    assert [(r.key, r.title) for r in requirements] == [("REQ-2", "B2")]
+
+
+def test_snapshot_spares_yaml_parsing_across_invocations(release_manager):
+    release_manager.load()
+    snapshot = release_manager.store.snapshot_path(release_manager.release_directory("1.0.0"))
+    assert os.path.exists(snapshot)
+
+    release_manager.cache.clear()
+    with patch("igtools.specifications.storage.yaml.safe_load") as safe_load:
+        requirements = release_manager.load().requirements
+        safe_load.assert_not_called()
+    assert {r.key for r in requirements} == {"REQ-1", "REQ-2"}
+
+    release_manager.cache.clear()
+    file_path = os.path.join(release_manager.release_directory("1.0.0"), "REQ-2.yaml")
+    with open(file_path, 'a', encoding='utf-8') as file:
+        file.write("conformance: SHALL\n")
+    with patch("igtools.specifications.storage.yaml.safe_load", return_value={"key": "REQ-2"}) as safe_load:
+        release_manager.load()
+        assert safe_load.call_count == 1
+
+
+def test_iter_records_streams_cached_data(release_manager):
+    directory = release_manager.release_directory("1.0.0")
+    store = release_manager.store
+    release_manager.load()
+    with patch("igtools.specifications.storage.yaml.safe_load") as safe_load:
+        records = list(store.iter_records(directory))
+        safe_load.assert_not_called()
+    records[0]["title"] = "changed"
+    assert {r.key: r.title for r in release_manager.load().requirements} == {"REQ-1": "A", "REQ-2": "B"}
+
+    # From the snapshot, only changed files are parsed and nothing is cached
+    release_manager.cache.clear()
+    with open(os.path.join(directory, "REQ-2.yaml"), 'a', encoding='utf-8') as file:
+        file.write("conformance: SHALL\n")
+    with patch("igtools.specifications.storage.yaml.safe_load", side_effect=yaml.safe_load) as safe_load:
+        records = {record["key"]: record for record in store.iter_records(directory)}
+        assert safe_load.call_count == 1
+    assert records["REQ-2"]["conformance"] == "SHALL"
+    assert records["REQ-1"]["title"] == "A"
+    assert store.cache.directories == {}
+
+
+def test_snapshot_is_json_and_never_unpickled(release_manager):
+    release_manager.load()
+    snapshot = release_manager.store.snapshot_path(release_manager.release_directory("1.0.0"))
+    with open(snapshot, encoding='utf-8') as file:
+        assert set(json.load(file)["entries"]) == {"REQ-1.yaml", "REQ-2.yaml"}
+
+    # A restored or tampered cache is parsed as data only, broken ones are ignored
+    for content in [pickle.dumps({"entries": {}}), b'{"version": ', b'{"version": "0", "entries": []}',
+                    json.dumps(dict(version=str(__VERSION__), format=3, entries={"REQ-1.yaml": [1, 2]})).encode()]:
+        with open(snapshot, 'wb') as file:
+            file.write(content)
+        release_manager.cache.clear()
+        with patch("igtools.specifications.storage.pickle", create=True) as unpickle:
+            assert {r.key for r in release_manager.load().requirements} == {"REQ-1", "REQ-2"}
+            unpickle.loads.assert_not_called()
+
+
+def test_snapshot_skips_data_json_cannot_hold(release_manager):
+    file_path = os.path.join(release_manager.release_directory("1.0.0"), "REQ-3.yaml")
+    with open(file_path, 'w', encoding='utf-8') as file:
+        file.write("key: REQ-3\ntitle: C\ncreated: 2025-01-01 10:00:00\n")
+    release_manager.cache.clear()
+    assert {r.key for r in release_manager.load().requirements} == {"REQ-1", "REQ-2", "REQ-3"}
+
+    release_manager.cache.clear()
+    with patch("igtools.specifications.storage.yaml.safe_load", side_effect=yaml.safe_load) as safe_load:
+        assert {r.key for r in release_manager.load().requirements} == {"REQ-1", "REQ-2", "REQ-3"}
+        assert safe_load.call_count == 1
+
+
+def test_same_size_edit_within_racy_window_is_not_served_stale(release_manager):
+    file_path = os.path.join(release_manager.release_directory("1.0.0"), "REQ-2.yaml")
+    release_manager.load()
+
+    def edit(old, new):
+        # Same size and mtime, as an edit within one tick of a coarse timestamp
+        stat = os.stat(file_path)
+        with open(file_path, encoding='utf-8') as file:
+            content = file.read()
+        with open(file_path, 'w', encoding='utf-8') as file:
+            file.write(content.replace(f"title: {old}", f"title: {new}"))
+        os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    edit("B", "C")
+    assert {r.key: r.title for r in release_manager.load().requirements}["REQ-2"] == "C"
+    # Across invocations, from the snapshot
+    release_manager.cache.clear()
+    edit("C", "D")
+    assert {r.key: r.title for r in release_manager.load().requirements}["REQ-2"] == "D"
+
+
+def test_files_outside_racy_window_are_trusted_by_signature(release_manager):
+    directory = release_manager.release_directory("1.0.0")
+    for file_name in os.listdir(directory):
+        past = os.stat(os.path.join(directory, file_name)).st_mtime_ns - 10 * 10**9
+        os.utime(os.path.join(directory, file_name), ns=(past, past))
+    release_manager.load()
+    release_manager.cache.clear()
+    with patch("igtools.specifications.storage.transaction.read_text") as read_text:
+        assert {r.key for r in release_manager.load().requirements} == {"REQ-1", "REQ-2"}
+        read_text.assert_not_called()
+
+
+def test_save_writes_only_changed_requirements(release_manager):
+    release = release_manager.load()
+    result = release_manager.save(release)
+    assert (result.written, result.skipped, result.deleted) == (0, 2, 0)
+
+    for req in release.requirements:
+        if req.key == "REQ-1":
+            req.title = "A2"
+        else:
+            req.for_deletion = True
+    release.requirements.append(Requirement(key="REQ-3", title="C"))
+    result = release_manager.save(release)
+    assert (result.written, result.skipped, result.deleted) == (2, 0, 1)
+    assert str(result) == "2 written, 0 unchanged, 1 deleted"
+
+
+def test_save_rewrites_files_changed_on_disk(release_manager):
+    release = release_manager.load()
+    file_path = os.path.join(release_manager.release_directory("1.0.0"), "REQ-2.yaml")
+    with open(file_path, 'a', encoding='utf-8') as file:
+        file.write("conformance: SHALL\n")
+
+    result = release_manager.save(release)
+    assert (result.written, result.skipped) == (1, 1)
+    assert "SHALL" not in open(file_path, encoding='utf-8').read()
+
+
+def test_archive_is_loaded_lazily(release_manager):
+    release_manager.archive([Requirement(key="REQ-0", title="Old")])
+    release_manager.cache.clear()
+
+    with patch.object(release_manager.store, "load", wraps=release_manager.store.load) as load:
+        release = release_manager.load()
+        assert load.call_count == 1
+        assert release.archive_keys == ["REQ-0"]
+        assert load.call_count == 1
+        assert [r.title for r in release.archive] == ["Old"]
+        assert load.call_count == 2
+
+
+def create_release(release_manager):
+    release_manager.config.add_release = lambda version: release_manager.config.releases.append(version)
+    release = release_manager.load()
+    for req in release.requirements:
+        req.is_stable = True
+    release_manager.save(release)
+    release.requirements[0].title = "changed"
+    release_manager.save(release)
+    release_manager.create("1.1.0")
+    return release_manager.release_directory("1.0.0"), release_manager.release_directory("1.1.0")
+
+
+def test_create_links_unchanged_requirements(release_manager):
+    old, new = create_release(release_manager)
+    for key in ("REQ-1", "REQ-2"):
+        assert os.path.samefile(os.path.join(old, f"{key}.yaml"), os.path.join(new, f"{key}.yaml"))
+
+    release = release_manager.load()
+    release.requirements[0].title = "changed again"
+    release_manager.save(release)
+    titles = {r.key: r.title for r in release_manager.load_version("1.0.0").requirements}
+    assert titles[release.requirements[0].key] != "changed again"
+    assert not os.path.samefile(os.path.join(old, f"{release.requirements[0].key}.yaml"),
+                                os.path.join(new, f"{release.requirements[0].key}.yaml"))
+
+
+def test_create_copies_without_link_support(release_manager):
+    with patch("os.link", side_effect=OSError("not supported")):
+        old, new = create_release(release_manager)
+    for key in ("REQ-1", "REQ-2"):
+        assert not os.path.samefile(os.path.join(old, f"{key}.yaml"), os.path.join(new, f"{key}.yaml"))
+    assert {r.key: r.title for r in release_manager.load_version("1.1.0").requirements} == \
+        {r.key: r.title for r in release_manager.load_version("1.0.0").requirements}
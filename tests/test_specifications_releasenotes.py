@@ -3,20 +3,24 @@ import json
 import pytest
 from unittest.mock import MagicMock, patch, mock_open
 from igtools.specifications.releasenotes import ReleaseNoteManager
+from igtools.specifications.cache import ReleaseNotesCache
+from igtools.specifications.release import ReleaseManager
 from igtools.errors import ReleaseNotesOutputPathNotExists
 from igtools.specifications.data import Requirement, Release
 
 
 @pytest.fixture
-def mock_config():
-    config = MagicMock()
+def mock_config(tmp_path):
+    config = MagicMock(path=str(tmp_path / ".igtools"))
     config.releases = ["1.0.0", "1.1.0"]
     return config
 
 
 @pytest.fixture
 def manager(mock_config):
-    return ReleaseNoteManager(config=mock_config)
+    # The output file is mocked, the cache file must not end up in it
+    with patch.object(ReleaseNotesCache, "save"):
+        yield ReleaseNoteManager(config=mock_config)
 
 
 def test_generate_creates_release_notes(tmp_path, manager, mock_config):
@@ -36,6 +40,7 @@ def test_generate_creates_release_notes(tmp_path, manager, mock_config):
     # Patch dependencies
     with patch("os.path.exists", return_value=True), \
          patch("builtins.open", mock_open()) as mock_file, \
+         patch("os.replace"), \
          patch("igtools.specifications.releasenotes.convert_to_link", return_value="some/path.html"), \
          patch.object(manager.release_manager, "load_version", return_value=rel):
 
@@ -74,11 +79,12 @@ def test_generate_skips_stable_in_later_release(tmp_path, manager, mock_config):
     release_1_1.requirements = [req_v2]
 
     # Reihenfolge ist wichtig (wird reversed in JSON!)
-    def load_version_mock(version):
+    def load_version_mock(version, changes_only=False, columnar=False, streaming=False):
         return {"1.0.0": release_1_0, "1.1.0": release_1_1}[version]
 
     with patch("os.path.exists", return_value=True), \
          patch("builtins.open", mock_open()) as mock_file, \
+         patch("os.replace"), \
          patch("igtools.specifications.releasenotes.convert_to_link", return_value="source.html"), \
          patch.object(manager.release_manager, "load_version", side_effect=load_version_mock):
 
@@ -104,3 +110,65 @@ def test_generate_raises_if_output_missing(manager):
     with patch("os.path.exists", return_value=False):
         with pytest.raises(ReleaseNotesOutputPathNotExists):
             manager.generate("/some/fake/path")
+
+
+@pytest.mark.parametrize("storage_format", ["yaml", "packed", "sqlite", "blobs", "delta"])
+def test_past_release_notes_are_cached(tmp_path, storage_format):
+    config = MagicMock(path=str(tmp_path / ".igtools"), current="1.2.0", releases=["1.0.0", "1.1.0", "1.2.0"],
+                       storage=storage_format)
+    manager = ReleaseManager(config)
+    for n, version in enumerate(config.releases):
+        release = manager.load_version(version)
+        req = Requirement(key=f"REQ-{n}", title=f"T{n}", text="Text", version=1, source="page.md")
+        req.release_status = "NEW"
+        release.requirements = [req]
+        manager.save(release)
+    ReleaseManager.cache.clear()
+    output = tmp_path / "notes.json"
+
+    notes = ReleaseNoteManager(config=config)
+    try:
+        notes.generate(str(output))
+        expected = json.loads(output.read_text())
+        assert [r["version"] for r in expected["releases"]] == ["1.2.0", "1.1.0", "1.0.0"]
+
+        with patch.object(notes.release_manager, "load_version", wraps=notes.release_manager.load_version) as load:
+            notes.generate(str(output))
+        # Only the current release is loaded, the past ones come from the cache
+        assert [call.kwargs["version"] for call in load.call_args_list] == ["1.2.0"]
+        assert json.loads(output.read_text()) == expected
+
+        # A changed past release is loaded again
+        release = manager.load_version("1.0.0")
+        release.requirements[0].title = "Changed"
+        manager.save(release)
+        ReleaseManager.cache.clear()
+        with patch.object(notes.release_manager, "load_version", wraps=notes.release_manager.load_version) as load:
+            notes.generate(str(output), last=2)
+        # Releases out of the window are not loaded
+        assert "1.0.0" not in [call.kwargs["version"] for call in load.call_args_list]
+        assert [r["version"] for r in json.loads(output.read_text())["releases"]] == ["1.2.0", "1.1.0"]
+
+        notes.generate(str(output))
+        assert json.loads(output.read_text())["releases"][2]["requirements"][0]["title"] == "Changed"
+    finally:
+        ReleaseManager.cache.clear()
+
+
+def test_last_releases_are_picked_by_version(tmp_path):
+    # As Config.from_dict sorts them, as strings
+    config = MagicMock(path=str(tmp_path / ".igtools"), current="1.10.0",
+                       releases=sorted(["1.8.0", "1.9.0", "1.10.0"]), storage="yaml")
+    output = tmp_path / "notes.json"
+    notes = ReleaseNoteManager(config=config)
+    try:
+        # Picked by version, written in the order of config.releases as all release notes are
+        notes.generate(str(output), last=2)
+        assert [r["version"] for r in json.loads(output.read_text())["releases"]] == ["1.9.0", "1.10.0"]
+        notes.generate(str(output))
+        assert [r["version"] for r in json.loads(output.read_text())["releases"]] == ["1.9.0", "1.8.0", "1.10.0"]
+        for last in (0, -1):
+            with pytest.raises(ValueError):
+                notes.generate(str(output), last=last)
+    finally:
+        ReleaseManager.cache.clear()
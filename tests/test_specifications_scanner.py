@@ -0,0 +1,164 @@
+import re
+import random
+import pytest
+from bs4 import BeautifulSoup
+
+from igtools.errors import RequirementParseException
+from igtools.specifications import scanner
+
+
+REQUIREMENT_PATTERN = re.compile(r'(<requirement\b[^>]*)(>.*?</requirement>)', re.DOTALL)
+ACTOR_PATTERN = re.compile(r"<actor\b[^>]*/>|<actor\b[^>]*>.*?</actor>", re.IGNORECASE | re.DOTALL)
+META_PATTERN = re.compile(r"<meta\b[^>]*/>|<meta\b[^>]*>.*?</meta>", re.IGNORECASE | re.DOTALL)
+
+
+def soup_extract(block):
+    # Reference: what the BeautifulSoup based FileProcessor read from a block
+    tag = BeautifulSoup(block, 'html.parser').requirement
+    actors = []
+    for actor_tag in tag.find_all("actor"):
+        actors.append((actor_tag.get("name"), [dict(tp.attrs) for tp in actor_tag.find_all("testprocedure")]))
+    metas = [dict(m.attrs) for m in tag.find_all("meta")]
+    attrs = {k: (" ".join(v) if isinstance(v, list) else v) for k, v in tag.attrs.items()}
+    tag['version'] = 3
+    return attrs, actors, metas, str(tag).split(">", 1)[0]
+
+
+def scanner_extract(block):
+    tag = scanner.parse_requirement(block)
+    actors = [(a.get("name"), a.test_procedures) for a in tag.actors]
+    attrs = dict(tag.attrs)
+    tag['version'] = 3
+    return attrs, actors, tag.metas, tag.render_start_tag()
+
+
+CORPUS = [
+    '<requirement title="A" actor="EPA-PS" conformance="SHALL">Text</requirement>',
+    '<requirement actor="EPA-PS" conformance="SHALL" title="Test" actor="USER">\n'
+    '    <actor name="EPA-PS">\n        <testProcedure id="AN04"/>\n        <testProcedure active="false" id="AN05"/>\n    </actor>\n'
+    '    <actor name="CLIENT"><testProcedure id="AN04"></testProcedure></actor>\n'
+    '    <actor name="CLIENT0">\n    </actor>\n'
+    '    More information: <a href="https://example.com/page?user=42&token=abc">Information</a>.\n</requirement>',
+    '<requirement conformance="SHALL" key="IG-1" title="T &amp; Q" version="1">\n'
+    '    <meta lockversion="true"/>\n    <meta lockVersion=\'false\'>\n'
+    '    <actor name="A">\n        <testProcedure id="P1">\n    </actor>\n'
+    '    <actor name="B"/>\n    <testProcedure id="P2"/>\n    Text <br> more <br/> text\n</requirement>',
+    '<requirement title=\'say "hi"\' class="  a   b " data-x=unquoted flag>\n'
+    '    <!-- <actor name="hidden"> -->\n    <actor name="A"><actor name="B"><testProcedure id="X"/></actor></actor>\n'
+    '    <script>var x = "<actor name=\'S\'>";</script>\n    Body\n</requirement>',
+    '<requirement title="unclosed">\n    <actor name="A">\n        <testProcedure id="P1"/>\n'
+    '    <actor name="B">\n        <testProcedure id="P2"/>\n    </actor>\n    Body\n</requirement>',
+    '<requirement title="Q">\n    <actor name="a>b"><testProcedure id="1"/></actor>\n'
+    '    </ACTOR>\n    <Actor NAME="Upper"><TestProcedure ID="U1"/></Actor>\n    </br></meta>\n</requirement>',
+]
+
+
+@pytest.mark.parametrize("content", CORPUS)
+def test_scanner_matches_soup(content):
+    blocks = list(scanner.iter_requirement_blocks(content))
+    matches = list(REQUIREMENT_PATTERN.finditer(content))
+    assert [(b.start, b.end) for b in blocks] == [m.span() for m in matches]
+    for block in blocks:
+        assert scanner_extract(block) == soup_extract(block.raw)
+
+
+@pytest.mark.parametrize("inner", [
+    "<div='x>'><actor name=\"A\"/>",
+    "<actor='x' name=\"A\"><testProcedure id='1'/></actor>",
+    "<actor name=\"A\" =\"z>\"'' >",
+    "<actor ='<b<div/>'y>'</div><b'y>' >",
+    "<actor><actor='</div><testProcedure id='1'/><actor=' >",
+    "<actor name=\"A\" ",
+    "<actor name='A",
+    "<actor name=\"A\"><testProcedure id=",
+])
+def test_degenerate_start_tags_match_soup(inner):
+    block = next(scanner.iter_requirement_blocks(f'<requirement title="Q">{inner}</requirement>'))
+    assert scanner_extract(block) == soup_extract(block.raw)
+
+
+def test_degenerate_start_tags_match_soup_fuzz():
+    rnd = random.Random(3)
+    pieces = ["<div", "<actor", " name=\"A\"", "'", '"', "=", ">", "/>", " ", "<testProcedure id='1'/>",
+              "</actor>", "x", "</div>", "<b", "'y>'", "\"z>\"", "=\"", "='"]
+    for _ in range(2000):
+        inner = "".join(rnd.choice(pieces) for _ in range(rnd.randint(1, 10)))
+        for block in scanner.iter_requirement_blocks(f'<requirement title="Q">{inner}</requirement>'):
+            assert scanner_extract(block) == soup_extract(block.raw)
+
+
+def test_iter_requirement_blocks_matches_regex_on_page():
+    content = "".join([
+        "<p>intro</p>", CORPUS[0], "<requirement title='open'>no end ", CORPUS[1],
+        "<requirements>not a block</requirements>", CORPUS[2], "<requirement x"
+    ])
+    blocks = list(scanner.iter_requirement_blocks(content))
+    assert [(b.start, b.start_tag_end, b.end) for b in blocks] == \
+        [(m.start(), m.end(1), m.end()) for m in REQUIREMENT_PATTERN.finditer(content)]
+
+
+def test_substitute_requirements_keeps_other_content():
+    content = "<p>a</p>" + CORPUS[0] + "<p>b</p>"
+    result = scanner.substitute_requirements(content, lambda block: "X")
+    assert result == "<p>a</p>X<p>b</p>"
+
+
+def test_inner_text_matches_regex_stripping():
+    block = next(scanner.iter_requirement_blocks(CORPUS[2]))
+    _, rest = REQUIREMENT_PATTERN.match(CORPUS[2]).groups()
+    expected = rest[len(">"):-len("</requirement>")].strip()
+    expected = ACTOR_PATTERN.sub("", expected).strip()
+    expected = META_PATTERN.sub("", expected).strip()
+    assert block.inner_text() == expected
+
+
+def test_strip_elements_matches_regex_fuzz():
+    rnd = random.Random(42)
+    pieces = ["<actor", "<ACTOR name='x'", "<actor/>", "</actor>", "</Actor>", ">", "/", "/>",
+              "<actors", "<meta", "</meta>", "text", " ", "\n", "<", "\"", "<actor-x>"]
+    for _ in range(2000):
+        text = "".join(rnd.choice(pieces) for _ in range(rnd.randint(0, 25)))
+        assert scanner.strip_elements(text, "actor") == ACTOR_PATTERN.sub("", text)
+        assert scanner.strip_elements(text, "meta") == META_PATTERN.sub("", text)
+
+
+def test_iter_requirement_blocks_matches_regex_fuzz():
+    rnd = random.Random(7)
+    pieces = ["<requirement", "<requirement title='a'", ">", "</requirement>", "<requirements>",
+              "text", "<actor name='a'>", "</actor>", "\n"]
+    for _ in range(2000):
+        content = "".join(rnd.choice(pieces) for _ in range(rnd.randint(0, 20)))
+        blocks = list(scanner.iter_requirement_blocks(content))
+        assert [(b.start, b.end) for b in blocks] == [m.span() for m in REQUIREMENT_PATTERN.finditer(content)]
+
+
+def test_unclosed_tags_do_not_explode():
+    # Thousands of never closed start tags: the scanner stays linear
+    content = "<requirement title='x'>" * 20000 + "<actor name='a'>" * 20000
+    assert list(scanner.iter_requirement_blocks(content)) == []
+    text = "<actor name='a'>" * 50000
+    assert scanner.strip_elements(text, "actor") == text
+
+
+def test_self_closing_requirement_has_no_children():
+    content = '<requirement title="A"/><actor name="X"/></requirement>'
+    tag = scanner.parse_requirement(next(scanner.iter_requirement_blocks(content)))
+    assert tag.actors == []
+    assert tag.render_start_tag() == '<requirement title="A"'
+
+
+def test_quote_attribute_value():
+    assert scanner.quote_attribute_value('a&b') == '"a&amp;b"'
+    assert scanner.quote_attribute_value('x"y') == "'x\"y'"
+    assert scanner.quote_attribute_value('x"\'y') == '"x&quot;\'y"'
+    assert scanner.quote_attribute_value(2) == '"2"'
+
+
+def test_malformed_start_tag_is_reported_not_skipped():
+    page = '<p>intro</p>\n<requirement title="A" key="REQ-1">Text</requirement>\n\n<requirement\x00 key="REQ-2">B</requirement>'
+    with pytest.raises(RequirementParseException) as error:
+        scanner.scan(page, file_path="pages/a.md")
+    assert "pages/a.md, line 4" in str(error.value)
+    # Attributes html.parser accepts are still read
+    assert [tag.attrs for tag in scanner.scan('<requirement title="A" < key="K">T</requirement>')] == \
+        [{"title": "A", "<": "", "key": "K"}]
@@ -0,0 +1,341 @@
+import os
+import json
+import pytest
+import sqlite3
+from unittest.mock import MagicMock, patch
+
+from igtools.errors import StorageFormatUnknown
+from igtools.specifications import storage
+from igtools.specifications.data import Requirement
+from igtools.specifications.release import ReleaseManager
+from igtools.migrations.steps import ConvertReleaseStorage
+
+
+@pytest.fixture
+def mock_config(tmp_path):
+    return MagicMock(
+        path=str(tmp_path / ".igtools"),
+        name="Test Project",
+        current="1.0.0",
+        releases=["1.0.0"],
+        storage="packed"
+    )
+
+
+def requirements():
+    return [Requirement(key="REQ-2", title="B", text="Text B"),
+            Requirement(key="REQ-1", title="A", actor=["X"], test_procedures={"X": ["T1"]})]
+
+
+def test_create_store(mock_config):
+    assert isinstance(storage.create_store(mock_config), storage.PackedRequirementStore)
+    assert isinstance(storage.create_store(MagicMock()), storage.YamlRequirementStore)
+    with pytest.raises(StorageFormatUnknown):
+        storage.create_store(mock_config, storage="xml")
+
+
+def test_incomplete_store_fails_on_instantiation(mock_config):
+    class KeysOnlyStore(storage.RequirementStore):
+        def exists(self, directory):
+            return False
+
+        def load(self, directory):
+            return []
+
+    with pytest.raises(TypeError, match="abstract"):
+        KeysOnlyStore(mock_config)
+
+
+def test_packed_store_round_trip(mock_config, tmp_path):
+    store = storage.create_store(mock_config)
+    directory = str(tmp_path / "release")
+    result = store.save(directory, requirements())
+    assert (result.written, result.skipped, result.deleted) == (2, 0, 0)
+
+    with open(os.path.join(directory, store.FILENAME), 'r', encoding='utf-8') as file:
+        lines = file.read().splitlines()
+    assert [json.loads(line)["key"] for line in lines] == ["REQ-1", "REQ-2"]
+
+    loaded = {r.key: r for r in store.load(directory)}
+    assert loaded["REQ-1"].test_procedures == {"X": ["T1"]}
+    assert loaded["REQ-1"].is_dirty is False
+
+
+def test_packed_store_writes_only_on_change(mock_config, tmp_path):
+    store = storage.create_store(mock_config)
+    directory = str(tmp_path / "release")
+    store.save(directory, requirements())
+    file_path = os.path.join(directory, store.FILENAME)
+    mtime = os.stat(file_path).st_mtime_ns
+
+    loaded = store.load(directory)
+    result = store.save(directory, loaded)
+    assert (result.written, result.skipped) == (0, 2)
+    assert os.stat(file_path).st_mtime_ns == mtime
+
+    loaded[0].for_deletion = True
+    loaded[1].title = "changed"
+    result = store.save(directory, loaded)
+    assert (result.written, result.skipped, result.deleted) == (1, 0, 1)
+    assert [(r.key, r.title) for r in store.load(directory)] == [(loaded[1].key, "changed")]
+
+
+def test_release_manager_uses_configured_store(mock_config):
+    manager = ReleaseManager(mock_config)
+    release = manager.load()
+    release.requirements = requirements()
+    manager.save(release)
+    manager.archive([Requirement(key="REQ-0", title="Old")])
+
+    release = manager.load()
+    assert sorted(r.key for r in release.requirements) == ["REQ-1", "REQ-2"]
+    assert [r.key for r in release.archive] == ["REQ-0"]
+    assert os.listdir(manager.release_directory("1.0.0")) == [storage.PackedRequirementStore.FILENAME]
+
+
+def test_sqlite_store_round_trip_and_skips_unchanged(mock_config, tmp_path):
+    store = storage.create_store(mock_config, storage="sqlite")
+    directory = str(tmp_path / ".igtools" / "releases" / "1_0_0")
+    result = store.save(directory, requirements())
+    assert (result.written, result.skipped, result.deleted) == (2, 0, 0)
+    assert os.path.isdir(directory)
+
+    loaded = store.load(directory)
+    assert [r.key for r in loaded] == ["REQ-1", "REQ-2"]
+    assert loaded[0].test_procedures == {"X": ["T1"]}
+    assert loaded[0].is_dirty is False
+
+    loaded[0].title = "changed"
+    loaded[1].for_deletion = True
+    result = store.save(directory, loaded)
+    assert (result.written, result.skipped, result.deleted) == (1, 0, 1)
+    assert [(r.key, r.title) for r in store.load(directory)] == [("REQ-1", "changed")]
+
+
+def test_sqlite_reads_open_the_database_read_only(mock_config, tmp_path):
+    directory = str(tmp_path / ".igtools" / "releases" / "1_0_0")
+    storage.create_store(mock_config, storage="sqlite").save(directory, requirements())
+
+    store = storage.create_store(mock_config, storage="sqlite")
+    with patch.object(store, "SCHEMA", "CREATE TABLE never (id INTEGER);"):
+        assert store.keys(directory) == ["REQ-1", "REQ-2"]
+        with pytest.raises(sqlite3.OperationalError):
+            store.connection.execute("DELETE FROM requirements")
+        assert store.connection.execute("SELECT name FROM sqlite_master WHERE name = 'never'").fetchone() is None
+    # Writing reconnects with write access
+    store.save(directory, [Requirement(key="REQ-3", title="C")])
+    assert store.keys(directory) == ["REQ-1", "REQ-2", "REQ-3"]
+
+
+def test_sqlite_find_across_releases(mock_config):
+    mock_config.storage = "sqlite"
+    mock_config.releases = ["1.0.0", "1.1.0"]
+    manager = ReleaseManager(mock_config)
+    for version, status in (("1.0.0", "NEW"), ("1.1.0", "MODIFIED")):
+        release = manager.load_version(version)
+        release.requirements = [Requirement(key="REQ-1", title=version, source="a.html", process=status),
+                                Requirement(key=f"REQ-{version}", title=version, source="b.html")]
+        manager.save(release)
+    manager.archive([Requirement(key="REQ-0", title="Old", source="a.html", process="DELETED")])
+
+    history = manager.find(key="REQ-1")
+    assert [(version, r.title) for version, r in history] == [("1.0.0", "1.0.0"), ("1.1.0", "1.1.0")]
+    assert [(version, r.key) for version, r in manager.find(source="a.html", release_status="MODIFIED")] == [("1.1.0", "REQ-1")]
+    assert [version for version, _ in manager.find(source="a.html")] == ["1.0.0", "1.1.0", "archive"]
+
+    mock_config.storage = "packed"
+    ReleaseManager(mock_config).store.save(manager.release_directory("1.0.0"), manager.load_version("1.0.0").requirements)
+    assert [(version, r.key) for version, r in ReleaseManager(mock_config).find(key="REQ-1")] == [("1.0.0", "REQ-1")]
+
+
+@pytest.mark.parametrize("storage_format", ["yaml", "packed", "sqlite", "blobs", "delta"])
+def test_store_keys(mock_config, tmp_path, storage_format):
+    store = storage.create_store(mock_config, storage=storage_format)
+    directory = str(tmp_path / ".igtools" / "releases" / "archive")
+    assert store.keys(directory) == []
+    store.save(directory, requirements())
+    assert sorted(store.keys(directory)) == ["REQ-1", "REQ-2"]
+
+
+def test_blob_store_shares_unchanged_requirements_between_releases(mock_config):
+    mock_config.storage = "blobs"
+    mock_config.add_release = lambda version: mock_config.releases.append(version)
+    manager = ReleaseManager(mock_config)
+    release = manager.load()
+    release.requirements = requirements()
+    manager.save(release)
+
+    manager.create("1.1.0")
+    blobs = manager.store.blob_directory
+    count = sum(len(files) for _, _, files in os.walk(blobs))
+    assert count == 4  # NEW in 1.0.0, STABLE in 1.1.0
+
+    with patch("builtins.open", wraps=open) as opened:
+        manager.create("1.2.0")
+    assert sum(len(files) for _, _, files in os.walk(blobs)) == count
+    assert not [c for c in opened.call_args_list if str(c.args[0]).startswith(blobs)]
+
+    with open(os.path.join(manager.release_directory("1.2.0"), storage.BlobRequirementStore.FILENAME)) as file:
+        assert [line.split()[0] for line in file] == ["REQ-1", "REQ-2"]
+    assert [r.key for r in manager.load_version("1.2.0").requirements] == ["REQ-1", "REQ-2"]
+
+
+def test_blob_store_reads_blobs_on_first_access(mock_config):
+    mock_config.storage = "blobs"
+    manager = ReleaseManager(mock_config)
+    release = manager.load()
+    release.requirements = requirements()
+    manager.save(release)
+    storage.BlobRequirementStore.cache.clear()
+
+    with patch.object(storage.BlobRequirementStore, "read_blob", wraps=manager.store.read_blob) as read_blob:
+        loaded = manager.store.load(manager.release_directory("1.0.0"))
+        assert [r.key for r in loaded] == ["REQ-1", "REQ-2"]
+        assert read_blob.call_count == 0
+        # Unaccessed requirements are saved without reading them
+        assert manager.store.save(manager.release_directory("1.0.0"), loaded).skipped == 2
+        assert read_blob.call_count == 0
+
+        loaded[1].version = 7
+        assert read_blob.call_count == 1
+        assert loaded[1].title == "B"
+        assert loaded[1].version == 7
+        assert manager.store.save(manager.release_directory("1.0.0"), loaded).written == 1
+        assert read_blob.call_count == 1
+    assert [(r.key, r.version) for r in manager.store.load(manager.release_directory("1.0.0"))] == [("REQ-1", None),
+                                                                                                 ("REQ-2", 7)]
+
+
+def test_blob_store_collects_unreferenced_blobs(mock_config):
+    mock_config.storage = "blobs"
+    manager = ReleaseManager(mock_config)
+    release = manager.load()
+    release.requirements = requirements()
+    manager.save(release)
+    blobs = manager.store.blob_directory
+
+    def count():
+        return sum(len(files) for _, _, files in os.walk(blobs))
+
+    release = manager.load()
+    release.requirements[0].title = "rewritten"
+    manager.save(release)
+    assert count() == 3
+    assert manager.collect_garbage() == 1
+    assert count() == 2
+    assert {r.key: r.title for r in manager.load().requirements}["REQ-1"] == "rewritten"
+
+    # After a conversion no blob is referenced anymore
+    mock_config.storage = "yaml"
+    ConvertReleaseStorage().apply(config=mock_config)
+    assert ReleaseManager(mock_config).collect_garbage() == 2
+    assert count() == 0
+
+
+def test_lru_cache_is_least_recently_used():
+    lru_cache = storage.LRUCache(maxsize=2)
+    lru_cache.put("a", "A")
+    lru_cache.put("b", "B")
+    assert lru_cache.get("a") == "A"
+    lru_cache.put("c", "C")
+    assert lru_cache.get("b") is None
+    assert (lru_cache.hits, lru_cache.misses) == (1, 1)
+    assert list(lru_cache.entries) == ["a", "c"]
+
+
+def test_lru_cache_is_bounded_in_size():
+    lru_cache = storage.LRUCache(maxsize=100, maxbytes=10)
+    for key in "abcd":
+        lru_cache.put(key, key * 4)
+    assert list(lru_cache.entries) == ["c", "d"]
+    assert lru_cache.size == 8
+    lru_cache.put("d", "d")
+    lru_cache.pop("c")
+    assert lru_cache.size == 1
+
+
+def build_releases(mock_config, count):
+    # Every release modifies one requirement, adds one and deletes one
+    mock_config.releases = ["1.0.0"]
+    mock_config.current = "1.0.0"
+    mock_config.add_release = lambda version: mock_config.releases.append(version)
+    manager = ReleaseManager(mock_config)
+    release = manager.load()
+    release.requirements = [Requirement(key=f"REQ-{n:02d}", title=f"T{n}") for n in range(10)]
+    manager.save(release)
+    expected = {"1.0.0": {r.key: r.title for r in release.requirements}}
+
+    for n in range(1, count):
+        version = f"1.{n}.0"
+        manager.create(version)
+        mock_config.current = version
+        release = manager.load()
+        release.requirements[0].title = f"changed in {version}"
+        release.requirements[0].is_modified = True
+        release.requirements[-1].for_deletion = True
+        release.requirements.append(Requirement(key=f"REQ-{10 + n:02d}", title=version))
+        manager.save(release)
+        expected[version] = {r.key: r.title for r in release.requirements if not r.for_deletion}
+    return manager, expected
+
+
+def test_delta_store_rebuilds_releases(mock_config):
+    mock_config.storage = "delta"
+    with patch.object(storage.DeltaRequirementStore, "CHECKPOINT_INTERVAL", 3):
+        manager, expected = build_releases(mock_config, 7)
+    storage.DeltaRequirementStore.states.clear()
+
+    headers = {}
+    for version, titles in expected.items():
+        assert {r.key: r.title for r in manager.load_version(version).requirements} == titles
+        with open(os.path.join(manager.release_directory(version), storage.DeltaRequirementStore.FILENAME)) as file:
+            headers[version] = json.loads(file.readline())
+    assert [h["depth"] for h in headers.values()] == [0, 1, 2, 0, 1, 2, 0]
+    assert headers["1.2.0"]["base"] == "1_1_0"
+
+
+def test_delta_store_keeps_a_bounded_number_of_states(mock_config):
+    mock_config.storage = "delta"
+    states = storage.LRUCache(maxsize=4)
+    with patch.object(storage.DeltaRequirementStore, "CHECKPOINT_INTERVAL", 2), \
+            patch.object(storage.DeltaRequirementStore, "states", states):
+        manager, expected = build_releases(mock_config, 8)
+        states.clear()
+        for version, titles in expected.items():
+            assert {r.key: r.title for r in manager.load_version(version).requirements} == titles
+            assert len(states.entries) <= 4
+
+
+def test_delta_store_changes_are_the_non_stable_requirements(mock_config):
+    mock_config.storage = "delta"
+    manager, expected = build_releases(mock_config, 4)
+    for version in expected:
+        changes = {r.key for r in manager.load_version(version, changes_only=True).requirements if not r.is_stable}
+        full = {r.key for r in manager.load_version(version).requirements if not r.is_stable}
+        assert changes == full
+
+
+def test_delta_store_keeps_dependents_when_base_changes(mock_config):
+    mock_config.storage = "delta"
+    manager, expected = build_releases(mock_config, 3)
+    release = manager.load_version("1.1.0")
+    release.requirements[1].title = "rewritten"
+    manager.save(release)
+
+    storage.DeltaRequirementStore.states.clear()
+    assert {r.key: r.title for r in manager.load_version("1.2.0").requirements} == expected["1.2.0"]
+    assert {r.key: r.title for r in manager.load_version("1.0.0").requirements} == expected["1.0.0"]
+
+
+@pytest.mark.parametrize("storage_format", ["yaml", "packed", "sqlite", "blobs", "delta"])
+def test_store_iter_records(mock_config, tmp_path, storage_format):
+    store = storage.create_store(mock_config, storage=storage_format)
+    directory = str(tmp_path / ".igtools" / "releases" / "1_0_0")
+    assert list(store.iter_records(directory)) == []
+    store.save(directory, requirements())
+    def serialized(records):
+        records = [record.serialize() if isinstance(record, Requirement) else record for record in records]
+        return sorted(records, key=lambda record: record["key"])
+    records = serialized(store.iter_records(directory))
+    assert records == serialized(store.load_records(directory))
+    assert [record["key"] for record in records] == ["REQ-1", "REQ-2"]
@@ -0,0 +1,110 @@
+import os
+import pytest
+from argparse import Namespace
+from unittest.mock import patch
+
+from igtools.config.config import Config
+from igtools.commands import Command
+from igtools.errors import LockTimeoutException
+from igtools.utils import transaction
+from igtools.utils.lock import DirectoryLock
+
+
+@pytest.fixture
+def lock_path(tmp_path):
+    return str(tmp_path / "igtools.lock")
+
+
+def test_shared_locks_are_held_concurrently(lock_path):
+    with DirectoryLock(lock_path), DirectoryLock(lock_path):
+        with pytest.raises(LockTimeoutException):
+            DirectoryLock(lock_path, exclusive=True, timeout=0.1).acquire()
+    with DirectoryLock(lock_path, exclusive=True, timeout=0.1):
+        pass
+
+
+def test_exclusive_lock_blocks_readers(lock_path):
+    with DirectoryLock(lock_path, exclusive=True):
+        with pytest.raises(LockTimeoutException):
+            DirectoryLock(lock_path, timeout=0.1).acquire()
+    with DirectoryLock(lock_path, timeout=0.1):
+        pass
+
+
+def test_upgrade_waits_for_other_readers(lock_path):
+    reader = DirectoryLock(lock_path).acquire()
+    with DirectoryLock(lock_path, timeout=0.1) as lock:
+        with pytest.raises(LockTimeoutException):
+            lock.upgrade()
+    reader.release()
+
+    with DirectoryLock(lock_path, timeout=0.1) as lock:
+        lock.upgrade()
+        with pytest.raises(LockTimeoutException):
+            DirectoryLock(lock_path, timeout=0.1).acquire()
+        lock.downgrade()
+        with DirectoryLock(lock_path, timeout=0.1):
+            pass
+
+
+def test_missing_directory_is_not_locked(tmp_path):
+    path = str(tmp_path / "missing" / "igtools.lock")
+    with DirectoryLock(path, exclusive=True) as lock:
+        assert lock.file is None
+    assert not os.path.exists(os.path.dirname(path))
+
+
+class DummyCommand(Command):
+
+    def __init__(self, writing):
+        self.writing = writing
+        self.lock_mode = None
+
+    @property
+    def with_startup_guard(self):
+        return False
+
+    def title(self):
+        return "Dummy"
+
+    def configure_subparser(self, subparsers):
+        pass
+
+    def match(self, args):
+        return True
+
+    def is_writing(self, args):
+        return self.writing
+
+    def run(self, config, args):
+        # Another command can only share the lock with readers
+        probe = DirectoryLock(os.path.join(config.path, "cache", "igtools.lock"), timeout=0.1)
+        try:
+            probe.acquire()
+            self.lock_mode = "shared"
+        except LockTimeoutException:
+            self.lock_mode = "exclusive"
+        finally:
+            probe.release()
+
+
+@pytest.mark.parametrize("writing, mode", [(True, "exclusive"), (False, "shared")])
+def test_command_holds_lock_and_recovers(tmp_path, writing, mode):
+    directory = tmp_path / ".igtools"
+    directory.mkdir()
+    (directory / "config.yaml").write_text("current: null\n")
+    page = tmp_path / "page.md"
+    page.write_text("original")
+
+    unit = transaction.UnitOfWork(str(directory))
+    unit.write_text(str(page), "changed")
+    temp = transaction.temp_path(str(page))
+    unit._write_temp(temp, "changed")
+    unit._write_journal(transaction.COMMITTED, [[temp, str(page)]], [])
+
+    command = DummyCommand(writing)
+    with patch("igtools.commands.config", Config()):
+        command.process(Namespace(config=str(directory), lock_timeout=1))
+    assert command.lock_mode == mode
+    assert page.read_text() == "changed"
+    assert not transaction.pending(str(directory))
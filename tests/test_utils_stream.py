@@ -0,0 +1,56 @@
+import os
+import io
+import json
+import yaml
+import pytest
+
+from igtools.utils import stream
+
+
+DATA = [
+    dict(key="REQ-1", title="Ä \"quoted\" title", version=1, actor=["A", "B"], test_procedures={"A": ["T1"]},
+         text="Line\nnext\tline", empty_list=[], empty_dict={}, missing=None, flag=True, ratio=0.5),
+    dict(key="REQ-2", title="B", version=2, actor=[], test_procedures={}, text="", flag=False),
+]
+
+
+@pytest.mark.parametrize("data", [DATA, [], {}, dict(releases=DATA, count=2), "text", 3, None])
+def test_write_json_matches_json_dump(data):
+    file = io.StringIO()
+    stream.write_json(file, data)
+    assert file.getvalue() == json.dumps(data, indent=4, ensure_ascii=False)
+
+
+def test_write_json_writes_generators_as_arrays():
+    file = io.StringIO()
+    stream.write_json(file, dict(releases=(dict(version=v, requirements=iter(DATA)) for v in ["1.1.0", "1.0.0"]),
+                                 empty=iter([])))
+    expected = dict(releases=[dict(version=v, requirements=DATA) for v in ["1.1.0", "1.0.0"]], empty=[])
+    assert file.getvalue() == json.dumps(expected, indent=4, ensure_ascii=False)
+
+
+@pytest.mark.parametrize("data", [DATA, []])
+def test_write_yaml_list_matches_yaml_dump(data):
+    file = io.StringIO()
+    stream.write_yaml_list(file, iter(data))
+    assert file.getvalue() == yaml.dump(data, default_flow_style=False, allow_unicode=True)
+
+
+def test_atomic_output_keeps_the_previous_file_on_errors(tmp_path):
+    path = tmp_path / "export.json"
+    path.write_text("previous")
+
+    def records():
+        yield dict(key="REQ-1")
+        raise RuntimeError("store failed")
+
+    with pytest.raises(RuntimeError):
+        with stream.atomic_output(str(path)) as file:
+            stream.write_json(file, records())
+    assert path.read_text() == "previous"
+    assert os.listdir(tmp_path) == ["export.json"]
+
+    with stream.atomic_output(str(path)) as file:
+        stream.write_json(file, iter(DATA))
+    assert json.loads(path.read_text()) == DATA
+    assert os.listdir(tmp_path) == ["export.json"]
@@ -0,0 +1,171 @@
+import os
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+
+from igtools.config.config import Config
+from igtools.specifications import storage
+from igtools.specifications.data import Requirement
+from igtools.specifications.release import ReleaseManager
+from igtools.utils import transaction
+
+
+def tree(path, caches=True):
+    # relative file path -> content of all files below path
+    files = {}
+    for root, _, names in os.walk(path):
+        for name in names:
+            relpath = os.path.relpath(os.path.join(root, name), path)
+            if not caches and relpath.startswith(os.path.join(".igtools", "cache", "")):
+                continue
+            with open(os.path.join(root, name), 'rb') as file:
+                files[relpath] = file.read()
+    return files
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / ".igtools").mkdir()
+    (tmp_path / "page.md").write_text("original")
+    return tmp_path
+
+
+def test_writes_are_staged_until_commit(project):
+    page = str(project / "page.md")
+    new_file = str(project / "new" / "file.txt")
+    with transaction.unit_of_work(str(project / ".igtools")):
+        transaction.write_text(page, "changed")
+        transaction.write_text(new_file, "new")
+        assert (project / "page.md").read_text() == "original"
+        assert not (project / "new").exists()
+        assert transaction.read_text(page) == "changed"
+        assert transaction.exists(new_file) and transaction.isdir(str(project / "new"))
+        assert transaction.listdir(str(project / "new")) == ["file.txt"]
+
+    assert (project / "page.md").read_text() == "changed"
+    assert (project / "new" / "file.txt").read_text() == "new"
+    assert not (project / ".igtools" / transaction.TRANSACTION_DIRECTORY).exists()
+    assert transaction.active() is None
+
+
+def test_error_leaves_the_tree_unchanged(project):
+    before = tree(str(project))
+    with pytest.raises(KeyboardInterrupt):
+        with transaction.unit_of_work(str(project / ".igtools")):
+            transaction.write_text(str(project / "page.md"), "changed")
+            transaction.write_text(str(project / "sub" / "file.txt"), "new")
+            raise KeyboardInterrupt()
+    assert tree(str(project)) == before
+    assert not (project / "sub").exists()
+
+
+def test_config_is_written_once(project):
+    config = Config().set_filepath(str(project / ".igtools"))
+    with patch.object(transaction.UnitOfWork, "_write_temp", autospec=True,
+                      side_effect=transaction.UnitOfWork._write_temp) as write_temp:
+        with transaction.unit_of_work(config.path):
+            for number in range(3):
+                config.current_req_number = number
+                config.save()
+    temps = [call.args[1] for call in write_temp.call_args_list if "journal" not in call.args[1]]
+    assert temps == [transaction.temp_path(os.path.abspath(config.config_file))]
+    assert Config().set_filepath(config.path).load().current_req_number == 2
+
+
+def test_failed_prepare_is_rolled_back(project):
+    before = tree(str(project))
+    real_write_temp = transaction.UnitOfWork._write_temp
+
+    def failing_write_temp(self, path, value):
+        if os.path.basename(path).startswith(".b.txt."):
+            raise OSError("disk full")
+        return real_write_temp(self, path, value)
+
+    with patch.object(transaction.UnitOfWork, "_write_temp", failing_write_temp):
+        with pytest.raises(OSError):
+            with transaction.unit_of_work(str(project / ".igtools")):
+                transaction.write_text(str(project / "dir" / "a.txt"), "a")
+                transaction.write_text(str(project / "dir" / "b.txt"), "b")
+                transaction.write_text(str(project / "page.md"), "changed")
+    assert tree(str(project)) == before
+
+
+def test_interrupted_commit_is_completed_by_recover(project):
+    def interrupted_apply(operations):
+        # Only the first file is renamed, then the process dies
+        os.replace(*operations[0])
+        raise KeyboardInterrupt()
+
+    with patch.object(transaction, "apply", interrupted_apply):
+        with pytest.raises(KeyboardInterrupt):
+            with transaction.unit_of_work(str(project / ".igtools")):
+                transaction.write_text(str(project / "a.txt"), "a")
+                transaction.write_text(str(project / "page.md"), "changed")
+
+    journal = project / ".igtools" / transaction.TRANSACTION_DIRECTORY / str(os.getpid()) / transaction.JOURNAL_FILE
+    assert json.loads(journal.read_text())["state"] == transaction.COMMITTED
+    assert (project / "a.txt").read_text() == "a"
+    assert (project / "page.md").read_text() == "original"
+
+    assert transaction.pending(str(project / ".igtools"))
+    assert transaction.recover(str(project / ".igtools")) == [transaction.COMMITTED]
+    assert (project / "page.md").read_text() == "changed"
+    assert not journal.exists() and not transaction.pending(str(project / ".igtools"))
+    assert not any(name.endswith(transaction.TEMP_SUFFIX) for name in os.listdir(project))
+
+
+def test_prepared_journal_is_rolled_back_by_recover(project):
+    unit = transaction.UnitOfWork(str(project / ".igtools"))
+    unit.write_text(str(project / "page.md"), "changed")
+    temp = transaction.temp_path(str(project / "page.md"))
+    unit._write_journal(transaction.PREPARED, [[temp, str(project / "page.md")]], [])
+    unit._write_temp(temp, "changed")
+
+    assert transaction.recover(str(project / ".igtools")) == [transaction.PREPARED]
+    assert (project / "page.md").read_text() == "original"
+    assert not os.path.exists(temp)
+
+
+@pytest.mark.parametrize("storage_format", ["yaml", "packed", "sqlite", "blobs", "delta"])
+def test_release_creation_is_atomic(project, storage_format):
+    config = MagicMock(path=str(project / ".igtools"), current="1.0.0", releases=["1.0.0"], storage=storage_format)
+    config.add_release = lambda version: config.releases.append(version)
+    manager = ReleaseManager(config)
+    release = manager.load()
+    release.requirements = [Requirement(key=f"REQ-{n}", title=f"T{n}") for n in range(3)]
+    manager.save(release)
+    storage.YamlRequirementStore.cache.clear()
+    # Caches are written past the unit of work
+    before = tree(str(project), caches=False)
+
+    with pytest.raises(KeyboardInterrupt):
+        with transaction.unit_of_work(config.path):
+            manager.create("1.1.0")
+            config.current = "1.1.0"
+            release = manager.load()
+            assert [r.key for r in release.requirements] == ["REQ-0", "REQ-1", "REQ-2"]
+            raise KeyboardInterrupt()
+    assert tree(str(project), caches=False) == before
+
+    config.current = "1.0.0"
+    with transaction.unit_of_work(config.path):
+        manager.create("1.1.0")
+    assert [r.key for r in manager.load_version("1.1.0").requirements] == ["REQ-0", "REQ-1", "REQ-2"]
+
+
+def test_caches_are_written_past_the_unit_of_work(project):
+    # A read-only command writing caches leaves no staging directory for other commands to recover
+    config = MagicMock(path=str(project / ".igtools"), current="1.0.0", releases=["1.0.0"], storage="yaml")
+    manager = ReleaseManager(config)
+    release = manager.load()
+    release.requirements = [Requirement(key="REQ-1", title="T")]
+    manager.save(release)
+    storage.YamlRequirementStore.cache.clear()
+    snapshot = manager.store.snapshot_path(manager.release_directory("1.0.0"))
+
+    with transaction.unit_of_work(config.path) as unit:
+        manager.load()
+        assert os.path.exists(snapshot)
+        assert not unit.staged
+        assert not transaction.pending(config.path)
+    storage.YamlRequirementStore.cache.clear()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import shutil
+import argparse
+import tempfile
+from unittest.mock import MagicMock
+
+from igtools.specifications import storage, normalize
+from igtools.specifications.columns import ReleaseColumns
+from igtools.specifications.data import Release, Requirement, ReleaseState
+from igtools.specifications.release import ReleaseManager
+
+#####
+#
+# PYTHONPATH=src python tools/benchmarks/bench_columns.py --sizes 10000 50000
+#
+# Bulk operations on a loaded release, with Requirement objects (rows) and
+# with the columnar view (columns; '--no-numpy' for the array fallback):
+#   filter:       load the release and take the requirements that are not STABLE
+#   fingerprint:  load the release and build its fingerprint
+#
+#####
+
+
+def build_release(manager, size):
+    release = Release(version="1.0.0")
+    for n in range(size):
+        req = Requirement(key=f"IG-BENCH{n:06d}", title=f"Requirement {n}", text=f"The system SHALL do {n}.",
+                          actor=["EPA-PS"], source=f"input/pagecontent/page-{n % 50}.md", version=1)
+        req.release_status = "MODIFIED" if n % 20 == 0 else "STABLE"
+        release.requirements.append(req)
+    manager.save(release)
+
+
+def measure(function, repeat=3):
+    best = None
+    for _ in range(repeat):
+        ReleaseManager.cache.clear()
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(size, store, use_numpy):
+    directory = tempfile.mkdtemp(prefix="igtools-bench-")
+    try:
+        config = MagicMock(path=os.path.join(directory, ".igtools"), current="1.0.0", releases=["1.0.0"],
+                           storage=store)
+        manager = ReleaseManager(config)
+        build_release(manager, size)
+
+        def columns():
+            return ReleaseColumns(manager.store.load_records(manager.release_directory("1.0.0")), use_numpy=use_numpy)
+
+        return dict(
+            filter_rows=measure(lambda: [req for req in manager.load().requirements if not req.is_stable]),
+            filter_columns=measure(lambda: (lambda c: c.rows(c.where(exclude=[ReleaseState.STABLE])))(columns())),
+            fingerprint_rows=measure(lambda: normalize.build_fingerprint_release(manager.load().requirements)),
+            fingerprint_columns=measure(lambda: normalize.build_fingerprint_columns(columns())),
+        )
+    finally:
+        ReleaseManager.cache.clear()
+        shutil.rmtree(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark: bulk operations on rows and columns of a release")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000])
+    parser.add_argument("--storage", default="packed", choices=sorted(storage.STORES))
+    parser.add_argument("--no-numpy", action="store_true")
+    args = parser.parse_args()
+
+    print(f"{'requirements':>12} {'filter rows':>12} {'columns':>8} {'fingerprint rows':>17} {'columns':>8}")
+    for size in args.sizes:
+        result = run(size, args.storage, not args.no_numpy)
+        print(f"{size:>12} {result['filter_rows']:>11.3f}s {result['filter_columns']:>7.3f}s "
+              f"{result['fingerprint_rows']:>16.3f}s {result['fingerprint_columns']:>7.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import gc
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+from unittest.mock import MagicMock
+
+from igtools.utils import convert_to_link
+from igtools.specifications import storage
+from igtools.specifications.data import Release, Requirement, ReleaseState
+from igtools.specifications.exporter import RequirementExporter
+from igtools.specifications.release import ReleaseManager
+
+#####
+#
+# PYTHONPATH=src python tools/benchmarks/bench_export_memory.py --sizes 100000
+#
+# Peak memory (tracemalloc) and time of the JSON export of one release with N
+# requirements:
+#   list:      all records built first, then json.dump (the former export)
+#   streamed:  RequirementExporter.export, records written while they are read
+#
+#####
+
+ACTORS = ["EPA-PS", "EPA-Medication-Service", "EPA-FdV"]
+
+
+def build_release(manager, config, size):
+    config.releases.append("1.0.0")
+    release = Release(version="1.0.0")
+    for n in range(size):
+        req = Requirement(key=f"IG-BENCH{n:06d}", title=f"Requirement {n}", text=f"The system SHALL do {n}.",
+                          actor=ACTORS[:1 + n % 3], source=f"input/pagecontent/page-{n % 50}.md",
+                          version=1, conformance="SHALL",
+                          test_procedures={actor: ["Produkttest"] for actor in ACTORS[:1 + n % 3]})
+        req.created = "2025-01-01T10:00:00"
+        req.date = "2025-01-01T10:00:00"
+        release.requirements.append(req)
+    manager.save(release)
+
+
+def export_list(manager, output):
+    release = manager.load(columnar=True)
+    columns = release.columns
+    requirements = []
+    for req in columns.rows(columns.where(exclude=[ReleaseState.DELETED])):
+        data = req.serialize()
+        data["path"] = convert_to_link(req.source)
+        data["release"] = release.version
+        requirements.append(data)
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump(requirements, file, indent=4, ensure_ascii=False)
+
+
+def measure(export):
+    ReleaseManager.cache.clear()
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    export()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def run(size, store):
+    directory = tempfile.mkdtemp(prefix="igtools-bench-")
+    try:
+        config = MagicMock(path=os.path.join(directory, ".igtools"), current="1.0.0", releases=[], storage=store)
+        manager = ReleaseManager(config)
+        build_release(manager, config, size)
+        exporter = RequirementExporter(config=config, format="JSON")
+
+        listed = measure(lambda: export_list(manager, os.path.join(directory, "list.json")))
+        streamed = measure(lambda: exporter.export(os.path.join(directory, "streamed.json")))
+        return listed, streamed
+    finally:
+        ReleaseManager.cache.clear()
+        shutil.rmtree(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark: peak memory of the requirements export")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000])
+    parser.add_argument("--storage", default="packed", choices=sorted(storage.STORES))
+    args = parser.parse_args()
+
+    print(f"{'requirements':>12} {'export':>9} {'peak':>10} {'time':>8}")
+    for size in args.sizes:
+        for name, (peak, elapsed) in zip(["list", "streamed"], run(size, args.storage)):
+            print(f"{size:>12} {name:>9} {peak / 2**20:>8.1f}MB {elapsed:>7.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+import argparse
+
+from igtools.specifications import normalize
+
+#####
+#
+# PYTHONPATH=src python tools/benchmarks/bench_fingerprint.py --count 50000
+#
+# Per-requirement cost of each fingerprint scheme (see normalize.SCHEMES):
+#   hash:         encoding and hashing of the canonical fields only
+#   fingerprint:  build_fingerprint, normalization included
+#
+#####
+
+TEXT = ("<p>Der Medication Service <b>MUSS</b> die Operation <i>$medication-list-{n}</i> anbieten "
+        "und die Einträge nach Datum sortiert zurückgeben.</p>")
+
+
+def measure(function, items, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            function(item)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark: cost of the fingerprint schemes per requirement")
+    parser.add_argument("--count", type=int, default=50000)
+    args = parser.parse_args()
+
+    texts = [TEXT.replace("{n}", str(n)) for n in range(args.count)]
+    canons = [normalize.build_fingerprint(text=text, title="Medikationsliste", conformance="SHALL")[1] for text in texts]
+
+    print(f"{'scheme':>14} {'count':>7} {'hash':>10} {'fingerprint':>12}")
+    try:
+        for name, scheme in normalize.SCHEMES.items():
+            normalize.use_scheme(name)
+            hashed = measure(scheme.hash, canons)
+            built = measure(lambda text: normalize.build_fingerprint(text=text, title="Medikationsliste",
+                                                                     conformance="SHALL"), texts)
+            print(f"{name:>14} {args.count:>7} {hashed / args.count * 1e6:>8.2f}us "
+                  f"{built / args.count * 1e6:>10.2f}us")
+    finally:
+        normalize.use_scheme(normalize.LEGACY_SCHEME)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import re
+import html
+import time
+import argparse
+
+from igtools.specifications import normalize
+
+#####
+#
+# PYTHONPATH=src python tools/benchmarks/bench_normalize.py --count 20000
+#
+# Normalizes N requirement texts (plain, with markup, with entities) with the
+# former multi-pass normalizer and with normalize_text_for_semantics:
+#   multi-pass:   time of the former implementation
+#   single-pass:  time of the current implementation
+#
+#####
+
+TEXTS = {
+    "plain": "Das Primärsystem MUSS die Medikationsliste im Format {n} anzeigen und dem Nutzer\n"
+             "    die Möglichkeit geben, Einträge zu filtern.",
+    "markup": "<p>Der Medication Service <b>MUSS</b> die Operation <i>$medication-list-{n}</i> anbieten.</p>\n"
+              "    <ul>\n      <li>Medication.code</li>\n      <li>Medication.form</li>\n    </ul>\n"
+              "    <table><tr><td>date</td><td>status</td></tr></table>",
+    "entities": "Der Medication Service MUSS gem&auml;&szlig; <a href=\"https://example.org/{n}\">Spezifikation</a>"
+                "&nbsp;antworten &amp; den Status&#8203; &lt;active&gt; setzen.",
+}
+
+
+def multi_pass(raw):
+    if not raw:
+        return ""
+    s = normalize.ACTOR_BLOCK_RE.sub("", raw)
+    s = html.unescape(s)
+    s = normalize.SOFT_HYPHEN_RE.sub("", s)
+    s = normalize.NBSP_RE.sub(" ", s)
+    s = normalize.ZW_RE.sub("", s)
+    s = normalize.TAG_RE.sub("", s)
+    s = re.sub(r"[ \t\f\r\v]+", " ", s)
+    s = re.sub(r"\s*\n\s*", " ", s)
+    s = re.sub(r"\s{2,}", " ", s)
+    s = s.replace("\r\n", "\n").replace("\r", "\n")
+    s = s.strip(" ")
+    s = re.sub(r" {2,}", " ", s)
+    s = re.sub(r'\s+', '', s)
+    return s.strip().lower()
+
+
+def measure(function, texts, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            function(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark: normalizing requirement texts for fingerprints")
+    parser.add_argument("--count", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'texts':>10} {'count':>7} {'multi-pass':>11} {'single-pass':>12} {'speed-up':>9}")
+    for name, template in TEXTS.items():
+        texts = [template.replace("{n}", str(n)) for n in range(args.count)]
+        assert all(multi_pass(text) == normalize.normalize_text_for_semantics(text) for text in texts)
+        before = measure(multi_pass, texts)
+        after = measure(normalize.normalize_text_for_semantics, texts)
+        print(f"{name:>10} {args.count:>7} {before:>10.3f}s {after:>11.3f}s {before / after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
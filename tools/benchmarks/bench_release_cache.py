@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import shutil
+import argparse
+import tempfile
+from unittest.mock import MagicMock
+
+from igtools.specifications.release import ReleaseManager
+from igtools.specifications.data import Release, Requirement
+
+#####
+#
+# PYTHONPATH=src python tools/benchmarks/bench_release_cache.py --sizes 1000 10000 50000
+#
+# Loads a release directory with N requirement files:
+#   cold:     YAML parsing of every file, no snapshot
+#   rebuild:  YAML parsing of every file plus writing the snapshot
+#   warm:     new invocation, loaded from the snapshot
+#
+#####
+
+
+def build_release(manager, size):
+    release = Release(version="1.0.0")
+    for n in range(size):
+        req = Requirement(key=f"IG-BENCH{n}", title=f"Requirement {n}", text=f"The system SHALL do {n}.",
+                          actor=["EPA-PS", "EPA-Medication-Service"], source="input/pagecontent/bench.md",
+                          version=1, conformance="SHALL",
+                          test_procedures={"EPA-PS": ["Produkttest"], "EPA-Medication-Service": []})
+        req.created = "2025-01-01T10:00:00"
+        req.date = "2025-01-01T10:00:00"
+        release.requirements.append(req)
+    manager.save(release)
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def run(size):
+    directory = tempfile.mkdtemp(prefix="igtools-bench-")
+    try:
+        config = MagicMock(path=os.path.join(directory, ".igtools"), current="1.0.0", releases=["1.0.0"])
+        manager = ReleaseManager(config)
+        build_release(manager, size)
+        release_directory = manager.release_directory("1.0.0")
+        snapshot = manager.store.snapshot_path(release_directory)
+
+        manager.cache.clear()
+        cold = timed(lambda: manager.store.cache.load(release_directory))
+
+        manager.cache.clear()
+        rebuild = timed(manager.load)
+        assert os.path.exists(snapshot)
+
+        manager.cache.clear()
+        warm = timed(manager.load)
+        return cold, rebuild, warm
+    finally:
+        ReleaseManager.cache.clear()
+        shutil.rmtree(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark: YAML release load vs. JSON snapshot")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    args = parser.parse_args()
+
+    print(f"{'requirements':>12} {'cold yaml':>10} {'rebuild':>10} {'snapshot':>10} {'speed-up':>9}")
+    for size in args.sizes:
+        cold, rebuild, warm = run(size)
+        print(f"{size:>12} {cold:>9.2f}s {rebuild:>9.2f}s {warm:>9.2f}s {cold / warm:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
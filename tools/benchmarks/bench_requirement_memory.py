@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import gc
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from igtools.specifications import storage
+from igtools.specifications.release import ReleaseManager
+from igtools.specifications.data import Release, Requirement, ReleaseState
+
+#####
+#
+# PYTHONPATH=src python tools/benchmarks/bench_requirement_memory.py --releases 5 --sizes 10000
+#
+# Loads all releases (N requirements each) of a project and keeps them, as
+# Requirement and as the plain __dict__ class the Requirement was before
+# (DictRequirement, the baseline):
+#   memory:    memory held by the loaded releases (tracemalloc)
+#   per req:   bytes per loaded requirement
+#   load:      time to load all releases
+#   access:    time to read the status flags and dates of all requirements
+#
+#####
+
+ACTORS = ["EPA-PS", "EPA-Medication-Service", "EPA-FdV"]
+
+
+class DictRequirement(object):
+    """
+    The former Requirement: attributes in __dict__, status strings and the
+    timestamps parsed on every access.
+    """
+
+    def __init__(self):
+        self.key = None
+        self.title = None
+        self.actor = []
+        self.version = None
+        self.release_status = ReleaseState.NEW.value
+        self.status = "ACTIVE"
+        self.source = None
+        self.text = None
+        self._created = ""
+        self._modified = ""
+        self._deleted = ""
+        self._date = ""
+        self.conformance = ""
+        self.test_procedures = {}
+        self._content_hash = ""
+
+    @staticmethod
+    def _to_datetime(value):
+        return datetime.fromisoformat(value) if value else None
+
+    @property
+    def created(self):
+        return self._to_datetime(self._created)
+
+    @property
+    def modified(self):
+        return self._to_datetime(self._modified)
+
+    @property
+    def date(self):
+        return self._to_datetime(self._date)
+
+    @property
+    def is_stable(self):
+        return self.release_status == ReleaseState.STABLE.value
+
+    @property
+    def is_new(self):
+        return self.release_status == ReleaseState.NEW.value
+
+    @property
+    def is_modified(self):
+        return self.release_status == ReleaseState.MODIFIED.value
+
+    @property
+    def is_deleted(self):
+        return self.release_status in (ReleaseState.DELETED.value, ReleaseState.MARKED_FOR_DELETION.value)
+
+    def deserialize(self, data):
+        self.key = data.get('key')
+        self.title = data.get('title')
+        self.actor = data.get('actor', [])
+        self.test_procedures = data.get('test_procedures', {})
+        self.version = data.get('version')
+        self.release_status = data.get('release_status')
+        self.status = data.get('status')
+        self.source = data.get('source')
+        self.text = data.get('text')
+        self.conformance = data.get('conformance', '')
+        self._created = data.get('created', '')
+        self._modified = data.get('modified', '')
+        self._deleted = data.get('deleted', '')
+        self._date = data.get('date', '')
+        self._content_hash = data.get('content_hash', '')
+        return self
+
+
+def load_baseline(manager, version):
+    # The stored records of the release as DictRequirements
+    release = Release(version=version)
+    release.requirements = [DictRequirement().deserialize(record if isinstance(record, dict) else record.serialize())
+                            for record in manager.store.load_records(manager.release_directory(version))]
+    return release
+
+
+def build_project(manager, config, releases, size):
+    for number in range(releases):
+        version = f"1.{number}.0"
+        config.releases.append(version)
+        release = Release(version=version)
+        for n in range(size):
+            req = Requirement(key=f"IG-BENCH{n:06d}", title=f"Requirement {n}", text=f"The system SHALL do {n}.",
+                              actor=ACTORS[:1 + n % 3], source=f"input/pagecontent/page-{n % 50}.md",
+                              version=1, conformance="SHALL",
+                              test_procedures={actor: ["Produkttest"] for actor in ACTORS[:1 + n % 3]})
+            req.created = "2025-01-01T10:00:00"
+            req.modified = "2025-01-02T10:00:00"
+            req.date = "2025-01-02T10:00:00"
+            req.is_stable = number > 0
+            release.requirements.append(req)
+        manager.save(release)
+
+
+def access(releases):
+    count = 0
+    for release in releases:
+        for req in release.requirements:
+            if req.is_stable or req.is_new or req.is_modified or req.is_deleted:
+                count += 1
+            if req.created and req.modified and req.date:
+                count += 1
+    return count
+
+
+def measure(manager, config, load_version):
+    manager.cache.clear()
+    start = time.perf_counter()
+    loaded = [load_version(version) for version in config.releases]
+    load = time.perf_counter() - start
+    del loaded
+    manager.cache.clear()
+
+    gc.collect()
+    tracemalloc.start()
+    loaded = [load_version(version) for version in config.releases]
+    manager.cache.clear()
+    gc.collect()
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(3):
+        access(loaded)
+    accessed = (time.perf_counter() - start) / 3
+    return memory, load, accessed
+
+
+def run(releases, size, store):
+    directory = tempfile.mkdtemp(prefix="igtools-bench-")
+    try:
+        config = MagicMock(path=os.path.join(directory, ".igtools"), releases=[], storage=store)
+        manager = ReleaseManager(config)
+        build_project(manager, config, releases, size)
+        baseline = measure(manager, config, lambda version: load_baseline(manager, version))
+        slotted = measure(manager, config, manager.load_version)
+        return baseline, slotted
+    finally:
+        ReleaseManager.cache.clear()
+        shutil.rmtree(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark: memory of the loaded requirements of all releases")
+    parser.add_argument("--releases", type=int, default=5)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000])
+    parser.add_argument("--storage", default="packed", choices=sorted(storage.STORES))
+    args = parser.parse_args()
+
+    print(f"{'requirements':>12} {'class':>16} {'memory':>10} {'per req':>9} {'load':>8} {'access':>8}")
+    for size in args.sizes:
+        total = args.releases * size
+        for name, (memory, load, accessed) in zip(["DictRequirement", "Requirement"],
+                                                  run(args.releases, size, args.storage)):
+            print(f"{total:>12} {name:>16} {memory / 2**20:>8.1f}MB {memory / total:>8.0f}B "
+                  f"{load:>7.2f}s {accessed:>7.2f}s")
+
+
+if __name__ == "__main__":
+    main()
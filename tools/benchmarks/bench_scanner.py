@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import re
+import sys
+import time
+import argparse
+from bs4 import BeautifulSoup
+
+from igtools.specifications import scanner
+
+#####
+#
+# PYTHONPATH=src python tools/benchmarks/bench_scanner.py --pages 200 --requirements 25
+#
+# Compares the former BeautifulSoup per-requirement extraction with the
+# linear scanner on a synthetic IG and on a page with unclosed start tags.
+#
+#####
+
+REQUIREMENT_PATTERN = re.compile(r'(<requirement\b[^>]*)(>.*?</requirement>)', re.DOTALL)
+
+REQUIREMENT = """
+<requirement conformance="SHALL" key="IG-BENCH{n}" title="Requirement {n}" version="1">
+    <meta lockversion="false"/>
+    <actor name="EPA-Medication-Service">
+        <testProcedure id="Produkttest"/>
+        <testProcedure id="Produktgutachten" active="false"/>
+    </actor>
+    <actor name="EPA-PS">
+        <testProcedure id="Produkttest"/>
+    </actor>
+    The FHIR Data Service SHALL support the Content-Type <code>application/fhir+json</code>
+    for requests and responses at the interfaces. <a href="https://example.com/?a=1&b={n}">Link</a>
+</requirement>
+"""
+
+
+def build_page(offset, count):
+    body = "".join(REQUIREMENT.format(n=offset + i) for i in range(count))
+    return f"<html><body><p>Intro</p>{body}<p>Outro</p></body></html>"
+
+
+def soup_path(content):
+    results = []
+    for match in REQUIREMENT_PATTERN.finditer(content):
+        tag = BeautifulSoup(match.group(0), 'html.parser').requirement
+        actors = {}
+        for actor in tag.find_all("actor"):
+            actors[actor.get("name")] = [tp.get("id") for tp in actor.find_all("testprocedure")]
+        metas = [m.get("lockversion") for m in tag.find_all("meta")]
+        results.append((str(tag).split(">", 1)[0], actors, metas))
+    return results
+
+
+def scanner_path(content):
+    results = []
+    for block in scanner.iter_requirement_blocks(content):
+        tag = scanner.parse_requirement(block)
+        actors = {a.get("name"): [tp.get("id") for tp in a.test_procedures] for a in tag.actors}
+        metas = [m.get("lockversion") for m in tag.metas]
+        results.append((tag.render_start_tag(), actors, metas))
+    return results
+
+
+def timed(func, pages):
+    start = time.perf_counter()
+    for page in pages:
+        func(page)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark: BeautifulSoup vs. linear requirement scanner")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--requirements", type=int, default=25, help="Requirements per page")
+    parser.add_argument("--unclosed", type=int, default=5000, help="Unclosed start tags on the malformed page")
+    args = parser.parse_args()
+
+    pages = [build_page(p * args.requirements, args.requirements) for p in range(args.pages)]
+    if soup_path(pages[0]) != scanner_path(pages[0]):
+        print("Results differ between soup and scanner", file=sys.stderr)
+        sys.exit(1)
+
+    total = args.pages * args.requirements
+    soup_time = timed(soup_path, pages)
+    scan_time = timed(scanner_path, pages)
+    print(f"{total} requirements on {args.pages} pages")
+    print(f"  soup:    {soup_time:8.3f}s  ({soup_time / total * 1e6:8.1f} us/requirement)")
+    print(f"  scanner: {scan_time:8.3f}s  ({scan_time / total * 1e6:8.1f} us/requirement)")
+    print(f"  speed-up: {soup_time / scan_time:.1f}x")
+
+    malformed = "<requirement title='x'>" * args.unclosed + "text"
+    regex_time = timed(lambda c: list(REQUIREMENT_PATTERN.finditer(c)), [malformed])
+    scan_time = timed(lambda c: list(scanner.iter_requirement_blocks(c)), [malformed])
+    print(f"{args.unclosed} unclosed <requirement> start tags")
+    print(f"  regex:   {regex_time:8.3f}s")
+    print(f"  scanner: {scan_time:8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import shutil
+import argparse
+import tempfile
+from unittest.mock import MagicMock
+
+from igtools.specifications import storage
+from igtools.specifications.data import Requirement
+
+#####
+#
+# PYTHONPATH=src python tools/benchmarks/bench_storage.py --sizes 1000 10000
+#
+# Compares the storage formats for one release directory with N requirements:
+#   save:      first write of all requirements
+#   resave:    save of the loaded, unchanged requirements
+#   load:      load without any cache (yaml: no snapshot)
+#
+#####
+
+
+def build_requirements(size):
+    requirements = []
+    for n in range(size):
+        req = Requirement(key=f"IG-BENCH{n:06d}", title=f"Requirement {n}", text=f"The system SHALL do {n}.",
+                          actor=["EPA-PS", "EPA-Medication-Service"], source="input/pagecontent/bench.md",
+                          version=1, conformance="SHALL",
+                          test_procedures={"EPA-PS": ["Produkttest"], "EPA-Medication-Service": []})
+        req.created = "2025-01-01T10:00:00"
+        req.date = "2025-01-01T10:00:00"
+        requirements.append(req)
+    return requirements
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def run(name, size):
+    directory = tempfile.mkdtemp(prefix="igtools-bench-")
+    try:
+        config = MagicMock(path=os.path.join(directory, ".igtools"))
+        store = storage.create_store(config, storage=name)
+        release_directory = os.path.join(directory, "release")
+        requirements = build_requirements(size)
+
+        save, _ = timed(lambda: store.save(release_directory, requirements))
+        storage.YamlRequirementStore.cache.clear()
+        load, loaded = timed(lambda: store.load(release_directory) if name != "yaml"
+                             else store.cache.load(release_directory))
+        resave, _ = timed(lambda: store.save(release_directory, loaded))
+        return save, resave, load
+    finally:
+        storage.YamlRequirementStore.cache.clear()
+        shutil.rmtree(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark: storage formats of the release directories")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    args = parser.parse_args()
+
+    print(f"{'format':>8} {'requirements':>12} {'save':>9} {'resave':>9} {'load':>9}")
+    for size in args.sizes:
+        for name in storage.STORES:
+            save, resave, load = run(name, size)
+            print(f"{name:>8} {size:>12} {save:>8.2f}s {resave:>8.2f}s {load:>8.2f}s")
+
+
+if __name__ == "__main__":
+    main()